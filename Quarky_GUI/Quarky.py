@@ -9,17 +9,14 @@ different components.
 """
 
 # TODO: Saving Data Files
-# TODO: re-retrieve module (refresh button)
 
-# TODO: Experiment run time estimate (in the experiment file)
-# TODO: Make a separate thread for proxy connections
 
 
 import sys, os
 import math
 from pathlib import Path
 from PyQt5.QtCore import (
-    Qt, QSize, QThread, pyqtSignal, qInstallMessageHandler, qDebug,
+    Qt, QSize, QThread, QTimer, pyqtSignal, qInstallMessageHandler, qDebug,
     qInfo,
     qWarning,
     qCritical,
@@ -42,13 +39,22 @@ from PyQt5.QtWidgets import (
 )
 
 # Use absolute imports
-from scripts.CoreLib.socProxy import makeProxy
-from scripts.ExperimentThread import ExperimentThread
-from scripts.QuarkTab import QQuarkTab
+from scripts.ConnectionManager import RFSoCConnectionManager
+from scripts.CoreLib.socProxy import DEFAULT_NS_PORT, DEFAULT_SERVER_NAME
+from scripts.CoreLib.SoccfgCache import is_simulated
+from scripts.CoreLib.Timing import RunTimer, format_duration
+from scripts.CoreLib.RuntimeEstimate import estimate_runtime
+from scripts.CoreLib.Sweep import Sweep
+from scripts.CoreLib.ExperimentLoader import experiment_registry
+from scripts.LiveUpdateChannel import LiveUpdateChannel
+from scripts.EmptyTab import QEmptyTab
 from scripts.VoltagePanel import QVoltagePanel
 from scripts.AccountsPanel import QAccountPanel
 from scripts.LogPanel import QLogPanel
 from scripts.ConfigTreePanel import QConfigTreePanel
+from scripts.RunQueuePanel import QRunQueuePanel
+from scripts.ExperimentLibraryPanel import QExperimentLibraryPanel
+from scripts.Init import initialize
 import scripts.Helpers as Helpers
 
 ### Importing the PythonDrivers --- not sure if it works currently since they aren't being used
@@ -67,6 +73,10 @@ class Quarky(QMainWindow):
     ### Defining Signals
     rfsoc_connection_updated = pyqtSignal(str, str)
     """ The Signal sent to the accounts tab after an rfsoc connection attempt """
+    request_rfsoc_connection = pyqtSignal(str, str, int, int)
+    """ The Signal asking the connection manager thread to connect (ip address, server name, port, attempt id) """
+    request_rfsoc_disconnect = pyqtSignal(object, object, str)
+    """ The Signal asking the connection manager thread to release a soc proxy (soc, soccfg, ip address) """
 
     def __init__(self):
         """
@@ -74,9 +84,11 @@ class Quarky(QMainWindow):
 
         **Important Attributes:**
 
-        * experiment_worker (ExperimentThread): The instance of the experiment worker thread.
+        * experiment_worker (ExperimentThread): The instance of the experiment worker thread (a SweepRun for a run over
+          an outer sweep).
         * soc (Proxy): The instance of the RFSoC Proxy connection via Pyro4.
         * soccfg (QickConfig): The qick Config of the RFSoC.
+        * connection_manager (RFSoCConnectionManager): Connects to RFSoCs on its own thread.
         * central_widget (QWidget): The central widget of the Quarky GUI.
         """
 
@@ -84,11 +96,31 @@ class Quarky(QMainWindow):
 
         # Stores the thread that runs an experiment
         self.experiment_worker = None
+        self.run_timer = None # timings of the current or last run
+        self.run_total_reps = 0 # reps of the current run over all sets (and sweep points), for the progress bar
+        self.run_active = False # a run is in progress (or paused for a periodic job)
+
+        # State of the run queue
+        self.queue_started = False
+        self.queue_entry = None # the queue entry of the run in progress, None for a run started by hand
+        self.preempting = False # the run in progress was asked to pause for a periodic job
+        self.preempted = None # the run paused for the periodic job in progress, resumed once it is done
 
         # Instance variables for the rfsoc connection
         self.soc = None
         self.soccfg = None
         self.soc_connected = False
+        self.soc_ip_address = None
+        self.soc_server_name = DEFAULT_SERVER_NAME # name and nameserver port of the connected QickSoc, shards of a
+        self.soc_ns_port = DEFAULT_NS_PORT # sweep connect to further boards in the same nameserver
+        self.connecting_ip_address = None # ip address of the connection attempt in progress
+        self.connecting_server = (DEFAULT_SERVER_NAME, DEFAULT_NS_PORT) # server name and port of that attempt
+
+        # The connection manager runs on its own thread so that network timeouts never block the GUI
+        self.connection_thread = QThread()
+        self.connection_manager = RFSoCConnectionManager()
+        self.connection_manager.moveToThread(self.connection_thread)
+        self.connection_thread.start()
 
         # Tracks the central tab module by the currently selected tab
         self.current_tab = None
@@ -132,16 +164,21 @@ class Quarky(QMainWindow):
         self.soc_status_label.setObjectName("soc_status_label")
         self.experiment_progress_bar = QProgressBar(self.wrapper, value=0)
         self.experiment_progress_bar.setObjectName("experiment_progress_bar")
+        self.experiment_eta_label = QLabel('', self.wrapper) # measured sets/s and time left of the running experiment
+        self.experiment_eta_label.setObjectName("experiment_eta_label")
         self.load_data_button = Helpers.create_button("Load Data","load_data_button",True,self.wrapper)
         self.load_experiment_button = Helpers.create_button("Load Experiment","load_experiment_button",True,self.wrapper)
+        self.refresh_experiment_button = Helpers.create_button("Refresh","refresh_experiment_button",True,self.wrapper)
 
         # Adding items to top bar, top bar to main layout
         self.top_bar.addWidget(self.start_experiment_button)
         self.top_bar.addWidget(self.stop_experiment_button)
         self.top_bar.addWidget(self.soc_status_label)
         self.top_bar.addWidget(self.experiment_progress_bar)
+        self.top_bar.addWidget(self.experiment_eta_label)
         self.top_bar.addWidget(self.load_data_button)
         self.top_bar.addWidget(self.load_experiment_button)
+        self.top_bar.addWidget(self.refresh_experiment_button)
         self.main_layout.addLayout(self.top_bar)
 
         ### Main Splitter with Tabs, Voltage Panel, Config Tree
@@ -169,8 +206,8 @@ class Quarky(QMainWindow):
         self.central_tabs.setTabBarAutoHide(False)
         self.central_tabs.setObjectName("central_tabs")
         # self.central_tabs.setStyleSheet("background-color: #F8F8F8")  # Light gray background
-        #Template Experiment Tab
-        template_experiment_tab = QQuarkTab()
+        #Template Experiment Tab, a placeholder so that the plotting of QQuarkTab is only imported with the first tab
+        template_experiment_tab = QEmptyTab()
         self.central_tabs.addTab(template_experiment_tab, "No Tabs Added")
         self.central_tabs.setCurrentIndex(0)
 
@@ -198,6 +235,12 @@ class Quarky(QMainWindow):
         ### Accounts Panel
         self.accounts_panel = QAccountPanel(parent=self.central_tabs)
         self.side_tabs.addTab(self.accounts_panel, "Accounts")
+        ### Run Queue Panel
+        self.queue_panel = QRunQueuePanel(parent=self.central_tabs)
+        self.side_tabs.addTab(self.queue_panel, "Queue")
+
+        self.library_panel = QExperimentLibraryPanel(parent=self.central_tabs)
+        self.side_tabs.addTab(self.library_panel, "Library")
         ### Log Panel
         self.log_panel = QLogPanel(parent=self.central_tabs)
         self.side_tabs.addTab(self.log_panel, "Log")
@@ -228,6 +271,7 @@ class Quarky(QMainWindow):
         self.start_experiment_button.clicked.connect(self.run_experiment)
         self.stop_experiment_button.clicked.connect(self.stop_experiment)
         self.load_experiment_button.clicked.connect(self.load_experiment_file)
+        self.refresh_experiment_button.clicked.connect(self.refresh_experiment)
         self.load_data_button.clicked.connect(self.load_data_file)
 
         # Tab Change and Close signals
@@ -239,6 +283,24 @@ class Quarky(QMainWindow):
         self.accounts_panel.rfsoc_disconnect.connect(self.disconnect_rfsoc)
         # Signals for the RFSoC to the accounts panel
         self.rfsoc_connection_updated.connect(self.accounts_panel.rfsoc_connection_updated)
+        # Signals to and from the connection manager thread
+        self.request_rfsoc_connection.connect(self.connection_manager.connect_rfsoc)
+        self.request_rfsoc_disconnect.connect(self.connection_manager.disconnect_rfsoc)
+        self.connection_manager.connected.connect(self.rfsoc_connected)
+        self.connection_manager.connectionFailed.connect(self.rfsoc_connection_failed)
+        self.connection_manager.progress.connect(self.rfsoc_connection_progress)
+        self.connection_manager.disconnected.connect(lambda ip: qInfo("Released the connection to " + ip))
+
+        # Signals of the run queue, checked every second for runs to start and periodic jobs that are due
+        self.queue_panel.addCurrentRequested.connect(self.queue_current_experiment)
+        self.queue_panel.queueToggled.connect(self.toggle_queue)
+        self.queue_timer = QTimer(self)
+        self.queue_timer.setInterval(1000)
+        self.queue_timer.timeout.connect(self.check_queue)
+        self.queue_timer.start()
+
+        # Experiments opened from the library panel
+        self.library_panel.openRequested.connect(self.open_library_experiment)
 
         # Log message handler installation
         qInstallMessageHandler(self.log_panel.message_handler)
@@ -256,59 +318,112 @@ class Quarky(QMainWindow):
 
     def disconnect_rfsoc(self):
         """
-        Disconnects the RFSoC instance.
+        Disconnects the RFSoC instance, or cancels the connection attempt in progress.
         """
+
+        if self.connecting_ip_address is not None:
+            self.connection_manager.cancel()
+            qInfo("Cancelled connection attempt to " + self.connecting_ip_address)
+            self.connecting_ip_address = None
+        if self.soc is not None:
+            self.request_rfsoc_disconnect.emit(self.soc, self.soccfg, str(self.soc_ip_address))
         self.soc = None
         self.soccfg = None
         self.soc_connected = False
+        self.soc_ip_address = None
+        self.soc_status_label.setText('<html><b>✖ Soc Disconnected</b></html>')
         qInfo("Disconnected from RFSoC")
 
-    def connect_rfsoc(self, ip_address):
+    def connect_rfsoc(self, ip_address, server_name=DEFAULT_SERVER_NAME, ns_port=DEFAULT_NS_PORT):
         """
-        Connects the RFSoC instance to the specified IP address.
+        Starts connecting the RFSoC instance to the specified IP address. The connection itself is made by the
+        connection manager thread, which reports back to rfsoc_connected() or rfsoc_connection_failed().
 
         :param ip_address: The IP address of the RFSoC instance.
         :type ip_address: str
+        :param server_name: The name the QickSoc is registered under in the nameserver.
+        :type server_name: str
+        :param ns_port: The port of the nameserver.
+        :type ns_port: int
         """
 
         qInfo("Attempting to connect to RFSoC")
         if ip_address is not None:
-            # Attempt RFSoC connection via makeProxy
-            try:
-                self.soc, self.soccfg = makeProxy(ip_address)
-            except Exception as e:
-                self.soc_connected = False
-                self.soc_status_label.setText('<html><b>✖ Soc Disconnected</b></html>')
-                QMessageBox.critical(None, "Error", "RFSoC connection to failed (see log).")
-                qCritical("RFSoC connection to " + ip_address + " failed: " + str(e))
-                self.rfsoc_connection_updated.emit(ip_address, 'failure') # emit failure to accounts tab
-                return
-
-            # Verifying RFSoc connection
-            try:
-                qInfo("RFSoC Info: " + str(self.soccfg))
-                # print("Available Methods:", self.soc._pyroMethods)
-            except Exception as e:
-                # Connection invalid despite makeProxy success
-                self.disconnect_rfsoc()
-                self.soc_status_label.setText('<html><b>✖ Soc Disconnected</b></html>')
-                QMessageBox.critical(None, "Error", "RFSoC connection invalid (see log).")
-                qCritical("RFSoC connection to " + ip_address + " invalid: " + str(e))
-                self.rfsoc_connection_updated.emit(ip_address, 'failure')
-                return
-            else:
-                self.soc_connected = True
-                self.soc_status_label.setText('<html><b>✔ Soc connected</b></html>')
-                self.rfsoc_connection_updated.emit(ip_address, 'success') # emit success to accounts tab
+            attempt = self.connection_manager.new_attempt() # cancels any previous attempt
+            self.connecting_ip_address = ip_address
+            self.connecting_server = (server_name, ns_port)
+            self.soc_status_label.setText('<html><b>… Soc Connecting</b></html>')
+            self.rfsoc_connection_updated.emit(ip_address, 'connecting')
+            self.request_rfsoc_connection.emit(ip_address, server_name, ns_port, attempt)
         else:
             qCritical("RFSoC IP address is unspecified, param passed is " + str(ip_address))
             QMessageBox.critical(None, "Error", "RFSoC IP Address not given.")
 
+    def rfsoc_connection_progress(self, ip_address, message):
+        """
+        Logs the progress of a connection attempt.
+
+        :param ip_address: The IP address of the RFSoC instance.
+        :type ip_address: str
+        :param message: The connection step in progress.
+        :type message: str
+        """
+
+        qInfo("RFSoC " + ip_address + ": " + message)
+
+    def rfsoc_connected(self, soc, soccfg, ip_address):
+        """
+        Called by the connection manager once a connection attempt succeeded.
+
+        :param soc: The RFSoC Proxy.
+        :type soc: Proxy
+        :param soccfg: The qick Config of the RFSoC.
+        :type soccfg: QickConfig
+        :param ip_address: The IP address of the RFSoC instance.
+        :type ip_address: str
+        """
+
+        self.connecting_ip_address = None
+        self.soc, self.soccfg = soc, soccfg
+        self.soc_ip_address = ip_address
+        self.soc_server_name, self.soc_ns_port = self.connecting_server
+        qInfo("RFSoC Info: " + str(self.soccfg))
+        # print("Available Methods:", self.soc._pyroMethods)
+        self.soc_connected = True
+        if is_simulated(soccfg):
+            qWarning("Connected to the simulated QickSoc: only experiments calling simulated_acquire() run on it, "
+                     "not qick programs (e.g. AveragerProgram).")
+            self.soc_status_label.setText('<html><b>✔ Simulated soc connected</b></html>')
+            self.rfsoc_connection_updated.emit(ip_address, 'simulated') # success, to a simulated board
+        else:
+            self.soc_status_label.setText('<html><b>✔ Soc connected</b></html>')
+            self.rfsoc_connection_updated.emit(ip_address, 'success') # emit success to accounts tab
+
+    def rfsoc_connection_failed(self, ip_address, error):
+        """
+        Called by the connection manager once a connection attempt failed.
+
+        :param ip_address: The IP address of the RFSoC instance.
+        :type ip_address: str
+        :param error: The error message.
+        :type error: str
+        """
+
+        self.connecting_ip_address = None
+        self.soc_connected = False
+        self.soc_status_label.setText('<html><b>✖ Soc Disconnected</b></html>')
+        QMessageBox.critical(None, "Error", "RFSoC connection to failed (see log).")
+        qCritical("RFSoC connection to " + ip_address + " failed: " + error)
+        self.rfsoc_connection_updated.emit(ip_address, 'failure') # emit failure to accounts tab
+
     def run_experiment(self):
         """
         Runs the experiment instance of the current active tab via the RFSoC connection. This function is where the
         new Experiment Worker Thread is created and all signals for data updating and experiment termination
         are connected.
+
+        :return: Whether the run was started.
+        :rtype: bool
         """
 
         if self.soc_connected: # ensure RFSoC connection
@@ -316,60 +431,121 @@ class Quarky(QMainWindow):
                 qCritical("Attempted execution of a data tab (" + self.current_tab.tab_name +
                           ")rather than an experiment tab")
                 QMessageBox.critical(None, "Error", "Tab is a Data tab.")
-                return
-
-            self.thread = QThread()
+                return False
+            path = getattr(self.current_tab, 'experiment_path', None)
+            if path is not None and experiment_registry.changed(path):
+                qWarning(os.path.basename(path) + " changed since it was loaded, running the loaded version " +
+                         "(press Refresh to reload it).")
 
             # Handling config specific to the current tab
             UpdateConfig = self.config_tree_panel.config["Experiment Config"]
             BaseConfig = self.config_tree_panel.config["Base Config"]
-            config = self.current_tab.config = BaseConfig | UpdateConfig # symmetric difference and intersection
+            RunConfig = self.config_tree_panel.config.get("Run Config", {}) # how to run, not passed to experiment
+            config = BaseConfig | UpdateConfig # symmetric difference and intersection
+
+            # An outer sweep runs the experiment at every point, sharded across the connected and shard_boards RFSoCs
+            try:
+                sweep = Sweep.parse(RunConfig.get("outer_sweep", ""))
+            except ValueError as e:
+                qCritical("Invalid outer_sweep: " + str(e))
+                QMessageBox.critical(None, "Error", "Invalid outer sweep (see log).")
+                return False
+
+            # Refuse runs that would not fit in the available time, before any board time is spent
+            max_minutes = RunConfig.get("max_runtime_minutes", 0)
+            estimate = estimate_runtime(config, RunConfig, experiment_name=self.experiment_class_name(self.current_tab))
+            if max_minutes > 0 and estimate is not None and estimate.total_seconds > 60 * max_minutes:
+                qCritical("The run is estimated to take " + format_duration(estimate.total_seconds) +
+                          ", more than the max_runtime_minutes of " + str(max_minutes) + ".")
+                QMessageBox.critical(None, "Error", "Run estimated to exceed max_runtime_minutes (see log).")
+                return False
+            self.current_tab.config = config
+            self.run_total_reps = config['reps'] * config['sets'] * (1 if sweep is None else sweep.size)
+
+            # The workers import Pyro4 and qick, which the connection already imported
+            from scripts.ExperimentThread import ExperimentThread
+            from scripts.SweepRun import SweepRun
 
-            # Create experiment object using updated config and current tab's experiment instance
+            self.thread = QThread()
             experiment_class = self.current_tab.experiment_obj.experiment_class
-            self.experiment_instance = experiment_class(soc=self.soc, soccfg=self.soccfg, cfg=config)
 
-            # Creating the experiment worker from ExperimentThread
-            self.experiment_worker = ExperimentThread(config, soccfg=self.soccfg, exp=self.experiment_instance, soc=self.soc)
+            # Timings of every stage of the run, shared by the worker, the data writer, and the update channel
+            self.run_timer = RunTimer()
+
+            # Channel coalescing the worker's data updates down to the maximum refresh rate of the plots
+            self.update_channel = LiveUpdateChannel(RunConfig.get("max_refresh_rate", 10), parent=self,
+                                                    timer=self.run_timer)
+
+            data_writer = self.current_tab.open_run_file(config, RunConfig, self.run_timer)
+            if sweep is None:
+                # Create experiment object using updated config and current tab's experiment instance
+                self.experiment_instance = experiment_class(soc=self.soc, soccfg=self.soccfg, cfg=config)
+
+                # Creating the experiment worker from ExperimentThread
+                self.experiment_worker = ExperimentThread(config, soccfg=self.soccfg, exp=self.experiment_instance,
+                                                          soc=self.soc, run_config=RunConfig,
+                                                          update_channel=self.update_channel,
+                                                          data_writer=data_writer, timer=self.run_timer)
+            else:
+                # The sweep worker creates an experiment object per board, and a worker per point
+                self.experiment_worker = SweepRun(config, sweep, experiment_class, self.soc, self.soccfg,
+                                                  self.soc_ip_address, self.soc_ns_port, run_config=RunConfig,
+                                                  update_channel=self.update_channel, data_writer=data_writer,
+                                                  timer=self.run_timer, server_name=self.soc_server_name)
             self.experiment_worker.moveToThread(self.thread) # Move the ExperimentThread onto the actual QThread
 
             # Connecting started and finished signals
-            self.thread.started.connect(self.current_tab.prepare_file_naming)
             self.thread.started.connect(self.experiment_worker.run) # run experiment
             self.experiment_worker.finished.connect(self.thread.quit) # stop thread
             self.experiment_worker.finished.connect(self.experiment_worker.deleteLater) # delete worker
+            self.thread.finished.connect(self.update_channel.stop) # deliver the last update
+            self.thread.finished.connect(self.update_channel.deleteLater)
+            self.thread.finished.connect(self.current_tab.finish_run) # flush and close the run file
+            self.thread.finished.connect(self.report_timing) # log the timing table
             self.thread.finished.connect(self.thread.deleteLater) # delete thread
-            self.thread.finished.connect(self.stop_experiment) # update UI
+            worker = self.experiment_worker
+            self.thread.finished.connect(lambda: self.run_finished(worker)) # update UI, start the next queued run
 
             # Connecting data related slots
-            self.experiment_worker.updateData.connect(self.current_tab.update_data) # update data & plot
-            self.experiment_worker.updateProgress.connect(self.update_progress) # update progress bar
-            self.experiment_worker.RFSOC_error.connect(self.RFSOC_error) # connect any RFSoC errors
+            self.update_channel.updateData.connect(self.current_tab.update_data) # update data & plot
+            # Queued, the signals of a sweep come from the threads of its shards
+            self.experiment_worker.updateProgress.connect(self.update_progress, Qt.QueuedConnection) # progress bar
+            self.experiment_worker.updateTiming.connect(self.update_timing, Qt.QueuedConnection) # sets/s, time left
+            self.experiment_worker.RFSOC_error.connect(self.RFSOC_error, Qt.QueuedConnection) # any RFSoC errors
+            self.experiment_worker.paused.connect(self.start_preempting_job, Qt.QueuedConnection) # for a periodic job
 
             # button and GUI updates
             self.update_progress(0)
             self.experiment_progress_bar.setValue(1)
+            self.experiment_eta_label.setText("-- sets/s, --:-- left")
             self.start_experiment_button.setEnabled(False)
             self.stop_experiment_button.setEnabled(True)
 
+            self.run_active = True
+            self.update_channel.start()
             self.thread.start()
+            return True
         else:
             qCritical("The RfSoC instance is not yet connected. Current soc has the value: " + str(self.soc))
             QMessageBox.critical(None, "Error", "RfSoC Disconnected.")
-            return
+            return False
 
     def stop_experiment(self):
         """
-        Stop an Experiment if not auto-terminated and update respective UI.
+        Stop an Experiment if not auto-terminated and update respective UI. A run paused for a periodic job of the
+        queue is stopped as well.
         """
 
         if self.experiment_worker:
             self.experiment_worker.stop()
             qDebug("Stopping the experiment worker...")
+        if self.preempted is not None:
+            self.preempted['worker'].stop()
 
         self.stop_experiment_button.setEnabled(False)
         self.start_experiment_button.setEnabled(True)
-        qInfo("Stopped Experiment: " + str(self.current_tab.tab_name))
+        if self.current_tab is not None:
+            qInfo("Stopped Experiment: " + str(self.current_tab.tab_name))
 
     def closeEvent(self, event):
         """
@@ -379,15 +555,242 @@ class Quarky(QMainWindow):
         :type event: QCloseEvent
         """
 
+        self.queue_started = False # no further queued runs
         self.stop_experiment()
+
+        # Wait for the workers to finish their current set, then flush every run file still being written
+        threads = [self.thread] if self.experiment_worker is not None else []
+        if self.preempted is not None:
+            threads.append(self.preempted['thread'])
+        for thread in threads:
+            try:
+                thread.quit()
+                thread.wait()
+            except RuntimeError: # thread already finished and deleted
+                pass
+        for idx in range(self.central_tabs.count()):
+            self.central_tabs.widget(idx).finish_run(wait=True)
+
+        self.library_panel.stop()
+
+        # Stop the connection manager, without waiting out a connection attempt stuck on the network
+        self.connection_manager.cancel()
+        self.connection_thread.quit()
+        self.connection_thread.wait(1000)
+
         event.accept()
 
+    def run_finished(self, worker):
+        """
+        Called once the thread of a run has finished. Updates the UI and the run queue, then resumes the run paused
+        for a periodic job, if any, or starts the next queued run without waiting.
+
+        :param worker: The worker of the run, an ExperimentThread or SweepRun.
+        :type worker: QObject
+        """
+
+        if self.preempted is not None and worker is self.preempted['worker']: # stopped while paused
+            if self.preempted['entry'] is not None:
+                self.queue_panel.run_queue.mark_finished(self.preempted['entry']['id'], worker.stop_reason)
+                self.queue_panel.refresh()
+            self.preempted = None
+            return
+
+        qInfo("Finished Experiment (" + str(worker.stop_reason) + ")" +
+              ("" if self.current_tab is None else ": " + str(self.current_tab.tab_name)))
+        self.run_active = False
+        self.preempting = False
+        self.stop_experiment_button.setEnabled(False)
+        self.start_experiment_button.setEnabled(self.current_tab is not None and
+                                                 self.current_tab.experiment_obj is not None)
+
+        entry, self.queue_entry = self.queue_entry, None
+        if entry is not None:
+            self.queue_panel.run_queue.mark_finished(entry['id'], worker.stop_reason)
+            self.queue_panel.refresh()
+
+        if self.preempted is not None:
+            self.resume_preempted()
+        elif self.queue_started:
+            self.run_next_queued()
+
+    def queue_current_experiment(self, priority, interval_minutes):
+        """
+        Adds the experiment of the current tab to the run queue, with its config as it is now.
+
+        :param priority: Higher priorities run first.
+        :type priority: int
+        :param interval_minutes: Above zero for a periodic job.
+        :type interval_minutes: float
+        """
+
+        if self.current_tab is None or getattr(self.current_tab, 'experiment_path', None) is None:
+            qCritical("Only experiment tabs can be queued.")
+            QMessageBox.critical(None, "Error", "Tab is not an Experiment tab.")
+            return
+
+        config = self.config_tree_panel.config
+        entry = self.queue_panel.add_entry(self.current_tab.experiment_path, config.get("Experiment Config", config),
+                                           config.get("Run Config", {}))
+        qInfo("Queued " + entry['name'] + " with priority " + str(entry['priority']) +
+              (", every " + "{:g}".format(interval_minutes) + " min" if interval_minutes > 0 else ""))
+
+    def toggle_queue(self, started):
+        """
+        Starts or pauses working through the run queue. Pausing lets the run in progress finish.
+
+        :param started: Whether the queue is started.
+        :type started: bool
+        """
+
+        self.queue_started = started
+        qInfo("Run queue " + ("started" if started else "paused"))
+        self.check_queue()
+
+    def check_queue(self):
+        """
+        Called every second while the GUI runs: starts the next queued run when nothing is running, and pauses the
+        run in progress at its next set boundary when a periodic job is due.
+        """
+
+        if not self.queue_started or not self.soc_connected:
+            return
+        if not self.run_active:
+            self.run_next_queued()
+            return
+
+        if self.preempting or self.preempted is not None:
+            return
+        if self.queue_entry is not None and self.queue_entry['interval_minutes'] > 0:
+            return # periodic jobs do not preempt each other
+        entry = self.queue_panel.run_queue.due_periodic()
+        if entry is not None:
+            qInfo("Pausing the run at its next set boundary for " + entry['name'])
+            self.preempting = True
+            self.experiment_worker.pause()
+
+    def start_preempting_job(self):
+        """
+        Called once the run in progress holds at a set boundary: sets it aside and starts the periodic job that is
+        due.
+        """
+
+        if not self.preempting or self.sender() is not self.experiment_worker:
+            return
+        self.preempting = False
+        entry = self.queue_panel.run_queue.due_periodic()
+        if entry is None:
+            self.experiment_worker.resume()
+            return
+
+        self.preempted = {'worker': self.experiment_worker, 'thread': self.thread, 'tab': self.current_tab,
+                          'update_channel': self.update_channel, 'run_timer': self.run_timer,
+                          'run_total_reps': self.run_total_reps, 'entry': self.queue_entry,
+                          'config': self.config_tree_panel.config}
+        self.queue_entry = None
+        self.run_active = False
+        self.experiment_worker.updateProgress.disconnect(self.update_progress) # the progress bar is the job's now
+        self.experiment_worker.updateTiming.disconnect(self.update_timing)
+        if not self.run_queued(entry):
+            self.resume_preempted()
+
+    def resume_preempted(self):
+        """
+        Makes the run paused for a periodic job the run in progress again, and resumes it.
+        """
+
+        state, self.preempted = self.preempted, None
+        self.experiment_worker, self.thread = state['worker'], state['thread']
+        self.update_channel, self.run_timer = state['update_channel'], state['run_timer']
+        self.run_total_reps, self.queue_entry = state['run_total_reps'], state['entry']
+        self.run_active = True
+        self.experiment_worker.updateProgress.connect(self.update_progress, Qt.QueuedConnection)
+        self.experiment_worker.updateTiming.connect(self.update_timing, Qt.QueuedConnection)
+
+        state['tab'].config = state['config'] # as shown before the job, the run flattened the config of the tab
+        tab_idx = self.central_tabs.indexOf(state['tab'])
+        if tab_idx >= 0:
+            self.central_tabs.setCurrentIndex(tab_idx)
+        self.start_experiment_button.setEnabled(False)
+        self.stop_experiment_button.setEnabled(True)
+        qInfo("Resuming " + str(state['tab'].tab_name))
+        self.experiment_worker.resume()
+
+    def run_next_queued(self):
+        """
+        Starts the next run of the queue, if any is due. Entries that fail to start are marked failed and skipped.
+        """
+
+        if not self.soc_connected:
+            qWarning("The run queue waits for an RFSoC connection.")
+            return
+        while True:
+            entry = self.queue_panel.run_queue.next_run()
+            if entry is None or self.run_queued(entry):
+                return
+
+    def run_queued(self, entry):
+        """
+        Runs a queue entry in a tab of its experiment, opening one if needed, with the config of the entry.
+
+        :param entry: The queue entry (see RunQueue).
+        :type entry: dict
+        :return: Whether the run was started.
+        :rtype: bool
+        """
+
+        run_queue = self.queue_panel.run_queue
+        run_queue.mark_running(entry['id'])
+        tab = self.experiment_tab_for(entry['path'], None if self.preempted is None else self.preempted['tab'])
+        started = False
+        if tab is not None:
+            tab.config = {"Experiment Config": dict(entry['experiment_config']), "Base Config": initialize.BaseConfig,
+                          "Run Config": dict(initialize.RunConfig) | entry['run_config']}
+            tab_idx = self.central_tabs.indexOf(tab)
+            if self.central_tabs.currentIndex() == tab_idx:
+                self.change_tab(tab_idx)
+            else:
+                self.central_tabs.setCurrentIndex(tab_idx)
+
+            qInfo("Running queued " + entry['name'] + " (priority " + str(entry['priority']) + ")")
+            self.queue_entry = entry
+            started = self.run_experiment()
+
+        if not started:
+            self.queue_entry = None
+            run_queue.mark_finished(entry['id'], None)
+        self.queue_panel.refresh()
+        return started
+
+    def experiment_tab_for(self, path, exclude=None):
+        """
+        The open tab of an experiment file, or a new one.
+
+        :param path: The path of the experiment file.
+        :type path: str
+        :param exclude: A tab not to use, e.g. the tab of a paused run.
+        :type exclude: QQuarkTab
+        :return: The tab, None if the experiment could not be loaded.
+        :rtype: QQuarkTab
+        """
+
+        for idx in range(self.central_tabs.count()):
+            tab = self.central_tabs.widget(idx)
+            if tab is not exclude and getattr(tab, 'experiment_path', None) == str(path):
+                return tab
+        try:
+            return self.create_experiment_tab(path)
+        except Exception as e:
+            qCritical("Could not load the queued experiment " + str(path) + ": " + str(e))
+            return None
+
     def load_experiment_file(self):
         """
         Gets an .py experiment file per user input.
         """
         options = QFileDialog.Options()
-        file, _ = QFileDialog.getOpenFileName(self, "Open Python File", "..\\",
+        start_dir = self.library_panel.index.directories[0] if self.library_panel.index.directories else "..\\"
+        file, _ = QFileDialog.getOpenFileName(self, "Open Python File", start_dir,
                                               "Python Files (*.py)", options=options)
         if not file:
             return
@@ -396,14 +799,33 @@ class Quarky(QMainWindow):
             qInfo("Loading experiment file: " + str(path))
             self.create_experiment_tab(str(path)) # pass full path of the experiment file
 
+    def open_library_experiment(self, path):
+        """
+        Opens an experiment file of the library panel, in a new tab.
+
+        :param path: The path of the experiment file.
+        :type path: str
+        """
+
+        qInfo("Loading experiment file: " + path)
+        try:
+            self.create_experiment_tab(path)
+        except ImportError as e:
+            qCritical("Failed to load the experiment file " + path + ": " + str(e))
+            QMessageBox.critical(None, "Error", "Failed to load the experiment file (see log).")
+
     def create_experiment_tab(self, path):
         """
         Creates a new QQuarkTab instance for the new experiment tab.
 
         :param path: The path to the experiment file.
         :type path: str
+        :return: The new tab, None if the experiment file is not valid.
+        :rtype: QQuarkTab
         """
 
+        from scripts.QuarkTab import QQuarkTab # plotting is imported with the first tab, not at startup
+
         tab_count = self.central_tabs.count()
         experiment_module, experiment_name = Helpers.import_file(str(path)) # gets experiment object from file
 
@@ -411,19 +833,65 @@ class Quarky(QMainWindow):
         new_experiment_tab = QQuarkTab(experiment_module, experiment_name, True)
         if new_experiment_tab.experiment_obj.experiment_class is None: # not valid experiment file
             qCritical("The experiment tab failed to be created - source of the error found in QQuarkTab module.")
-            return
+            return None
+        new_experiment_tab.experiment_path = str(path)
 
         # Handling UI updates: Update current tab, enable experiment running, update ConfigPanel
         tab_idx = self.central_tabs.addTab(new_experiment_tab, (experiment_name + ".py"))
         self.central_tabs.setCurrentIndex(tab_idx)
         self.start_experiment_button.setEnabled(True)
-        self.config_tree_panel.set_config(new_experiment_tab.config)
+        self.config_tree_panel.set_config(new_experiment_tab.config, self.experiment_class_name(new_experiment_tab))
         self.current_tab = new_experiment_tab
 
         # Remove the template tab created on GUI initialization
         if not self.tabs_added and tab_count == 1:
                 self.central_tabs.removeTab(0)
         self.tabs_added = True
+        return new_experiment_tab
+
+    def refresh_experiment(self):
+        """
+        Reloads the experiment file of the current tab if it changed on disk, in place: the tab keeps its data, plots,
+        and the config entries changed from the experiment's config_template (see QQuarkTab.reload_experiment).
+        """
+
+        path = getattr(self.current_tab, 'experiment_path', None)
+        if path is None:
+            qWarning("The current tab has no experiment file to refresh.")
+            return
+        if self.run_active or self.preempted is not None:
+            qWarning("An experiment is running, refresh " + os.path.basename(path) + " once it is done.")
+            return
+
+        try:
+            experiment_module, experiment_name = Helpers.import_file(path) # only executed again if it changed
+        except ImportError as e:
+            qCritical("Failed to reload the experiment file " + path + ": " + str(e))
+            QMessageBox.critical(None, "Error", "Failed to reload the experiment file (see log).")
+            return
+        if experiment_module is self.current_tab.experiment_obj.experiment_module:
+            qInfo(experiment_name + ".py has not changed since it was loaded.")
+            return
+
+        if not self.current_tab.reload_experiment(experiment_module, self.config_tree_panel.config):
+            qCritical("The reloaded " + experiment_name + ".py has no experiment class, the tab was left unchanged.")
+            return
+        self.config_tree_panel.set_config(self.current_tab.config, self.experiment_class_name(self.current_tab))
+        qInfo("Reloaded the experiment file: " + path)
+
+    def experiment_class_name(self, tab):
+        """
+        The name of the experiment class of a tab, which runtime estimates are calibrated by.
+
+        :param tab: The tab.
+        :type tab: QQuarkTab
+        :return: The class name, None for a data tab.
+        :rtype: str
+        """
+
+        if tab.experiment_obj is None or tab.experiment_obj.experiment_class is None:
+            return None
+        return tab.experiment_obj.experiment_class.__name__
 
     def change_tab(self, idx):
         """
@@ -435,7 +903,8 @@ class Quarky(QMainWindow):
 
         if self.central_tabs.count() != 0:
             self.current_tab = self.central_tabs.widget(idx)
-            self.config_tree_panel.set_config(self.current_tab.config) # update config panel
+            self.config_tree_panel.set_config(self.current_tab.config, # update config panel
+                                              self.experiment_class_name(self.current_tab))
 
             if self.current_tab.experiment_obj is None: # check if tab is a data or experiment tab
                 self.start_experiment_button.setEnabled(False)
@@ -450,6 +919,7 @@ class Quarky(QMainWindow):
         :type idx: int
         """
 
+        self.central_tabs.widget(idx).release_files()
         self.central_tabs.removeTab(idx)
         if self.central_tabs.count() == 0: # if no tabs remaining
             self.start_experiment_button.setEnabled(False)
@@ -458,18 +928,50 @@ class Quarky(QMainWindow):
             current_tab_idx = self.central_tabs.currentIndex() # get the tab changed to upon closure
             self.change_tab(current_tab_idx)
 
-    def update_progress(self, sets_complete):
+    def update_progress(self, reps_complete):
         """
         The function that updates the progress bar based on experiment progress.
 
-        :param sets_complete: The number of sets of the experiment that have been completed
-        :type sets_complete: int
+        :param reps_complete: The number of reps of the experiment that have been completed, over all sets (and sweep points)
+        :type reps_complete: int
+        """
+
+        if self.current_tab is None or not self.run_total_reps: # the run already finished
+            return
+
+        total = self.run_total_reps
+        self.experiment_progress_bar.setValue(math.floor(float(reps_complete) / total * 100)) # completed %
+        self.experiment_progress_bar.setFormat(str(reps_complete) + "/" + str(total)) # update text
+
+    def update_timing(self, sets_per_second, seconds_left):
         """
+        Shows the measured set rate and the estimated time left next to the progress bar.
 
-        # Getting the total reps and sets to be run from the experiment configs
-        reps, sets = self.current_tab.config['reps'], self.current_tab.config['sets']
-        self.experiment_progress_bar.setValue(math.floor(float(sets_complete) / sets * 100)) # calculate completed %
-        self.experiment_progress_bar.setFormat(str(sets_complete * reps) + "/" + str(sets * reps)) # update text
+        :param sets_per_second: The smoothed number of sets completed per second.
+        :type sets_per_second: float
+        :param seconds_left: The estimated seconds until the last set is complete, negative if unknown.
+        :type seconds_left: float
+        """
+
+        self.experiment_eta_label.setText("{:.3g} sets/s, ".format(sets_per_second) +
+                                          format_duration(seconds_left if seconds_left >= 0 else None) + " left")
+
+    def report_timing(self):
+        """
+        Logs the timing table of the finished run, slowest stage first, and shows the total run time.
+        """
+
+        if self.run_timer is None:
+            return
+        table = self.run_timer.table()
+        elapsed = self.run_timer.elapsed()
+        self.experiment_eta_label.setText("Ran in " + format_duration(elapsed))
+        if not table:
+            return
+        rows = sorted(table.items(), key=lambda item: item[1]['total_s'], reverse=True)
+        qInfo("Run took " + format_duration(elapsed) + ", by stage: " + ", ".join(
+            name + " " + "{:.1f}".format(stats['total_s']) + " s (" + str(stats['count']) + "x, " +
+            "{:.1f}".format(1000 * stats['mean_s']) + " ms)" for name, stats in rows))
 
     def RFSOC_error(self, e):
         """
@@ -501,6 +1003,8 @@ class Quarky(QMainWindow):
         :type path: str
         """
 
+        from scripts.QuarkTab import QQuarkTab # plotting is imported with the first tab, not at startup
+
         tab_count = self.central_tabs.count()
         file_name = os.path.basename(file)
         # Creates the new QQuarkTab instance specifying not an experiment tab
@@ -0,0 +1,251 @@
+"""
+End to end benchmark of the acquisition pipeline: ExperimentThread -> LiveUpdateChannel -> QQuarkTab.update_data
+(plotting) and the DataWriter (saving), driven by an in-process fake experiment so no board is needed.
+
+Every combination of set rate, data shape, and save policy is run in its own headless (Qt offscreen) process, so
+that the peak memory of one case does not carry over into the next. The results are written as JSON::
+
+    python benchmarks/pipeline_benchmark.py --sets 200 --output results.json
+
+run from the Quarky_GUI folder. Reported per case: sets per second, the time the GUI thread was busy (plotting and
+progress updates), the p50 and p99 latency from a set being published to it being plotted, the live updates shown
+and coalesced, the peak RSS of the process, and the stage timings of the run (see RunTimer.table).
+
+A last case measures the program cache (see ProgramCache): the sets of --program-runs runs of SimulatedSpec, which
+builds a qick program every set, on an in-process simulated soc, once with the program built anew every set, as
+without the cache, and once through the cache. Reported for each: the programs built and reused, the seconds spent
+building them, and the milliseconds per set.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import itertools
+import subprocess
+
+import numpy as np
+
+QUARKY_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+
+# The data of a set, for each shape: 1D traces (per readout channel, like avgi), 2D images, and single shots (I, Q)
+SHAPES = {
+    "trace": lambda n: {'x_pts': np.arange(n, dtype=np.float64), 'avgi': [np.zeros((1, n))], 'avgq': [np.zeros((1, n))]},
+    "image": lambda n: {'avgi': [np.zeros((1, n, n))], 'avgq': [np.zeros((1, n, n))]},
+    "shots": lambda n: {'shots': np.zeros((n, 2))},
+}
+DEFAULT_SIZES = {"trace": 1000, "image": 256, "shots": 20000}
+
+class BenchExperiment:
+    """
+    The fake experiment: acquire() waits delay seconds, like a board would, and returns noise of the case's shape.
+    """
+
+    def __init__(self, shape, size, delay):
+        self.cfg = {"reps": 1}
+        self.template = SHAPES[shape](size)
+        self.delay = delay
+        self.rng = np.random.default_rng(0)
+
+    def acquire(self, progress=False, debug=False):
+        if self.delay:
+            time.sleep(self.delay)
+        data = {}
+        for key, value in self.template.items():
+            if key == 'x_pts':
+                data[key] = value
+            elif isinstance(value, list):
+                data[key] = [channel + self.rng.standard_normal(channel.shape) for channel in value]
+            else:
+                data[key] = value + self.rng.standard_normal(value.shape)
+        return {'config': self.cfg, 'data': data}
+
+def percentile_ms(values, q):
+    return float(np.percentile(values, q) * 1000) if values else None
+
+def peak_rss_mb():
+    """ The peak resident memory of this process in MB, None where the resource module is unavailable. """
+
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024 # bytes on macOS, kB on Linux
+
+def run_case(case, sets):
+    """
+    Runs one case in this process, wired the way Quarky.run_experiment() wires a run, and returns its results.
+
+    :param case: The shape, size, delay (seconds per set), save policy, and max refresh rate of the case.
+    :type case: dict
+    :param sets: The number of sets to run.
+    :type sets: int
+    :rtype: dict
+    """
+
+    sys.path.insert(0, QUARKY_DIR)
+    from PyQt5.QtCore import QThread, QEventLoop
+    from PyQt5.QtWidgets import QApplication
+    from scripts.QuarkTab import QQuarkTab
+    from scripts.ExperimentThread import ExperimentThread
+    from scripts.LiveUpdateChannel import LiveUpdateChannel
+    from scripts.CoreLib.Timing import RunTimer
+    from scripts.Init.initialize import RunConfig
+
+    app = QApplication.instance() or QApplication([])
+    tab = QQuarkTab(tab_name="Benchmark", is_experiment=True)
+    tab.resize(1200, 800)
+    tab.show()
+
+    config = {"reps": 1, "sets": sets}
+    run_config = dict(RunConfig, save_policy=case["policy"], max_refresh_rate=case["refresh"])
+    timer = RunTimer()
+    channel = LiveUpdateChannel(run_config["max_refresh_rate"], timer=timer)
+    worker = ExperimentThread(config, None, BenchExperiment(case["shape"], case["size"], case["delay"]), None,
+                              run_config=run_config, update_channel=channel,
+                              data_writer=tab.open_run_file(config, run_config, timer), timer=timer)
+    worker.runtime_calibration = None # fake timings must not calibrate the runtime estimates
+    thread = QThread()
+    worker.moveToThread(thread)
+
+    # Stamp every published update, so its latency can be taken once the tab has plotted it
+    latencies, gui_busy = [], [0.0]
+    publish = channel.publish
+    channel.publish = lambda data: publish(dict(data, published=time.perf_counter()))
+    def plotted(data):
+        latencies.append(time.perf_counter() - data['published'])
+    def progress(reps_done):
+        start = time.perf_counter()
+        tab.setWindowTitle(str(reps_done)) # stands in for the progress bar
+        gui_busy[0] += time.perf_counter() - start
+
+    loop = QEventLoop()
+    thread.started.connect(worker.run)
+    worker.finished.connect(thread.quit)
+    thread.finished.connect(channel.stop)
+    thread.finished.connect(tab.finish_run)
+    thread.finished.connect(loop.quit)
+    channel.updateData.connect(tab.update_data)
+    channel.updateData.connect(plotted) # connected after update_data, so runs once the plot is drawn
+    worker.updateProgress.connect(progress)
+
+    start = time.perf_counter()
+    channel.start()
+    thread.start()
+    loop.exec_()
+    thread.wait()
+    tab.finish_run(wait=True) # the writer closes the run file on its own thread
+    wall = time.perf_counter() - start
+
+    stages = timer.table()
+    gui_busy = gui_busy[0] + stages.get('plot', {}).get('total_s', 0.0)
+    return dict(case, sets=sets, wall_s=wall, sets_per_second=sets / wall, gui_busy_s=gui_busy,
+                gui_busy_fraction=gui_busy / wall, latency_p50_ms=percentile_ms(latencies, 50),
+                latency_p99_ms=percentile_ms(latencies, 99), updates_shown=channel.delivered,
+                updates_coalesced=channel.dropped, peak_rss_mb=peak_rss_mb(), stages=stages)
+
+def run_program_case(case, sets):
+    """
+    Runs the program cache case in this process and returns its results.
+
+    :param case: The number of runs of the case.
+    :type case: dict
+    :param sets: The number of sets of each run.
+    :type sets: int
+    :rtype: dict
+    """
+
+    sys.path.insert(0, QUARKY_DIR)
+    from qick import QickConfig
+    from scripts.Simulation.SimulatedSoc import simulated_cfg, SimulatedQickSoc
+    from scripts.Simulation.SimulatedSpec import SimulatedSpec
+    from scripts.CoreLib.ProgramCache import program_cache
+    from scripts.Init.initialize import BaseConfig
+
+    soc, soccfg = SimulatedQickSoc(latency=0.0), QickConfig(simulated_cfg())
+    config = BaseConfig | SimulatedSpec.config_template
+    results = dict(case, sets=sets)
+    for mode in ("rebuilt", "cached"):
+        program_cache.clear()
+        before = program_cache.stats()
+        start = time.perf_counter()
+        for _ in range(case["runs"]):
+            experiment = SimulatedSpec(soc=soc, soccfg=soccfg, cfg=dict(config)) # a new instance every run
+            for _ in range(sets):
+                if mode == "rebuilt":
+                    program_cache.clear()
+                experiment.acquire()
+        wall = time.perf_counter() - start
+        after = program_cache.stats()
+        results[mode] = {"builds": after['misses'] - before['misses'], "reuses": after['hits'] - before['hits'],
+                         "build_s": after['build_s'] - before['build_s'],
+                         "ms_per_set": wall / (case["runs"] * sets) * 1000}
+    results["speedup"] = results["rebuilt"]["ms_per_set"] / results["cached"]["ms_per_set"]
+    return results
+
+def run_isolated(case, sets):
+    """ Runs a case in a fresh headless process, in a temporary folder that takes its run files. """
+
+    env = dict(os.environ, QT_QPA_PLATFORM="offscreen")
+    with tempfile.TemporaryDirectory() as folder:
+        result = subprocess.run([sys.executable, os.path.realpath(__file__), "--case", json.dumps(case),
+                                 "--sets", str(sets)], cwd=folder, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        return dict(case, error=result.stderr.strip().splitlines()[-1:] or ["exit code " + str(result.returncode)])
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the acquisition pipeline headlessly.")
+    parser.add_argument("--sets", type=int, default=200, help="sets per case")
+    parser.add_argument("--delays", type=float, nargs="+", default=[0.0, 0.002, 0.02],
+                        help="seconds each fake set takes to acquire, i.e. the set rates to sweep")
+    parser.add_argument("--shapes", nargs="+", default=list(SHAPES), choices=list(SHAPES))
+    parser.add_argument("--policies", nargs="+", default=["every_set", "every_n_sets", "end_of_run"])
+    parser.add_argument("--refresh", type=float, default=10, help="max_refresh_rate of the live updates")
+    parser.add_argument("--program-runs", type=int, default=2,
+                        help="runs of the program cache case, 0 to skip it")
+    parser.add_argument("--output", help="JSON file to write, printed when not given")
+    parser.add_argument("--case", help=argparse.SUPPRESS) # runs a single case in this process
+    args = parser.parse_args()
+
+    if args.case:
+        case = json.loads(args.case)
+        print(json.dumps(run_program_case(case, args.sets) if case.get("kind") == "program_cache" else
+                         run_case(case, args.sets)))
+        return
+
+    results = []
+    for shape, delay, policy in itertools.product(args.shapes, args.delays, args.policies):
+        case = {"shape": shape, "size": DEFAULT_SIZES[shape], "delay": delay, "policy": policy,
+                "refresh": args.refresh}
+        result = run_isolated(case, args.sets)
+        results.append(result)
+        print("{shape} delay={delay} {policy}: ".format(**case) + (
+            "{:.1f} sets/s, GUI busy {:.0%}, latency p50 {:.1f} ms p99 {:.1f} ms, {:.0f} MB".format(
+                result["sets_per_second"], result["gui_busy_fraction"], result["latency_p50_ms"] or 0,
+                result["latency_p99_ms"] or 0, result["peak_rss_mb"] or 0) if "error" not in result
+            else "failed: " + " ".join(result["error"])), file=sys.stderr)
+
+    if args.program_runs > 0:
+        result = run_isolated({"kind": "program_cache", "runs": args.program_runs}, args.sets)
+        results.append(result)
+        print("program cache, {} runs: ".format(args.program_runs) + (
+            "rebuilt {:.2f} ms/set ({} builds), cached {:.2f} ms/set ({} builds, {} reuses), {:.1f}x".format(
+                result["rebuilt"]["ms_per_set"], result["rebuilt"]["builds"], result["cached"]["ms_per_set"],
+                result["cached"]["builds"], result["cached"]["reuses"], result["speedup"]) if "error" not in result
+            else "failed: " + " ".join(result["error"])), file=sys.stderr)
+
+    report = {"meta": {"python": platform.python_version(), "platform": platform.platform(),
+                       "date": time.strftime("%Y-%m-%dT%H:%M:%S"), "sets": args.sets}, "cases": results}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=4)
+    else:
+        print(json.dumps(report, indent=4))
+
+if __name__ == "__main__":
+    main()
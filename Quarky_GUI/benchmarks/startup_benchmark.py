@@ -0,0 +1,146 @@
+"""
+Startup benchmark of the GUI: the time from launching a Python process to the Quarky window being shown, against a
+time budget, and a profile of what is imported at startup (from python -X importtime).
+
+Every repeat is a fresh (headless, Qt offscreen) process, so each start is a cold start of the interpreter, though
+the files it reads may be in the OS cache::
+
+    python benchmarks/startup_benchmark.py --repeats 5 --budget 2.0 --output results.json
+
+run from the Quarky_GUI folder. Reported: the median and worst time to the window being shown, split into importing
+Quarky, creating the QApplication, and creating and showing the window; the modules that should only be imported on
+first use (DEFERRED) but were imported by then; and the imports of Quarky.py with their cumulative import times,
+slowest first, followed by the slowest modules by their own import time. The exit status is 1 if the median start
+exceeds the budget or a deferred module was imported at startup.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import statistics
+import subprocess
+
+QUARKY_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+
+# Modules only imported once used: qick and Pyro4 on connect, h5py on the first save or load, pyqtgraph (and numpy)
+# with the first tab, fontTools never
+DEFERRED = ("qick", "Pyro4", "h5py", "pyqtgraph", "numpy", "fontTools")
+
+def start_window():
+    """
+    Starts the GUI in this process and returns the seconds each stage of the start took.
+
+    :rtype: dict
+    """
+
+    start = time.perf_counter()
+    sys.path.insert(0, QUARKY_DIR)
+    import Quarky
+    imported = time.perf_counter()
+
+    from PyQt5.QtWidgets import QApplication
+    app = QApplication.instance() or QApplication([])
+    created = time.perf_counter()
+
+    window = Quarky.Quarky()
+    window.show()
+    app.processEvents()
+    shown = time.perf_counter()
+
+    result = {"import_s": imported - start, "qapplication_s": created - imported, "window_s": shown - created,
+              "deferred_imported": [name for name in DEFERRED if name in sys.modules]}
+    window.close()
+    return result
+
+def run_isolated(visible=False):
+    """ Starts the GUI in a fresh process and returns its timings, with the wall time from launching it. """
+
+    env = dict(os.environ) if visible else dict(os.environ, QT_QPA_PLATFORM="offscreen")
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, os.path.realpath(__file__), "--child"], cwd=QUARKY_DIR, env=env,
+                            capture_output=True, text=True)
+    wall = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else
+                           "exit code " + str(result.returncode))
+    return dict(json.loads(result.stdout.strip().splitlines()[-1]), total_s=wall)
+
+def import_profile(top=15):
+    """
+    Profiles importing Quarky with python -X importtime in a fresh process.
+
+    :param top: The number of slowest modules (by their own import time) to report.
+    :type top: int
+    :return: The direct imports of Quarky.py and the slowest modules, as lists of (module, self ms, cumulative ms).
+    :rtype: dict
+    """
+
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import Quarky"], cwd=QUARKY_DIR,
+                            env=dict(os.environ, QT_QPA_PLATFORM="offscreen"), capture_output=True, text=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2 # nesting of the import, two spaces per level
+        rows.append((name.strip(), depth, int(self_us) / 1000, int(cumulative_us) / 1000))
+
+    # A module is listed after the modules it imports, so those of Quarky follow the top level import before it
+    end = next(idx for idx, row in enumerate(rows) if row[0] == "Quarky" and row[1] == 0)
+    start = max([idx + 1 for idx, row in enumerate(rows[:end]) if row[1] == 0] + [0])
+    direct = [(name, self_ms, cumulative_ms) for name, depth, self_ms, cumulative_ms in rows[start:end] if depth == 1]
+    return {"total_ms": rows[end][3],
+            "quarky_imports": sorted(direct, key=lambda row: row[2], reverse=True),
+            "slowest_modules": sorted([(name, self_ms, cumulative_ms) for name, _, self_ms, cumulative_ms in
+                                       rows[start:end + 1]], key=lambda row: row[1], reverse=True)[:top]}
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the startup time of the GUI headlessly.")
+    parser.add_argument("--repeats", type=int, default=5, help="cold starts to time")
+    parser.add_argument("--budget", type=float, default=2.0, help="seconds the median start may take")
+    parser.add_argument("--top", type=int, default=15, help="slowest modules to list in the import profile")
+    parser.add_argument("--visible", action="store_true", help="show the window rather than using Qt offscreen")
+    parser.add_argument("--output", help="JSON file to write, printed when not given")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS) # starts the window in this process
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(start_window()))
+        return 0
+
+    starts = [run_isolated(args.visible) for _ in range(args.repeats)]
+    profile = import_profile(args.top)
+    median = statistics.median(start["total_s"] for start in starts)
+    deferred = sorted({name for start in starts for name in start["deferred_imported"]})
+
+    print("Window shown after {:.2f} s (median of {}, worst {:.2f} s), budget {:.2f} s: {}".format(
+        median, len(starts), max(start["total_s"] for start in starts), args.budget,
+        "ok" if median <= args.budget else "OVER BUDGET"), file=sys.stderr)
+    for stage in ("import_s", "qapplication_s", "window_s"):
+        print("  {:<16}{:.3f} s".format(stage[:-2], statistics.median(start[stage] for start in starts)),
+              file=sys.stderr)
+    if deferred:
+        print("Imported at startup, but should only be on first use: " + ", ".join(deferred), file=sys.stderr)
+    print("Imports of Quarky.py ({:.0f} ms in total), cumulative ms:".format(profile["total_ms"]),
+          file=sys.stderr)
+    for name, _, cumulative_ms in profile["quarky_imports"]:
+        print("  {:<40}{:8.1f}".format(name, cumulative_ms), file=sys.stderr)
+    print("Slowest modules, own ms:", file=sys.stderr)
+    for name, self_ms, _ in profile["slowest_modules"]:
+        print("  {:<40}{:8.1f}".format(name, self_ms), file=sys.stderr)
+
+    report = {"meta": {"python": platform.python_version(), "platform": platform.platform(),
+                       "date": time.strftime("%Y-%m-%dT%H:%M:%S"), "budget_s": args.budget},
+              "median_s": median, "starts": starts, "deferred_imported": deferred, "import_profile": profile}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=4)
+    else:
+        print(json.dumps(report, indent=4))
+    return 0 if median <= args.budget and not deferred else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
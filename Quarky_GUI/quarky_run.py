@@ -0,0 +1,292 @@
+"""
+=============
+quarky_run.py
+=============
+quarky-run: runs an experiment file from the command line, without the GUI, e.g. from cron or a cluster job script::
+
+    python quarky_run.py scripts/Simulation/SimulatedSpec.py --host 192.168.1.10 --set sets=50 --set reps=500
+
+run from the Quarky_GUI folder. The experiment is loaded like the GUI loads it (see ExperimentLoader), its config is
+the Base Config merged with the config_template of the experiment, then with the --config files and the --set
+overrides, in that order, and the sets are run by the same SetRunner (accumulator, retries, early stopping) and
+DataWriter as in the GUI. Neither Qt nor pyqtgraph is imported.
+
+A --config file is either a flat config, such as the .json saved next to every run file, or has the "Base Config",
+"Experiment Config", and "Run Config" sections of the config tree. Keys of the Run Config (e.g. save_policy or
+target_snr) are taken as such wherever they appear. Run files go to the same data/<experiment>/<experiment>_<date>
+folders as from the GUI, under --output (by default the current folder).
+
+Outer sweeps (the outer_sweep of the Run Config) are not run: they are run by the GUI's SweepRun, a Qt worker that
+shards their points across several boards, on threads reporting to the GUI through Qt signals. To sweep from the
+command line, call quarky-run once per point with the swept keys set, e.g. --set yokoVoltage=0.5.
+
+The exit status is 0 once the run completed (or met its target), 1 if it ended in an error, 2 for invalid arguments,
+and 130 if it was interrupted with Ctrl+C, in which case the sets acquired so far are saved.
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import datetime
+import threading
+from pathlib import Path
+
+from scripts.CoreLib.ExperimentLoader import import_file, find_experiment
+from scripts.CoreLib.SetRunner import SetRunner
+from scripts.CoreLib.socProxy import makeProxy, DEFAULT_NS_PORT, DEFAULT_SERVER_NAME
+from scripts.CoreLib.SoccfgCache import SoccfgCache, UriCache
+from scripts.CoreLib.RunFile import RunFile
+from scripts.CoreLib.DataWriter import DataWriter
+from scripts.CoreLib.NpJson import NpEncoder
+from scripts.CoreLib.Timing import RunTimer, format_duration
+from scripts.CoreLib.RuntimeEstimate import estimate_runtime
+from scripts.Init.initialize import BaseConfig, RunConfig
+
+QUARKY_DIR = os.path.dirname(os.path.realpath(__file__))
+ACCOUNT_DIR = os.path.join(QUARKY_DIR, 'accounts')
+
+logger = logging.getLogger("quarky-run")
+
+class ConsoleRun(SetRunner):
+    """
+    A SetRunner reporting its progress to the log, at most every PROGRESS_INTERVAL seconds.
+    """
+
+    PROGRESS_INTERVAL = 5.0
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.error = None
+        self.last_report = 0.0
+
+    def timing_updated(self, sets_per_second, seconds_left):
+        now = time.monotonic()
+        if now - self.last_report < self.PROGRESS_INTERVAL and self.accumulator.count < self.config["sets"]:
+            return
+        self.last_report = now
+        logger.info("Set " + str(self.accumulator.count) + "/" + str(self.config["sets"]) + ", " +
+                    "{:.3g}".format(sets_per_second) + " sets/s, " +
+                    format_duration(seconds_left if seconds_left >= 0 else None) + " left")
+
+    def error_raised(self, error):
+        self.error = error
+        logger.error("RFSoC threw the error: " + str(error))
+
+def parse_override(text):
+    """
+    Parses a --set override, key=value, the value being read as JSON where it is valid JSON (numbers, lists,
+    true/false) and as text otherwise.
+
+    :param text: The override, e.g. "ro_chs=[0, 1]".
+    :type text: str
+    :return: The key and value.
+    :rtype: tuple
+    """
+
+    key, sep, value = text.partition("=")
+    if not sep or not key.strip():
+        raise argparse.ArgumentTypeError("expected key=value, got '" + text + "'")
+    try:
+        return key.strip(), json.loads(value)
+    except ValueError:
+        return key.strip(), value.strip()
+
+def split_run_config(entries):
+    """
+    Splits config entries into those of the experiment config and those of the run config.
+
+    :param entries: The entries.
+    :type entries: dict
+    :return: The experiment config and run config entries.
+    :rtype: tuple
+    """
+
+    return ({key: value for key, value in entries.items() if key not in RunConfig},
+            {key: value for key, value in entries.items() if key in RunConfig})
+
+def build_config(config_template, config_files=(), overrides=()):
+    """
+    Merges the Base Config, the config template of the experiment, the config files, and the overrides.
+
+    :param config_template: The config_template of the experiment.
+    :type config_template: dict
+    :param config_files: Paths of JSON config files (see the module description).
+    :type config_files: list
+    :param overrides: The (key, value) pairs of the --set overrides.
+    :type overrides: list
+    :return: The config and the run config.
+    :rtype: tuple
+    """
+
+    config, run_config = BaseConfig | config_template, dict(RunConfig)
+    for path in config_files:
+        with open(path, "r") as f:
+            entries = json.load(f)
+        if "Experiment Config" in entries: # sections of the config tree
+            entries = (entries.get("Base Config", {}) | entries["Experiment Config"] |
+                       entries.get("Run Config", {}))
+        experiment_entries, run_entries = split_run_config(entries)
+        config |= experiment_entries
+        run_config |= run_entries
+
+    experiment_entries, run_entries = split_run_config(dict(overrides))
+    return config | experiment_entries, run_config | run_entries
+
+def load_account(name):
+    """
+    The connection details of an account saved by the GUI, the default account if name is None.
+
+    :param name: The account name.
+    :type name: str
+    :return: The nameserver host, port, and server name.
+    :rtype: tuple
+    """
+
+    if name is None:
+        with open(os.path.join(ACCOUNT_DIR, "default.json"), "r") as f:
+            name = json.load(f)["default_account_name"]
+    with open(os.path.join(ACCOUNT_DIR, name + ".json"), "r") as f:
+        account = json.load(f)
+    return (account["ip_address"], int(account.get("ns_port", DEFAULT_NS_PORT)),
+            account.get("server_name", DEFAULT_SERVER_NAME))
+
+def run_file_paths(output_dir, experiment_name):
+    """
+    The data and config file paths of a new run, named like the GUI names them, creating the folder.
+
+    :rtype: tuple
+    """
+
+    now = datetime.datetime.now()
+    folder = os.path.join(output_dir, "data", experiment_name, experiment_name + "_" + now.strftime("%Y_%m_%d"))
+    Path(folder).mkdir(parents=True, exist_ok=True)
+    file_name = experiment_name + "_" + now.strftime("%Y_%m_%d_%H_%M_%S")
+    return os.path.join(folder, file_name + ".h5"), os.path.join(folder, file_name + ".json")
+
+def run(runner):
+    """
+    Runs the sets on a worker thread, so that Ctrl+C stops the run at the next set (or sub-batch) rather than
+    interrupting a call to the board.
+
+    :param runner: The runner of the experiment.
+    :type runner: SetRunner
+    :return: Whether the run was interrupted.
+    :rtype: bool
+    """
+
+    thread = threading.Thread(target=runner.run, daemon=True)
+    thread.start()
+    interrupted = False
+    while thread.is_alive():
+        try:
+            thread.join(0.2)
+        except KeyboardInterrupt:
+            logger.warning("Interrupted, stopping after the current set...")
+            runner.stop()
+            interrupted = True
+    return interrupted
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="quarky-run", description="Run a Quarky experiment file without the GUI.",
+                                     epilog="Outer sweeps (outer_sweep) are not run, as they are sharded across "
+                                            "boards by the GUI's Qt worker: run once per point with --set KEY=VALUE "
+                                            "instead.")
+    parser.add_argument("experiment", help="the experiment .py file")
+    parser.add_argument("--host", help="IP address of the nameserver (by default that of --account)")
+    parser.add_argument("--port", type=int, help="port of the nameserver, default " + str(DEFAULT_NS_PORT))
+    parser.add_argument("--server", help="name of the QickSoc in the nameserver, default " + DEFAULT_SERVER_NAME)
+    parser.add_argument("--account", help="account saved by the GUI to connect with, by default the default account")
+    parser.add_argument("--config", action="append", default=[], metavar="FILE",
+                        help="JSON config file, applied in order (repeatable)")
+    parser.add_argument("--set", action="append", default=[], type=parse_override, metavar="KEY=VALUE",
+                        dest="overrides", help="config or run config entry, applied last (repeatable)")
+    parser.add_argument("--output", default=os.path.abspath(""), help="folder the data folder is created in")
+    parser.add_argument("--timeout", type=float, default=10.0, help="seconds before connecting gives up")
+    parser.add_argument("--dry-run", action="store_true", help="print the config and runtime estimate, then exit")
+    parser.add_argument("-q", "--quiet", action="store_true", help="only log warnings and errors")
+    parser.add_argument("-v", "--verbose", action="store_true", help="also log debug messages")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(format="%(asctime)s %(message)s", datefmt="%H:%M:%S",
+                        level=logging.WARNING if args.quiet else logging.DEBUG if args.verbose else logging.INFO)
+
+    # Load the experiment like the GUI does
+    experiment_path = os.path.realpath(args.experiment)
+    try:
+        experiment_module, experiment_name = import_file(experiment_path)
+    except ImportError as e:
+        parser.error("could not import " + args.experiment + ": " + str(e))
+    experiment_class, _, config_template = find_experiment(experiment_module, experiment_name)
+    if experiment_class is None:
+        parser.error("no experiment class found in " + args.experiment)
+    if config_template is None:
+        parser.error("no config_template given in the class " + experiment_name)
+
+    try:
+        config, run_config = build_config(config_template, args.config, args.overrides)
+    except (OSError, ValueError) as e:
+        parser.error("invalid config file: " + str(e))
+    if str(run_config.get("outer_sweep", "")).strip():
+        parser.error("outer sweeps are only run from the GUI, which shards their points across boards; unset "
+                     "outer_sweep and run once per point with --set KEY=VALUE instead")
+
+    estimate = estimate_runtime(config, run_config, experiment_name=experiment_class.__name__)
+    if args.dry_run:
+        print(json.dumps({"config": config, "run_config": run_config,
+                          "estimated_seconds": None if estimate is None else estimate.total_seconds},
+                         indent=4, cls=NpEncoder))
+        return 0
+    max_minutes = run_config["max_runtime_minutes"]
+    if max_minutes > 0 and estimate is not None and estimate.total_seconds > 60 * max_minutes:
+        logger.error("The run is estimated to take " + format_duration(estimate.total_seconds) +
+                     ", more than the max_runtime_minutes of " + str(max_minutes) + ".")
+        return 2
+
+    # Connect, using the configurations and URIs cached by earlier connections of the GUI or of quarky-run
+    try:
+        host, port, server = (args.host, DEFAULT_NS_PORT, DEFAULT_SERVER_NAME) if args.host else \
+            load_account(args.account)
+    except (OSError, KeyError, ValueError) as e:
+        parser.error("no --host given and no usable account: " + str(e))
+    port, server = args.port or port, args.server or server
+    try:
+        soc, soccfg = makeProxy(host, port, server, timeout=args.timeout, progress=logger.debug,
+                                cache=SoccfgCache(), uri_cache=UriCache())
+    except Exception as e:
+        logger.error("RFSoC connection to " + host + ":" + str(port) + " failed: " + str(e))
+        return 1
+    logger.info("Connected to " + server + " at " + host + ":" + str(port))
+
+    data_filename, config_filename = run_file_paths(args.output, experiment_name)
+    with open(config_filename, "w") as f:
+        json.dump(config, f, indent=4, cls=NpEncoder)
+    timer = RunTimer()
+    data_writer = DataWriter(RunFile(data_filename, config), policy=run_config["save_policy"],
+                             every_n=run_config["save_every_n_sets"],
+                             every_seconds=run_config["save_every_seconds"], timer=timer)
+    logger.info("Saving run to " + data_filename + " (" + run_config["save_policy"] + ")" +
+                ("" if estimate is None else ", estimated to take " + format_duration(estimate.total_seconds)))
+
+    runner = ConsoleRun(config, soccfg, experiment_class(soc=soc, soccfg=soccfg, cfg=config), soc,
+                        run_config=run_config, data_writer=data_writer, timer=timer)
+    interrupted = run(runner)
+    data_writer.close()
+    for e in data_writer.errors:
+        logger.error("Failed to save the run to " + data_writer.path + ": " + str(e))
+
+    table = timer.table()
+    rows = sorted(table.items(), key=lambda item: item[1]['total_s'], reverse=True)
+    logger.info("Run took " + format_duration(timer.elapsed()) + " (" + str(runner.stop_reason) + ")" +
+                (", by stage: " if rows else "") + ", ".join(
+        name + " " + "{:.1f}".format(stats['total_s']) + " s (" + str(stats['count']) + "x, " +
+        "{:.1f}".format(1000 * stats['mean_s']) + " ms)" for name, stats in rows))
+
+    if interrupted:
+        return 130
+    return 1 if runner.stop_reason == "error" or data_writer.errors else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
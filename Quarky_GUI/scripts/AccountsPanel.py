@@ -24,10 +24,12 @@ from PyQt5.QtWidgets import (
     QMessageBox,
 )
 
+from scripts.CoreLib.socProxy import DEFAULT_NS_PORT, DEFAULT_SERVER_NAME
+
 class QAccountPanel(QWidget):
 
     ### Signals
-    rfsoc_attempt_connection = pyqtSignal(str) # argument is ip_address
+    rfsoc_attempt_connection = pyqtSignal(str, str, int) # arguments are ip_address, server_name, ns_port
     rfsoc_disconnect = pyqtSignal()
 
     def __init__(self, parent=None):
@@ -38,6 +40,7 @@ class QAccountPanel(QWidget):
         self.default_account_name = None
         self.default_account_item = None
         self.connected_account_name = None
+        self.connecting = False # a connection attempt is in progress
 
         self.root_dir = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
         self.account_dir = os.path.join(self.root_dir, 'accounts')
@@ -103,6 +106,22 @@ class QAccountPanel(QWidget):
         self.ip_edit = QLineEdit()
         self.ip_edit.setObjectName("ip_edit")
         self.form_layout.setWidget(1, QFormLayout.FieldRole, self.ip_edit)
+        self.server_label = QLabel()
+        self.server_label.setText("Server")
+        self.server_label.setObjectName("server_label")
+        self.form_layout.setWidget(2, QFormLayout.LabelRole, self.server_label)
+        self.server_edit = QLineEdit()
+        self.server_edit.setObjectName("server_edit")
+        self.server_edit.setToolTip("The name the QickSoc is registered under in the nameserver.")
+        self.form_layout.setWidget(2, QFormLayout.FieldRole, self.server_edit)
+        self.port_label = QLabel()
+        self.port_label.setText("Port")
+        self.port_label.setObjectName("port_label")
+        self.form_layout.setWidget(3, QFormLayout.LabelRole, self.port_label)
+        self.port_edit = QLineEdit()
+        self.port_edit.setObjectName("port_edit")
+        self.port_edit.setToolTip("The port of the nameserver.")
+        self.form_layout.setWidget(3, QFormLayout.FieldRole, self.port_edit)
         self.accounts_layout.addLayout(self.form_layout)
 
         # Account Buttons
@@ -132,8 +151,19 @@ class QAccountPanel(QWidget):
         self.form_button_layout.addWidget(self.set_default_button)
         self.form_button_layout.addWidget(self.connect_button)
 
+        # Note shown while connected to the simulated QickSoc (see Simulation.SimulatedSoc)
+        self.simulated_label = QLabel("Simulated QickSoc: only experiments calling simulated_acquire(), such as "
+                                      "Simulation/SimulatedSpec.py, run on it. Experiments acquiring qick programs "
+                                      "(e.g. AveragerProgram) fail.")
+        self.simulated_label.setWordWrap(True)
+        self.simulated_label.setStyleSheet("font-size: 10px;")
+        self.simulated_label.setContentsMargins(5, 2, 5, 2)
+        self.simulated_label.setObjectName("simulated_label")
+        self.simulated_label.setVisible(False)
+
         # Adding all Layouts Together
         self.accounts_layout.addLayout(self.form_button_layout)
+        self.accounts_layout.addWidget(self.simulated_label)
         self.accounts_group.setLayout(self.accounts_layout)
 
         self.scroll_area_layout.addWidget(self.accounts_group)
@@ -155,6 +185,8 @@ class QAccountPanel(QWidget):
 
         self.ip_edit.textChanged.connect(self.unsaved_indicate)
         self.name_edit.textChanged.connect(self.unsaved_indicate)
+        self.server_edit.textChanged.connect(self.unsaved_indicate)
+        self.port_edit.textChanged.connect(self.unsaved_indicate)
         self.accounts_list.currentItemChanged.connect(self.select_item)
 
     def load_accounts(self):
@@ -170,7 +202,8 @@ class QAccountPanel(QWidget):
             with open(default_file, "w") as f:
                 json.dump({"default_account_name": "template"}, f, indent=4)
             with open(template_file, "w") as f:
-                json.dump({"ip_address": "111.111.1.111", "account_name": "template"}, f, indent=4)
+                json.dump({"ip_address": "111.111.1.111", "account_name": "template",
+                           "server_name": DEFAULT_SERVER_NAME, "ns_port": DEFAULT_NS_PORT}, f, indent=4)
 
         with open(default_file, "r") as f:
             data = json.load(f)
@@ -196,19 +229,26 @@ class QAccountPanel(QWidget):
         self.saved_indicate()
 
     def attempt_connection_or_disconnect(self):
-        if self.connected_account_name is None:
+        if self.connected_account_name is None and not self.connecting:
             ip_address = self.ip_edit.text().strip()
-            if ip_address and all(char.isdigit() or char == '.' for char in ip_address):
-                self.rfsoc_attempt_connection.emit(ip_address)
-            else:
+            server_name = self.server_edit.text().strip()
+            ns_port = self.port_edit.text().strip()
+            if not (ip_address and all(char.isdigit() or char == '.' for char in ip_address)):
                 QMessageBox.critical(None, "Error", "IP address " + ip_address + " invalid.")
-        else:
+            elif not server_name:
+                QMessageBox.critical(None, "Error", "Server name cannot be empty.")
+            elif not (ns_port.isdigit() and 0 < int(ns_port) < 65536):
+                QMessageBox.critical(None, "Error", "Port " + ns_port + " invalid.")
+            else:
+                self.rfsoc_attempt_connection.emit(ip_address, server_name, int(ns_port))
+        else: # disconnect, or cancel the connection attempt in progress
             self.rfsoc_disconnect.emit()
+            self.simulated_label.setVisible(False)
             self.connect_button.setText("Connect")
             self.connected_account_name = None
+            self.connecting = False
             self.load_accounts()
-            self.ip_edit.setDisabled(False)
-            self.name_edit.setDisabled(False)
+            self.set_edits_disabled(False)
             self.saved_indicate()
 
 
@@ -229,14 +269,20 @@ class QAccountPanel(QWidget):
         self.delete_button.setEnabled(False)
         self.create_new_button.setEnabled(False)
         self.set_default_button.setEnabled(False)
-        self.ip_edit.setDisabled(True)
-        self.name_edit.setDisabled(True)
+        self.set_edits_disabled(True)
+
+    def set_edits_disabled(self, disabled):
+        for edit in (self.name_edit, self.ip_edit, self.server_edit, self.port_edit):
+            edit.setDisabled(disabled)
 
     def update_account(self):
         if self.current_account_name:
             new_ip_address = self.ip_edit.text().strip()
             new_account_name = self.name_edit.text()
-            if not self.validate_account_input(new_ip_address, new_account_name, 'update'): return
+            new_server_name = self.server_edit.text().strip()
+            new_ns_port = self.port_edit.text().strip()
+            if not self.validate_account_input(new_ip_address, new_account_name, 'update',
+                                               new_server_name, new_ns_port): return
 
             # Load the existing JSON file
             file = os.path.join(self.account_dir, self.current_account_name + '.json')
@@ -245,6 +291,8 @@ class QAccountPanel(QWidget):
                     data = json.load(f)
                     data["ip_address"] = new_ip_address
                     data["account_name"] = new_account_name
+                    data["server_name"] = new_server_name
+                    data["ns_port"] = int(new_ns_port)
                 with open(file, "w") as f:
                     json.dump(data, f, indent=4)
                 new_filename = (new_account_name.strip() + ".json")
@@ -262,7 +310,8 @@ class QAccountPanel(QWidget):
                 QMessageBox.critical(None, "Error", "Error updating Json file.")
                 return
 
-    def validate_account_input(self, new_ip_address, new_account_name, purpose):
+    def validate_account_input(self, new_ip_address, new_account_name, purpose,
+                               new_server_name=DEFAULT_SERVER_NAME, new_ns_port=str(DEFAULT_NS_PORT)):
         invalid_chars = r'.\/:*?"<>| '
         if any(char in new_account_name for char in invalid_chars):
             QMessageBox.critical(None, "Error", "Invalid account name. No " + invalid_chars + "or spaces.")
@@ -273,6 +322,12 @@ class QAccountPanel(QWidget):
         if not all(part.isdigit() and 0 <= int(part) <= 255 for part in new_ip_address.split('.') if part):
             QMessageBox.critical(None, "Error", "IP address invalid.")
             return False
+        if not new_server_name:
+            QMessageBox.critical(None, "Error", "Server name cannot be empty.")
+            return False
+        if not (new_ns_port.isdigit() and 0 < int(new_ns_port) < 65536):
+            QMessageBox.critical(None, "Error", "Port must be a number between 1 and 65535.")
+            return False
 
         if purpose == 'create':
             # no duplicate account names
@@ -302,13 +357,17 @@ class QAccountPanel(QWidget):
     def create_account(self):
         new_ip_address = self.ip_edit.text().strip()
         new_account_name = self.name_edit.text()
-        if not self.validate_account_input(new_ip_address, new_account_name, 'create'): return
+        new_server_name = self.server_edit.text().strip()
+        new_ns_port = self.port_edit.text().strip()
+        if not self.validate_account_input(new_ip_address, new_account_name, 'create',
+                                           new_server_name, new_ns_port): return
 
         new_filename = (new_account_name.strip() + ".json")
         new_account_file = os.path.join(self.account_dir,new_filename)
 
         with open(new_account_file, "w") as f:
-            json.dump({"ip_address": str(new_ip_address), "account_name": str(new_account_name)}, f, indent=4)
+            json.dump({"ip_address": str(new_ip_address), "account_name": str(new_account_name),
+                       "server_name": str(new_server_name), "ns_port": int(new_ns_port)}, f, indent=4)
 
         item = QListWidgetItem(str(new_account_name))
         self.accounts_list.addItem(item)
@@ -330,6 +389,9 @@ class QAccountPanel(QWidget):
                 ip = data["ip_address"]
                 self.name_edit.setText(name)
                 self.ip_edit.setText(ip)
+                # accounts saved before the nameserver settings were added use the defaults
+                self.server_edit.setText(str(data.get("server_name", DEFAULT_SERVER_NAME)))
+                self.port_edit.setText(str(data.get("ns_port", DEFAULT_NS_PORT)))
 
             if self.connected_account_name is not None:
                 self.disable_since_connected()
@@ -358,7 +420,15 @@ class QAccountPanel(QWidget):
         self.load_accounts()
 
     def rfsoc_connection_updated(self, ip_address, status):
-        if status == 'success':
+        if status == 'connecting':
+            self.connecting = True
+            self.connect_button.setText("Cancel")
+            self.disable_since_connected()
+            return
+
+        self.connecting = False
+        self.simulated_label.setVisible(status == 'simulated')
+        if status in ('success', 'simulated'):
             self.connected_account_name = self.current_account_name
             if self.current_account_name == self.default_account_name:
                 self.current_account_item.setText('✔ ' + self.current_account_name + ' (default)')
@@ -371,6 +441,9 @@ class QAccountPanel(QWidget):
         else:
             self.connected_account_name = None
             print("Connection not successful.")
+            self.connect_button.setText("Connect")
+            self.delete_button.setEnabled(True)
+            self.set_edits_disabled(False)
             self.saved_indicate()
 
     ### Connect (give '✔ ' + ) --- add signal back that says success or not (if success, then
@@ -15,15 +15,19 @@ from PyQt5.QtWidgets import (
     QVBoxLayout,
     QAbstractItemView,
     QMessageBox,
-    QApplication
+    QApplication,
+    QLabel,
 )
 
 import scripts.Helpers as Helpers
+from scripts.CoreLib.RuntimeEstimate import estimate_runtime
+from scripts.CoreLib.Timing import format_duration
 
 class QConfigTreePanel(QTreeView):
     def __init__(self, parent=None, config=None):
         super().__init__(parent)
         self.config = config if config else {}
+        self.experiment_name = None # experiment of the config, for its calibrated runtime estimate
 
         # Set up layout
         self.toolbar_layout = QHBoxLayout()
@@ -48,6 +52,12 @@ class QConfigTreePanel(QTreeView):
         self.tree = QTreeView(self)
         self.main_layout.addWidget(self.tree)
 
+        # Estimated runtime of the config, updated on every edit
+        self.estimate_label = QLabel(self)
+        self.estimate_label.setObjectName("estimate_label")
+        self.estimate_label.setWordWrap(True)
+        self.main_layout.addWidget(self.estimate_label)
+
         # Create the model
         self.model = QtGui.QStandardItemModel()
         self.model.setHorizontalHeaderLabels(['Parameter', 'Value'])
@@ -98,11 +108,34 @@ class QConfigTreePanel(QTreeView):
             self.model.appendRow(parent)
 
         self.tree.expandAll()
-
-    def set_config(self, config_update=None):
+        self.update_estimate()
+
+    def merged_config(self):
+        """ The config the experiment would run with, as merged by Quarky.run_experiment(). """
+
+        return self.config.get("Base Config", {}) | self.config.get("Experiment Config", {})
+
+    def update_estimate(self):
+        """ Shows the estimated runtime of the current config (see estimate_runtime). """
+
+        estimate = estimate_runtime(self.merged_config(), self.config.get("Run Config"),
+                                    experiment_name=self.experiment_name)
+        if estimate is None:
+            self.estimate_label.setText("")
+            self.estimate_label.setToolTip("")
+            return
+        self.estimate_label.setText("Estimated runtime: " + format_duration(estimate.total_seconds))
+        self.estimate_label.setToolTip("Board time " + format_duration(estimate.board_seconds) + " (" +
+                                       str(estimate.shots) + " shots of " + "{:g}".format(estimate.shot_us) +
+                                       " us)\nOverhead " + format_duration(estimate.overhead_seconds) + " (" +
+                                       str(estimate.rpc_calls) + " calls of " +
+                                       "{:.3f}".format(estimate.rpc_overhead) + " s, as measured on past runs)")
+
+    def set_config(self, config_update=None, experiment_name=None):
         """Updates the config and repopulates the tree."""
         if config_update is not None:
             self.config = config_update
+        self.experiment_name = experiment_name
 
         self.populate_tree()
 
@@ -122,6 +155,7 @@ class QConfigTreePanel(QTreeView):
         if category in self.config and key in self.config[category]:
             try:
                 self.config[category][key] = type(self.config[category][key])(item.text())
+                self.update_estimate()
             except ValueError:
                 pass  # Handle invalid input types gracefully
 
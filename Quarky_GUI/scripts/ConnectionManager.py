@@ -0,0 +1,130 @@
+"""
+====================
+ConnectionManager.py
+====================
+The RFSoC connection manager, which connects to and disconnects from RFSoCs on its own thread.
+
+Connecting goes over the network (nameserver lookup, proxy creation, and fetching the board configuration), so a
+board that is down would otherwise hang the GUI for the full network timeout. The manager is moved to its own
+QThread and reports back only through signals.
+"""
+
+import threading
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from scripts.CoreLib.socProxy import makeProxy
+from scripts.CoreLib.SoccfgCache import SoccfgCache, UriCache
+from scripts.CoreLib.ProgramCache import program_cache
+
+class RFSoCConnectionManager(QObject):
+    """
+    The connection manager. Connections are requested through connect_rfsoc() and disconnect_rfsoc() as queued
+    slots (e.g. by emitting a signal connected to them), so that they run on the manager's thread.
+
+    A network call cannot be interrupted, so cancel() is called directly from the GUI thread instead: it marks the
+    attempt in progress as cancelled, the GUI moves on immediately, and the result of the attempt is discarded (and
+    its proxy released) whenever the call returns or times out.
+    """
+
+    connected = pyqtSignal(object, object, str) # Signal with the soc proxy, its QickConfig, and the ip address
+    connectionFailed = pyqtSignal(str, str) # Signal with the ip address and the error message
+    disconnected = pyqtSignal(str) # Signal with the ip address once its proxy has been released
+    progress = pyqtSignal(str, str) # Signal with the ip address and a message on the current connection step
+
+    def __init__(self, timeout=5.0, parent=None):
+        """
+        Initializes the connection manager.
+
+        :param timeout: The seconds before a connection step gives up.
+        :type timeout: float
+        :param parent: The parent QObject.
+        :type parent: QObject
+        """
+
+        super().__init__(parent)
+        self.timeout = timeout
+        self.soccfg_cache = SoccfgCache() # board configurations from earlier connections
+        self.uri_cache = UriCache() # QickSoc URIs resolved on earlier connections, per account
+        self.lock = threading.Lock()
+        self.attempt = 0 # id of the latest connection attempt, older attempts are cancelled
+
+    def new_attempt(self):
+        """
+        Starts a new connection attempt, cancelling any previous one. Called from the GUI thread before requesting a
+        connection.
+
+        :return: The id of the new attempt, to be passed to connect_rfsoc().
+        :rtype: int
+        """
+
+        with self.lock:
+            self.attempt += 1
+            return self.attempt
+
+    def cancel(self):
+        """
+        Cancels the connection attempt in progress, if any. Thread safe and returns immediately.
+        """
+
+        self.new_attempt()
+
+    def is_current(self, attempt):
+        with self.lock:
+            return attempt == self.attempt
+
+    def connect_rfsoc(self, ip_address, server_name, ns_port, attempt):
+        """
+        Connects to the RFSoC at the ip address. Runs on the manager's thread.
+
+        :param ip_address: The IP address of the RFSoC (its nameserver).
+        :type ip_address: str
+        :param server_name: The name the QickSoc is registered under in the nameserver.
+        :type server_name: str
+        :param ns_port: The port of the nameserver.
+        :type ns_port: int
+        :param attempt: The id of this attempt, from new_attempt().
+        :type attempt: int
+        """
+
+        def report(message):
+            if self.is_current(attempt):
+                self.progress.emit(ip_address, message)
+
+        try:
+            soc, soccfg = makeProxy(ip_address, ns_port=ns_port, server_name=server_name, timeout=self.timeout,
+                                    progress=report, cache=self.soccfg_cache, uri_cache=self.uri_cache)
+            str(soccfg) # verifies the configuration is complete
+        except Exception as e:
+            if self.is_current(attempt):
+                self.connectionFailed.emit(ip_address, str(e))
+            return
+
+        if self.is_current(attempt):
+            self.connected.emit(soc, soccfg, ip_address)
+        else: # cancelled while connecting
+            self.release(soc)
+
+    def disconnect_rfsoc(self, soc, soccfg, ip_address):
+        """
+        Releases the connection of a soc proxy, and the programs cached for its board (see ProgramCache.forget).
+        Runs on the manager's thread.
+
+        :param soc: The soc proxy.
+        :type soc: Pyro4.Proxy
+        :param soccfg: The qick Config of the RFSoC.
+        :type soccfg: QickConfig
+        :param ip_address: The IP address of the RFSoC.
+        :type ip_address: str
+        """
+
+        self.release(soc)
+        if soccfg is not None:
+            program_cache.forget(soccfg)
+        self.disconnected.emit(ip_address)
+
+    def release(self, soc):
+        try:
+            soc._pyroRelease()
+        except Exception:
+            pass # the connection is already gone
@@ -0,0 +1,168 @@
+import numpy as np
+
+def numeric_array(value):
+    """
+    Returns value as a numpy array if it is an array of numbers (a list of per readout channel arrays included),
+    otherwise None. Scalars such as set_num are not arrays and are passed through untouched by the accumulator.
+    """
+
+    if not isinstance(value, (list, tuple, np.ndarray)):
+        return None
+    try:
+        arr = np.asarray(value)
+    except ValueError: # ragged nesting
+        return None
+    if arr.ndim == 0 or arr.dtype.kind not in "biufc":
+        return None
+    return arr
+
+class StreamingAccumulator:
+    """
+    Running mean and variance over the sets of an experiment, using Welford's algorithm.
+
+    Every numeric array of a set's data dictionary is accumulated elementwise, so all readout channels in ro_chs and
+    every point of a sweep are covered in one vectorized update, whatever the experiment returns. The accumulator is
+    owned by the experiment worker, so the GUI only ever receives finished averages along with their standard errors.
+
+    Sets may be given a weight (e.g. the number of reps they average), in which case the weighted form of the
+    algorithm is used; with the default weight of one it reduces to the plain running mean.
+    """
+
+    def __init__(self):
+        self.count = 0 # number of sets accumulated
+        self.weight = 0.0 # total weight of the sets accumulated, equal to count unless sets are weighted
+        self.mean = {}
+        self.m2 = {} # sum of squared deviations from the mean
+        self.containers = {} # the type each key arrived as, so lists of channels are handed back as lists
+
+    def reset(self):
+        """ Forgets every set accumulated so far. """
+
+        self.count = 0
+        self.weight = 0.0
+        self.mean = {}
+        self.m2 = {}
+        self.containers = {}
+
+    def copy(self):
+        """ An independent copy of the accumulator, e.g. to add a partial set to without touching this one. """
+
+        other = StreamingAccumulator()
+        other.count = self.count
+        other.weight = self.weight
+        other.mean = {key: mean.copy() for key, mean in self.mean.items()}
+        other.m2 = {key: m2.copy() for key, m2 in self.m2.items()}
+        other.containers = dict(self.containers)
+        return other
+
+    def add(self, data, weight=1.0):
+        """
+        Accumulates one set.
+
+        :param data: The data dictionary of a set (the 'data' entry of the dictionary returned by acquire()).
+        :type data: dict
+        :param weight: The weight of the set relative to the others.
+        :type weight: float
+        """
+
+        self.count += 1
+        self.weight += weight
+        for key, value in data.items():
+            arr = numeric_array(value)
+            if arr is None:
+                continue
+            arr = arr.astype(np.result_type(arr.dtype, np.float64), copy=False)
+
+            if key not in self.mean or self.mean[key].shape != arr.shape:
+                if key in self.mean:
+                    raise ValueError("Shape of '" + key + "' changed from " + str(self.mean[key].shape) +
+                                     " to " + str(arr.shape) + " between sets.")
+                self.mean[key] = np.zeros_like(arr)
+                self.m2[key] = np.zeros(arr.shape, dtype=np.float64)
+                self.containers[key] = type(value)
+
+            mean = self.mean[key]
+            delta = arr - mean
+            mean += delta * (weight / self.weight)
+            self.m2[key] += weight * np.real(delta * np.conj(arr - mean))
+
+    def variance(self, key):
+        """
+        The sample variance of each point of an accumulated array (NaN until two sets are in).
+
+        :param key: The key of the array in the data dictionary.
+        :type key: str
+        :rtype: numpy.ndarray
+        """
+
+        if self.count < 2:
+            return np.full(self.m2[key].shape, np.nan)
+        return self.m2[key] / self.weight * self.count / (self.count - 1)
+
+    def stderr(self, key):
+        """
+        The standard error of the mean of each point of an accumulated array.
+
+        :param key: The key of the array in the data dictionary.
+        :type key: str
+        :rtype: numpy.ndarray
+        """
+
+        return np.sqrt(self.variance(key) / self.count)
+
+    def max_stderr(self, keys):
+        """
+        The largest standard error over every point of the given accumulated arrays (NaN until two sets are in).
+
+        :param keys: The keys of the arrays in the data dictionary, e.g. ('avgi', 'avgq').
+        :type keys: list
+        :rtype: float
+        """
+
+        return max(float(np.max(self.stderr(key))) for key in keys)
+
+    def snr(self, keys):
+        """
+        The signal to noise ratio of the averaged data: the contrast (peak to peak) of each array's running mean over
+        its largest standard error, taking the array with the best ratio (e.g. whichever of I and Q carries the
+        signal). The contrast of a real array is that of its values, which may cross zero, and of a complex (IQ)
+        array that of its magnitude. NaN until two sets are in.
+
+        :param keys: The keys of the arrays in the data dictionary, e.g. ('avgi', 'avgq').
+        :type keys: list
+        :rtype: float
+        """
+
+        if self.count < 2:
+            return np.nan
+        ratios = []
+        for key in keys:
+            noise = float(np.max(self.stderr(key)))
+            mean = self.mean[key]
+            signal = float(np.ptp(np.abs(mean) if np.iscomplexobj(mean) else mean))
+            ratios.append(signal / noise if noise > 0 else np.inf)
+        return max(ratios)
+
+    def snapshot(self, data):
+        """
+        Builds the dictionary handed to the GUI: a copy of the latest set with each accumulated array replaced by its
+        running mean, plus an 'errors' dictionary holding the standard error of each of those arrays.
+
+        :param data: The full dictionary of the latest set as returned by acquire().
+        :type data: dict
+        :return: The averaged data dictionary, safe to pass to another thread.
+        :rtype: dict
+        """
+
+        snapshot = dict(data)
+        snapshot['data'] = dict(data['data'])
+        snapshot['errors'] = {}
+        for key, mean in self.mean.items():
+            averaged = mean.copy()
+            errors = self.stderr(key)
+            if issubclass(self.containers[key], (list, tuple)): # keep a list of readout channels a list
+                averaged, errors = list(averaged), list(errors)
+            snapshot['data'][key] = averaged
+            snapshot['errors'][key] = errors
+        snapshot['sets_averaged'] = self.count
+        return snapshot
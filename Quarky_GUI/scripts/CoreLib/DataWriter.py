@@ -0,0 +1,270 @@
+import os
+import queue
+import tempfile
+import threading
+import time
+from collections import deque
+
+class DataWriter(threading.Thread):
+    """
+    Writes a RunFile on a background thread, so that slow disks and network shares never stall the experiment worker
+    or the GUI.
+
+    Sets are handed over through append_set() (the same call as on a RunFile) into a bounded queue; when the queue is
+    full the caller waits, rather than memory growing without bound. Every set is kept, but how often the queued
+    sets are actually written to disk is set by the save policy:
+
+    * "every_set": write each set as it arrives.
+    * "every_n_sets": write once every_n sets have been queued.
+    * "every_t_seconds": write at most once every every_seconds seconds.
+    * "end_of_run": write everything when the writer is closed. Until then the sets are spooled to a temporary run
+      file on the local disk, so that they are not all held in memory.
+
+    Sets stay pending until they are written: a write that fails is retried with the next one, and whatever could not
+    be written is reported in errors once the writer is closed (with the path of the spool file, which is then kept).
+
+    close() always writes whatever is still pending before closing the file, followed by the timing table of the
+    run if the writer was given a RunTimer (the writes themselves are timed as its 'save' stage). It either waits for
+    the writer thread, or returns straight away and calls back once the file is closed, e.g. from the GUI thread.
+    """
+
+    POLICIES = ("every_set", "every_n_sets", "every_t_seconds", "end_of_run")
+
+    def __init__(self, run_file, policy="every_set", every_n=10, every_seconds=30.0, max_queue=64, timer=None):
+        """
+        Initializes and starts the writer thread.
+
+        :param run_file: The open run file to write to. It is closed by the writer.
+        :type run_file: RunFile
+        :param policy: The save policy, one of DataWriter.POLICIES.
+        :type policy: str
+        :param every_n: The number of sets per write of the "every_n_sets" policy.
+        :type every_n: int
+        :param every_seconds: The minimum time between writes of the "every_t_seconds" policy.
+        :type every_seconds: float
+        :param max_queue: The most sets waiting to be handed to the writer.
+        :type max_queue: int
+        :param timer: The timer of the run, if any.
+        :type timer: RunTimer
+        """
+
+        super().__init__(daemon=True)
+        if policy not in self.POLICIES:
+            raise ValueError("Unknown save policy '" + str(policy) + "', expected one of " + str(self.POLICIES))
+
+        self.run_file = run_file
+        self.path = run_file.path
+        self.policy = policy
+        self.every_n = max(int(every_n), 1)
+        self.every_seconds = float(every_seconds)
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.errors = [] # exceptions raised while writing, reported by whoever closes the writer
+        self.lock = threading.Lock()
+        self.timer = timer
+        self.on_closed = None # called on the writer thread once the file is closed, see close()
+        self.closed = False
+
+        self.pending_sets = deque() # raw sets received but not yet written
+        self.spool = None # the temporary RunFile the sets of an end_of_run run are spooled to
+        self.pending_snapshot = None # latest averaged data not yet written
+        self.last_write = time.monotonic()
+
+        self.start()
+
+    def append_set(self, raw, snapshot=None):
+        """
+        Hands a set over to the writer. Thread safe; waits while the queue is full.
+
+        :param raw: The data dictionary of the set.
+        :type raw: dict
+        :param snapshot: The averaged data dictionary of the run so far.
+        :type snapshot: dict
+        """
+
+        self.queue.put(("set", raw, snapshot))
+
+    def set_attrs(self, attrs, group=None):
+        """
+        Hands attributes for the run file over to the writer. Thread safe.
+
+        :param attrs: The attributes to store.
+        :type attrs: dict
+        :param group: The group to store them on, None for the file itself (see RunFile.set_attrs).
+        :type group: str
+        """
+
+        self.queue.put(("attrs", attrs, group))
+
+    def write_sweep(self, sweep):
+        """
+        Hands the axes of the run's outer sweep over to the writer. Thread safe.
+
+        :param sweep: The sweep.
+        :type sweep: Sweep
+        """
+
+        self.queue.put(("sweep", sweep))
+
+    def write_point(self, index, snapshot=None, attrs=None):
+        """
+        Hands the result of a finished point of the outer sweep over to the writer, which writes it right away
+        whatever the save policy (see RunFile.write_point). Thread safe.
+
+        :param index: The grid index of the point.
+        :type index: tuple
+        :param snapshot: The averaged data dictionary of the point.
+        :type snapshot: dict
+        :param attrs: The numeric attributes of the point.
+        :type attrs: dict
+        """
+
+        self.queue.put(("point", index, snapshot, attrs))
+
+    def close(self, timeout=None, on_closed=None):
+        """
+        Writes everything still pending, closes the run file, and waits for the writer thread to finish, unless
+        on_closed is given.
+
+        :param timeout: The most seconds to wait for the writer, None waits until done.
+        :type timeout: float
+        :param on_closed: If given, close() returns without waiting, and on_closed() is called on the writer thread
+            once the file is closed (right away if it already is).
+        :type on_closed: callable
+        :return: Whether the writer finished within the timeout, or was already finished if not waiting.
+        :rtype: bool
+        """
+
+        if on_closed is not None:
+            with self.lock:
+                done = self.closed
+                if not done:
+                    self.on_closed = on_closed
+            if done:
+                on_closed()
+                return True
+            try:
+                self.queue.put_nowait(("close",))
+            except queue.Full: # hand the request over without waiting for the writer to catch up
+                threading.Thread(target=self.queue.put, args=(("close",),), daemon=True).start()
+            return False
+
+        if self.is_alive():
+            self.queue.put(("close",))
+            self.join(timeout)
+        return not self.is_alive()
+
+    def run(self):
+        """ The writer loop. """
+
+        while True:
+            item = self.queue.get()
+            if item[0] == "close":
+                try:
+                    self.write_pending()
+                    if self.timer is not None:
+                        self.run_file.write_timing(self.timer.table(),
+                                                   {'sets_per_second': self.timer.sets_per_second(),
+                                                    'elapsed_s': self.timer.elapsed()})
+                except Exception as e:
+                    self.errors.append(e)
+                self.run_file.close()
+                self.report_unwritten()
+                with self.lock:
+                    on_closed, self.on_closed = self.on_closed, None
+                    self.closed = True
+                if on_closed is not None:
+                    on_closed()
+                return
+
+            try:
+                if item[0] == "set":
+                    self.pending_sets.append(item[1])
+                    if item[2] is not None:
+                        self.pending_snapshot = item[2]
+                    if self.policy == "end_of_run":
+                        self.spool_pending()
+                    elif self.write_due():
+                        self.write_pending()
+                elif item[0] == "attrs":
+                    self.run_file.set_attrs(item[1], item[2])
+                elif item[0] == "sweep":
+                    self.run_file.write_sweep(item[1])
+                elif item[0] == "point":
+                    start = time.perf_counter()
+                    self.run_file.write_point(item[1], item[2], item[3])
+                    if self.timer is not None:
+                        self.timer.record('save', time.perf_counter() - start)
+            except Exception as e:
+                self.errors.append(e)
+
+    def write_due(self):
+        """ Whether the save policy calls for the pending sets to be written now. """
+
+        if self.policy == "every_set":
+            return True
+        if self.policy == "every_n_sets":
+            return len(self.pending_sets) >= self.every_n
+        if self.policy == "every_t_seconds":
+            return time.monotonic() - self.last_write >= self.every_seconds
+        return False
+
+    def write_pending(self):
+        """ Writes the spooled and pending sets and the latest average, keeping whatever fails to be written. """
+
+        start = time.perf_counter()
+        written = len(self.pending_sets)
+        if self.spool is not None:
+            written += self.spool.sets_written
+            self.run_file.append_history(self.spool)
+            self.discard_spool()
+        self.append_pending(self.run_file)
+        if self.pending_snapshot is not None:
+            self.run_file.write_average(self.pending_snapshot)
+            self.pending_snapshot = None
+        self.last_write = time.monotonic()
+        if self.timer is not None and written:
+            self.timer.record('save', time.perf_counter() - start)
+
+    def append_pending(self, run_file):
+        """
+        Appends the pending sets to a run file, each one leaving the pending sets only once it is written.
+
+        :param run_file: The run file, or the spool.
+        :type run_file: RunFile
+        """
+
+        while self.pending_sets:
+            run_file.append_set(self.pending_sets[0])
+            self.pending_sets.popleft()
+
+    def spool_pending(self):
+        """ Moves the pending sets to the spool, created in the temporary folder on the first set. """
+
+        from .RunFile import RunFile
+
+        start = time.perf_counter()
+        if self.spool is None:
+            fd, path = tempfile.mkstemp(prefix="quarky_spool_", suffix=".h5")
+            os.close(fd)
+            self.spool = RunFile(path)
+        self.append_pending(self.spool)
+        if self.timer is not None:
+            self.timer.record('save', time.perf_counter() - start)
+
+    def discard_spool(self):
+        self.spool.close()
+        try:
+            os.remove(self.spool.path)
+        except OSError:
+            pass
+        self.spool = None
+
+    def report_unwritten(self):
+        """ Adds an error for the sets that could not be written once the run file is closed. """
+
+        if self.pending_sets:
+            self.errors.append(RuntimeError(str(len(self.pending_sets)) + " set(s) could not be written."))
+        if self.spool is not None:
+            self.spool.close()
+            self.errors.append(RuntimeError(str(self.spool.sets_written) + " set(s) could not be written, they are "
+                                            "kept in " + self.spool.path + "."))
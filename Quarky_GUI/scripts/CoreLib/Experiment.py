@@ -5,6 +5,9 @@ import h5py
 import datetime
 from pathlib import Path
 
+from .NpJson import NpEncoder
+from .ProgramCache import program_cache
+
 class MakeFile(h5py.File):
     def __init__(self, *args, **kwargs):
         h5py.File.__init__(self, *args, **kwargs)
@@ -35,19 +38,22 @@ class MakeFile(h5py.File):
                                 dtype=str(data.astype(np.float64).dtype))
         self[key][...] = data
 
-class NpEncoder(json.JSONEncoder):
-    """ Ensure json dump can handle np arrays """
-    def default(self, obj):
-        if isinstance(obj, np.integer):
-            return int(obj)
-        if isinstance(obj, np.floating):
-            return float(obj)
-        if isinstance(obj, np.ndarray):
-            return obj.tolist()
-        return super(NpEncoder, self).default(obj)
-
 class ExperimentClass:
-    """Base class for all experiments"""
+    """Base class for all experiments
+
+    Programs are best built through program() (and other host side work that only depends on the config, such as
+    waveform tables, through cached()) rather than directly, e.g. in acquire()::
+
+        prog = self.program(LoopbackProgram) # rather than LoopbackProgram(self.soccfg, self.cfg)
+        avgi, avgq = prog.acquire(self.soc, load_pulses=True)
+
+    They are then built and compiled once per config and board, and reused by every set and run with the same
+    program-relevant config (see ProgramCache), as a new experiment instance is created for every run. The config
+    keys the programs depend on are program_keys, by default all of them but PROGRAM_EXCLUDED_KEYS.
+    """
+
+    program_keys = None # the config keys the programs of the experiment depend on, None for all
+    PROGRAM_EXCLUDED_KEYS = ("sets",) # config keys of the set loop, which no program depends on
 
     def __init__(self, path='', outerFolder='',
                     prefix='data', soc=None, soccfg=None, cfg = None, config_file=None,
@@ -82,12 +88,8 @@ class ExperimentClass:
         # self.dataserver= dataserver_client()
 
         ##### check to see if the file path exists
-        DataFolderBool = Path(self.outerFolder + self.path).is_dir()
-        if DataFolderBool == False:
-            os.mkdir(self.outerFolder + self.path)
-        DataSubFolderBool = Path(os.path.join(self.outerFolder + self.path, self.path + "_" + datestring)).is_dir()
-        if DataSubFolderBool == False:
-            os.mkdir(os.path.join(self.outerFolder + self.path, self.path + "_" + datestring))
+        self.data_folder = os.path.join(self.outerFolder + self.path, self.path + "_" + datestring)
+        Path(self.data_folder).mkdir(parents=True, exist_ok=True)
 
         self.fname = os.path.join(self.outerFolder + self.path, self.path + "_" + datestring, self.path + "_"+datetimestring + "_" + self.prefix + '.h5')
         self.iname = os.path.join(self.outerFolder + self.path, self.path + "_" + datestring, self.path + "_"+datetimestring + "_" + self.prefix + '.png')
@@ -120,6 +122,40 @@ class ExperimentClass:
     #         print("Could not load config.")
     #         traceback.print_exc()
 
+    def program(self, program_class, cfg=None):
+        """
+        The program_class(soccfg, cfg) program for the config, built (and compiled) once per program-relevant config
+        and board, reused from the program cache after that.
+
+        :param program_class: The QICK program class, e.g. a subclass of AveragerProgram.
+        :type program_class: type
+        :param cfg: The config to build it for, by default that of the experiment.
+        :type cfg: dict
+        :return: The program.
+        """
+
+        cfg = self.cfg if cfg is None else cfg
+        return program_cache.get(self.soccfg, program_class, cfg, lambda: program_class(self.soccfg, cfg),
+                                 keys=self.program_keys, exclude=self.PROGRAM_EXCLUDED_KEYS)
+
+    def cached(self, name, build, cfg=None):
+        """
+        A value built on the host from the program-relevant config, e.g. a waveform table, built once per config and
+        board like the programs (see program()).
+
+        :param name: The name of the value, unique within the experiment class.
+        :type name: str
+        :param build: Builds the value, called without arguments.
+        :type build: callable
+        :param cfg: The config it is built from, by default that of the experiment.
+        :type cfg: dict
+        :return: The value.
+        """
+
+        cfg = self.cfg if cfg is None else cfg
+        return program_cache.get(self.soccfg, (type(self), name), cfg, build, keys=self.program_keys,
+                                 exclude=self.PROGRAM_EXCLUDED_KEYS)
+
     def save_config(self):
         if self.cname[:-3] != '.h5':
             with open(self.cname, 'w') as fid:
@@ -0,0 +1,239 @@
+import os
+import ast
+import json
+import operator
+import threading
+
+from .NpJson import NpEncoder
+from .SoccfgCache import DEFAULT_CACHE_DIR
+
+_OPERATORS = {ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul, ast.Div: operator.truediv,
+              ast.FloorDiv: operator.floordiv, ast.Mod: operator.mod, ast.Pow: operator.pow,
+              ast.USub: operator.neg, ast.UAdd: operator.pos}
+
+def literal_value(node):
+    """
+    The value of a literal expression of the source, as ast.literal_eval, also working out arithmetic on numbers
+    (e.g. 2869 - 10), as config templates often have.
+
+    :param node: The expression.
+    :type node: ast.AST
+    :return: The value.
+    :raises ValueError: If the expression is not a literal.
+    """
+
+    if isinstance(node, ast.Constant):
+        return node.value
+    if isinstance(node, (ast.List, ast.Tuple)):
+        return [literal_value(element) for element in node.elts]
+    if isinstance(node, ast.Dict) and None not in node.keys:
+        return {literal_value(key): literal_value(value) for key, value in zip(node.keys, node.values)}
+    if isinstance(node, ast.UnaryOp) and type(node.op) in _OPERATORS:
+        operand = literal_value(node.operand)
+        if isinstance(operand, (int, float)):
+            return _OPERATORS[type(node.op)](operand)
+    if isinstance(node, ast.BinOp) and type(node.op) in _OPERATORS:
+        left, right = literal_value(node.left), literal_value(node.right)
+        if isinstance(left, (int, float)) and isinstance(right, (int, float)) and \
+                not (isinstance(node.op, ast.Pow) and abs(right) > 100):
+            try:
+                return _OPERATORS[type(node.op)](left, right)
+            except ArithmeticError:
+                pass
+    raise ValueError("not a literal: " + ast.dump(node)[:60])
+
+def scan_file(path):
+    """
+    Reads what the experiment library shows of an experiment file from its source, without importing it: the classes
+    deriving directly from ExperimentClass, whether one of them has a plotter, and the config_template of the class
+    named after the file (see find_experiment, which does the same on the imported module).
+
+    The config_template is kept if it is a dictionary, with the source text of the values that are not literals (see
+    literal_value), has_config_template tells whether one is given.
+
+    :param path: The path of the .py file.
+    :type path: str
+    :return: The entry of the file, with an 'error' if it could not be read or parsed.
+    :rtype: dict
+    """
+
+    name = os.path.splitext(os.path.basename(path))[0]
+    entry = {'path': path, 'name': name, 'experiment_classes': [], 'has_plotter': False,
+             'has_config_template': False, 'config_template': None, 'error': None}
+    try:
+        with open(path, 'rb') as f:
+            tree = ast.parse(f.read(), filename=path)
+    except (OSError, SyntaxError, ValueError) as e:
+        entry['error'] = str(e)
+        return entry
+
+    for node in tree.body:
+        if not isinstance(node, ast.ClassDef):
+            continue
+        bases = [base.id if isinstance(base, ast.Name) else base.attr if isinstance(base, ast.Attribute) else None
+                 for base in node.bases]
+        members = {}
+        for item in node.body:
+            if isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                members[item.name] = item
+            elif isinstance(item, ast.Assign):
+                members.update({target.id: item.value for target in item.targets if isinstance(target, ast.Name)})
+            elif isinstance(item, ast.AnnAssign) and isinstance(item.target, ast.Name) and item.value is not None:
+                members[item.target.id] = item.value
+
+        if bases and bases[0] == "ExperimentClass":
+            entry['experiment_classes'].append(node.name)
+            entry['has_plotter'] = entry['has_plotter'] or "plotter" in members
+        if node.name == name and "config_template" in members:
+            entry['has_config_template'] = True
+            node_template = members["config_template"]
+            if isinstance(node_template, ast.Dict) and None not in node_template.keys:
+                template = {}
+                for key, value in zip(node_template.keys, node_template.values):
+                    try:
+                        template[str(literal_value(key))] = literal_value(value)
+                    except (ValueError, TypeError, RecursionError):
+                        template[ast.unparse(key)] = ast.unparse(value)
+                entry['config_template'] = template
+    return entry
+
+class ExperimentIndex:
+    """
+    A persistent index of the experiment files in the library folders, kept in cache/experiment_index.json so that
+    the library is listed straight away when the GUI starts, and only the files that changed since are read again.
+
+    A file is taken as unchanged while its modification time and size are. Files are read as source (see scan_file),
+    experiment modules are only imported once opened. Every method is thread safe, scanning is meant to be done off
+    the GUI thread.
+    """
+
+    VERSION = 1 # entries of an index written by another version are read again
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR):
+        """
+        Loads the index.
+
+        :param cache_dir: The folder of the index file.
+        :type cache_dir: str
+        """
+
+        self.cache_dir = cache_dir
+        self.path = os.path.join(cache_dir, 'experiment_index.json')
+        self.directories = []
+        self.entries = {} # real path -> entry (see scan_file), with the 'mtime_ns' and 'size' it was read at
+        self.lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, 'r') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return
+        self.directories = state.get('directories', [])
+        if state.get('version') == self.VERSION:
+            self.entries = state.get('entries', {})
+
+    def save(self):
+        with self.lock:
+            state = {'version': self.VERSION, 'directories': list(self.directories), 'entries': dict(self.entries)}
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(self.path + '.tmp', 'w') as f:
+            json.dump(state, f, indent=4, cls=NpEncoder)
+        os.replace(self.path + '.tmp', self.path)
+
+    def add_directory(self, directory):
+        """
+        Adds a library folder, its experiment files (and those of its subfolders) are indexed on the next scan.
+
+        :param directory: The folder.
+        :type directory: str
+        :return: Whether it was added, False if it already was.
+        :rtype: bool
+        """
+
+        directory = os.path.realpath(directory)
+        with self.lock:
+            if directory in self.directories:
+                return False
+            self.directories.append(directory)
+        self.save()
+        return True
+
+    def remove_directory(self, directory):
+        """ Removes a library folder, its files are dropped from the index on the next scan. """
+
+        with self.lock:
+            if directory not in self.directories:
+                return False
+            self.directories.remove(directory)
+        self.save()
+        return True
+
+    def files(self):
+        """
+        The .py files of the library folders and their subfolders, skipping __init__.py and hidden and __pycache__
+        folders.
+
+        :return: The real paths of the files.
+        :rtype: list
+        """
+
+        with self.lock:
+            directories = list(self.directories)
+        paths = []
+        for directory in directories:
+            for root, dirs, files in os.walk(directory):
+                dirs[:] = sorted(d for d in dirs if not d.startswith(".") and d != "__pycache__")
+                paths.extend(os.path.realpath(os.path.join(root, file)) for file in sorted(files)
+                             if file.endswith(".py") and file != "__init__.py")
+        return list(dict.fromkeys(paths)) # folders may overlap
+
+    def scan(self, cancelled=None):
+        """
+        Brings the index up to date with the library folders: new and changed files are read, the entries of files
+        that are gone are dropped, and the index is saved if anything changed.
+
+        :param cancelled: Called between files, the scan stops (and saves what it read) once it returns True.
+        :type cancelled: callable
+        :return: The number of files read and the number of entries dropped.
+        :rtype: tuple
+        """
+
+        paths, read, gone = self.files(), 0, set()
+        for path in paths:
+            if cancelled is not None and cancelled():
+                break
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            with self.lock:
+                entry = self.entries.get(path)
+            if entry is not None and (entry['mtime_ns'], entry['size']) == (stat.st_mtime_ns, stat.st_size):
+                continue
+            entry = dict(scan_file(path), mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+            with self.lock:
+                self.entries[path] = entry
+            read += 1
+        else: # only drop entries once every file was seen
+            with self.lock:
+                gone = set(self.entries) - set(paths)
+                for path in gone:
+                    del self.entries[path]
+
+        if read or gone:
+            self.save()
+        return read, len(gone)
+
+    def experiments(self):
+        """
+        The entries of the experiment files, those with an experiment class or a config_template, by name.
+
+        :rtype: list
+        """
+
+        with self.lock:
+            entries = list(self.entries.values())
+        return sorted([entry for entry in entries if entry['experiment_classes'] or entry['has_config_template']],
+                      key=lambda entry: (entry['name'].lower(), entry['path']))
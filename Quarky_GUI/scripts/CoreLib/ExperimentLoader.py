@@ -0,0 +1,156 @@
+import os
+import sys
+import inspect
+import hashlib
+import weakref
+import threading
+import importlib.util
+
+from .ProgramCache import program_cache
+
+class ExperimentRegistry:
+    """
+    The experiment modules loaded so far, keyed by the real path of their file, so that loading a file again only
+    executes it if it changed since. A file is taken as unchanged while its modification time and size are, and
+    otherwise compared by the SHA-256 of its contents (e.g. after it was touched or checked out again).
+    """
+
+    def __init__(self):
+        self.entries = {} # real path -> {path, name, module, mtime_ns, size, sha256}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def file_digest(path):
+        with open(path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+
+    def changed(self, path):
+        """
+        Whether a file changed on disk since it was last loaded, from its modification time and size only.
+
+        :param path: The path of the .py file.
+        :type path: str
+        :return: True if it changed or was never loaded, False otherwise.
+        :rtype: bool
+        """
+
+        entry = self.entries.get(os.path.realpath(path))
+        if entry is None:
+            return True
+        try:
+            stat = os.stat(entry["path"])
+        except OSError:
+            return True
+        return (stat.st_mtime_ns, stat.st_size) != (entry["mtime_ns"], entry["size"])
+
+    def load(self, path):
+        """
+        The module of an experiment file, executed again only if the file changed since it was last loaded. The
+        module is named after the file and registered in sys.modules, so that pickling and inspect find it. If
+        executing a changed file fails, the module loaded before is kept (and the error raised); otherwise the entries
+        its classes built in the program cache are dropped (see ProgramCache.forget_classes).
+
+        :param path: The path of the .py file.
+        :type path: str
+        :return: The module and its name.
+        :rtype: tuple
+        """
+
+        real_path = os.path.realpath(path)
+        stat = os.stat(real_path)
+        with self.lock:
+            entry = self.entries.get(real_path)
+            if entry is not None and (stat.st_mtime_ns, stat.st_size) == (entry["mtime_ns"], entry["size"]):
+                return entry["module"], entry["name"]
+
+            digest = self.file_digest(real_path)
+            if entry is not None and digest == entry["sha256"]: # touched, but the same code
+                entry.update(mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+                return entry["module"], entry["name"]
+
+            module_name = os.path.splitext(os.path.basename(real_path))[0]
+            spec = importlib.util.spec_from_file_location(module_name, real_path)
+            module_obj = importlib.util.module_from_spec(spec)
+            previous = sys.modules.get(module_name)
+            sys.modules[module_name] = module_obj
+            try:
+                spec.loader.exec_module(module_obj)
+            except BaseException:
+                if previous is None:
+                    sys.modules.pop(module_name, None)
+                else:
+                    sys.modules[module_name] = previous
+                raise
+            module_obj.__file__ = path
+
+            if entry is not None: # the programs built by its classes are never used again
+                program_cache.forget_classes(entry["module"])
+            self.entries[real_path] = {"path": real_path, "name": module_name, "module": module_obj,
+                                       "mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "sha256": digest}
+            return module_obj, module_name
+
+    def forget(self, path):
+        """ Drops a file from the registry, so that it is executed again when next loaded. """
+
+        with self.lock:
+            self.entries.pop(os.path.realpath(path), None)
+
+# The registry of the process, shared by the GUI tabs, the run queue, and quarky-run
+experiment_registry = ExperimentRegistry()
+
+# What find_experiment found in each module, per experiment name, dropped with the module once it is replaced
+_discovered = weakref.WeakKeyDictionary()
+
+def import_file(full_path_to_module):
+    """
+    Imports an experiment file as a module named after the file, through the experiment registry: a file that did
+    not change since it was last imported is not executed again, and the same module is returned.
+
+    :param full_path_to_module: The path of the .py file.
+    :type full_path_to_module: str
+    :return: The module and its name.
+    :rtype: tuple
+    """
+
+    try:
+        return experiment_registry.load(full_path_to_module)
+    except Exception as e:
+        raise ImportError(e)
+
+def find_experiment(experiment_module, experiment_name):
+    """
+    Finds what the GUI needs from an experiment module: the experiment class (the class deriving directly from
+    ExperimentClass), its plotter function, and the config_template of the class named after the module.
+
+    Classes are matched on the name of their base rather than with issubclass, as experiment files may inherit from
+    their own copy of ExperimentClass.
+
+    What is found is cached per module, a module loaded again after its file changed being searched anew.
+
+    :param experiment_module: The module of the experiment file.
+    :type experiment_module: module
+    :param experiment_name: The name of the module (see import_file).
+    :type experiment_name: str
+    :return: The experiment class, its plotter, and the config template, each None if not found.
+    :rtype: tuple
+    """
+
+    found = _discovered.get(experiment_module, {})
+    if experiment_name in found:
+        return found[experiment_name]
+
+    from .Experiment import ExperimentClass # imports h5py, which experiment files import anyway
+
+    experiment_class, experiment_plotter, config_template = None, None, None
+    for name, obj, in inspect.getmembers(experiment_module):
+        if inspect.isclass(obj) and obj.__bases__[0].__name__ == "ExperimentClass" and obj is not ExperimentClass:
+            experiment_class = obj
+            plotter = getattr(obj, "plotter", None)
+            experiment_plotter = plotter if callable(plotter) else None
+
+        if name == experiment_name:
+            config_template = getattr(obj, "config_template", None)
+
+    found[experiment_name] = (experiment_class, experiment_plotter, config_template)
+    _discovered[experiment_module] = found
+    return found[experiment_name]
@@ -0,0 +1,165 @@
+import json
+import math
+import numpy as np
+import h5py
+
+class DatasetProxy:
+    """
+    A stand-in for an HDF5 dataset that reads nothing until it is indexed.
+
+    Datasets stored contiguously and uncompressed (the h5py default for non-resizable datasets) are memory mapped, so
+    a slice only touches the pages it needs; any other dataset is read through h5py, which also only reads the
+    requested selection.
+    """
+
+    def __init__(self, lazy_file, name, dataset):
+        """
+        Initializes the proxy from an open h5py dataset.
+
+        :param lazy_file: The LazyFile the dataset belongs to.
+        :type lazy_file: LazyFile
+        :param name: The full path of the dataset within the file.
+        :type name: str
+        :param dataset: The dataset.
+        :type dataset: h5py.Dataset
+        """
+
+        self.lazy_file = lazy_file
+        self.name = name
+        self.shape = dataset.shape
+        self.dtype = dataset.dtype
+        self.attrs = dict(dataset.attrs)
+        self.memmap = None
+
+        offset = dataset.id.get_offset()
+        if (dataset.chunks is None and dataset.compression is None and offset is not None
+                and self.dtype.kind in "biufc" and len(self.shape) > 0):
+            self.memmap = np.memmap(lazy_file.path, dtype=self.dtype, mode='r', offset=offset, shape=self.shape)
+
+    @property
+    def ndim(self):
+        return len(self.shape)
+
+    @property
+    def size(self):
+        return math.prod(self.shape)
+
+    @property
+    def nbytes(self):
+        return self.size * self.dtype.itemsize
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __getitem__(self, key):
+        """ Reads a selection of the dataset into memory. """
+
+        if self.memmap is not None:
+            return np.array(self.memmap[key])
+        return self.lazy_file.file[self.name][key]
+
+    def __array__(self, dtype=None, copy=None):
+        data = self[()]
+        return data if dtype is None else data.astype(dtype)
+
+    def __repr__(self):
+        return "<DatasetProxy '" + self.name + "' shape " + str(self.shape) + " " + str(self.dtype) + ">"
+
+    def decimated(self, max_points, leading=()):
+        """
+        Reads the dataset with a stride on each axis, so that no axis has more than max_points points. This is
+        what a plot can show anyway, and reading it costs the same however large the dataset is.
+
+        :param max_points: The most points to read along each axis.
+        :type max_points: int
+        :param leading: Indices fixing the first axes (e.g. (0, 0) for the first readout channel of avgi).
+        :type leading: tuple
+        :rtype: numpy.ndarray
+        """
+
+        steps = [max(1, math.ceil(n / max_points)) for n in self.shape[len(leading):]]
+        return self[tuple(leading) + tuple(slice(None, None, step) for step in steps)]
+
+class LazyFile:
+    """
+    A data file opened without reading its data: every dataset, including those inside groups, is exposed as a
+    DatasetProxy with its shape and dtype, and the attributes of the file and of its groups are loaded (they are
+    small). Opening a file therefore takes the same time however large its datasets are.
+    """
+
+    def __init__(self, path):
+        """
+        Opens the file read-only and indexes its contents.
+
+        :param path: The path of the .h5 file.
+        :type path: str
+        """
+
+        self.path = path
+        self.file = h5py.File(path, 'r')
+        self.datasets = {} # full path -> DatasetProxy
+        self.groups = {} # full path -> attributes of the group
+        self.attrs = self.decode_attrs(self.file.attrs)
+
+        def index(name, obj):
+            if isinstance(obj, h5py.Dataset):
+                self.datasets[name] = DatasetProxy(self, name, obj)
+            elif isinstance(obj, h5py.Group):
+                self.groups[name] = self.decode_attrs(obj.attrs)
+        self.file.visititems(index)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __getitem__(self, name):
+        return self.datasets[name]
+
+    def __contains__(self, name):
+        return name in self.datasets
+
+    def keys(self):
+        return self.datasets.keys()
+
+    def group(self, name=""):
+        """
+        The datasets directly inside a group, keyed by their name within the group.
+
+        :param name: The path of the group, "" for the top level of the file.
+        :type name: str
+        :rtype: dict
+        """
+
+        prefix = name.strip("/") + "/" if name.strip("/") else ""
+        return {key[len(prefix):]: proxy for key, proxy in self.datasets.items()
+                if key.startswith(prefix) and "/" not in key[len(prefix):]}
+
+    def config(self):
+        """ The config stored with the run, or None. """
+
+        config = self.attrs.get('config')
+        return config if isinstance(config, dict) else None
+
+    def decode_attrs(self, attrs):
+        """ Copies h5py attributes into a dict, decoding the json encoded ones. """
+
+        decoded = {}
+        for key, value in attrs.items():
+            if isinstance(value, bytes):
+                value = value.decode()
+            if isinstance(value, str):
+                try:
+                    value = json.loads(value)
+                except ValueError:
+                    pass
+            decoded[key] = value
+        return decoded
+
+    def close(self):
+        for proxy in self.datasets.values():
+            proxy.memmap = None
+        if self.file:
+            self.file.close()
+            self.file = None
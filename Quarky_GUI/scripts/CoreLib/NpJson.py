@@ -0,0 +1,13 @@
+import json
+
+class NpEncoder(json.JSONEncoder):
+    """ Ensure json dump can handle np arrays """
+    def default(self, obj):
+        import numpy as np # only reached for objects json cannot encode, so modules dumping plain dicts skip numpy
+        if isinstance(obj, np.integer):
+            return int(obj)
+        if isinstance(obj, np.floating):
+            return float(obj)
+        if isinstance(obj, np.ndarray):
+            return obj.tolist()
+        return super(NpEncoder, self).default(obj)
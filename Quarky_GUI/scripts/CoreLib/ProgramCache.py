@@ -0,0 +1,211 @@
+import json
+import time
+import hashlib
+import weakref
+import threading
+from collections import OrderedDict
+
+from .NpJson import NpEncoder
+
+class _CanonicalEncoder(NpEncoder):
+    def default(self, obj):
+        try:
+            return super().default(obj)
+        except TypeError: # not JSON, e.g. an object of the experiment file, hashed by its repr
+            return repr(obj)
+
+def config_hash(config, keys=None, exclude=()):
+    """
+    A canonical hash of (part of) a config: the same for equal configs however their keys are ordered, and whether
+    their values are numpy or Python numbers.
+
+    :param config: The config.
+    :type config: dict
+    :param keys: The keys to hash, by default all of them.
+    :type keys: list
+    :param exclude: Keys left out of the hash.
+    :type exclude: list
+    :return: The SHA-256 of the canonical JSON of the config, as hex.
+    :rtype: str
+    """
+
+    keys = config.keys() if keys is None else keys
+    part = {str(key): config.get(key) for key in keys if key not in exclude}
+    text = json.dumps(part, sort_keys=True, separators=(",", ":"), cls=_CanonicalEncoder)
+    return hashlib.sha256(text.encode()).hexdigest()
+
+def soccfg_hash(soccfg):
+    """
+    A canonical hash of a board configuration (a QickConfig, or the dictionary of one), identifying the firmware that
+    programs are compiled for.
+
+    :rtype: str
+    """
+
+    cfg = soccfg.get_cfg() if hasattr(soccfg, "get_cfg") else soccfg
+    return config_hash(cfg) if isinstance(cfg, dict) else hashlib.sha256(repr(cfg).encode()).hexdigest()
+
+class ProgramCache:
+    """
+    An in-memory cache of what experiments build on the host before running on a board, most of all their compiled
+    QICK programs, but also e.g. waveform tables, so that a program is only built (and compiled) again once the config
+    it depends on changed, rather than for every set and every run.
+
+    Entries are keyed by the builder (e.g. the program class), the hash of the board configuration (see soccfg_hash,
+    worked out once per QickConfig), and the hash of the config it is built from (see config_hash). A program holds
+    the acquisition buffers of the board it runs on, so entries are kept per board: each QickConfig object is given a
+    board id, and boards never share entries, even with the same firmware. Each board keeps its max_entries most
+    recently used entries.
+
+    The cached programs reference their QickConfig and their class, so neither is released while its entries are
+    cached: the entries of a board are dropped with forget() once it is disconnected (see RFSoCConnectionManager), and
+    those built by the classes of an experiment file with forget_classes() once the file is loaded again (see
+    ExperimentRegistry).
+
+    Thread safe; a value may be built twice when two threads miss on the same key at once, one of them being kept.
+    """
+
+    def __init__(self, max_entries=32):
+        """
+        Initializes the cache.
+
+        :param max_entries: The most entries kept per board.
+        :type max_entries: int
+        """
+
+        self.max_entries = max_entries
+        self.boards = {} # board id -> (the hash of its configuration, OrderedDict of key -> value)
+        self.board_ids = weakref.WeakKeyDictionary() # soccfg -> board id, holding no reference to the board
+        self.forgotten = weakref.WeakSet() # boards forgotten while still in use, whose values are no longer cached
+        self.next_id = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.build_s = 0.0 # seconds spent building the values that missed
+
+    def board_id(self, soccfg):
+        """
+        The board id of a board configuration, given on first use. Configurations that cannot be weakly referenced
+        (e.g. a plain dictionary) are identified by their hash instead. Called with the lock held.
+        """
+
+        try:
+            board_id = self.board_ids.get(soccfg)
+            if board_id is None:
+                board_id = self.next_id
+                self.next_id += 1
+                self.board_ids[soccfg] = board_id
+                weakref.finalize(soccfg, self.drop, board_id) # e.g. a board whose entries were all evicted
+        except TypeError:
+            board_id = soccfg_hash(soccfg)
+        return board_id
+
+    def entries(self, soccfg):
+        board_id = self.board_id(soccfg)
+        board = self.boards.get(board_id)
+        if board is None:
+            board = self.boards[board_id] = (soccfg_hash(soccfg), OrderedDict())
+        return board
+
+    def drop(self, board_id):
+        with self.lock:
+            self.boards.pop(board_id, None)
+
+    def get(self, soccfg, builder, config, build, keys=None, exclude=()):
+        """
+        The value built for a config on a board, building it with build() if it is not cached.
+
+        :param soccfg: The configuration of the board the value is for.
+        :type soccfg: QickConfig
+        :param builder: What identifies the kind of value, e.g. the program class. Compared by identity, so that a
+            program class reloaded from a changed experiment file (see ExperimentRegistry) builds anew.
+        :type builder: object
+        :param config: The config the value is built from.
+        :type config: dict
+        :param build: Builds the value, called without arguments.
+        :type build: callable
+        :param keys: The keys of the config the value depends on, by default all of them.
+        :type keys: list
+        :param exclude: Keys of the config the value does not depend on.
+        :type exclude: list
+        :return: The value.
+        """
+
+        digest = config_hash(config, keys, exclude)
+        with self.lock:
+            if self.is_forgotten(soccfg): # e.g. a run still finishing on a board disconnected meanwhile
+                self.misses += 1
+                return build()
+            board_hash, entries = self.entries(soccfg)
+            key = (builder, board_hash, digest)
+            if key in entries:
+                entries.move_to_end(key)
+                self.hits += 1
+                return entries[key]
+            self.misses += 1
+
+        start = time.perf_counter()
+        value = build()
+        with self.lock:
+            self.build_s += time.perf_counter() - start
+            entries[key] = value
+            while len(entries) > self.max_entries:
+                entries.popitem(last=False)
+        return value
+
+    def is_forgotten(self, soccfg):
+        try:
+            return soccfg in self.forgotten
+        except TypeError:
+            return False
+
+    def forget(self, soccfg):
+        """
+        Drops the entries of a board, e.g. once it is disconnected, releasing its programs and with them its
+        QickConfig. Values built for it afterwards are no longer cached.
+
+        :param soccfg: The configuration of the board.
+        :type soccfg: QickConfig
+        """
+
+        with self.lock:
+            self.boards.pop(self.board_id(soccfg), None)
+            try:
+                self.forgotten.add(soccfg)
+            except TypeError:
+                pass
+
+    def forget_classes(self, module):
+        """
+        Drops the entries built by the classes of a module, e.g. of an experiment file replaced by its changed
+        version, whose entries would never be used again. A builder is matched by its class, or by the class first
+        in it when it is a tuple (see ExperimentClass.cached).
+
+        :param module: The module.
+        :type module: module
+        """
+
+        classes = {id(obj) for obj in vars(module).values() if isinstance(obj, type)}
+        with self.lock:
+            for _, entries in self.boards.values():
+                for key in list(entries):
+                    builder = key[0][0] if isinstance(key[0], tuple) else key[0]
+                    if id(builder) in classes:
+                        del entries[key]
+
+    def stats(self):
+        """
+        The hits, misses, and seconds spent building since the cache was created.
+
+        :rtype: dict
+        """
+
+        with self.lock:
+            return {'hits': self.hits, 'misses': self.misses, 'build_s': self.build_s}
+
+    def clear(self):
+        with self.lock:
+            self.boards.clear()
+
+# The cache of the process, shared by the experiments of every run
+program_cache = ProgramCache()
@@ -0,0 +1,286 @@
+import json
+import numpy as np
+import h5py
+
+from .NpJson import NpEncoder
+from .Accumulator import numeric_array
+
+class RunFile:
+    """
+    The HDF5 file of a single run, opened once and appended to after every set.
+
+    Layout of the file:
+
+    * <key>: The running average of each numeric array of the data, overwritten in place every set. These are the
+      top level datasets the data tabs plot, as before.
+    * errors/<key>: The standard error of each averaged array.
+    * sets/<key>: The raw result of every set, stacked along a first axis that grows by one per set (resizable,
+      chunked one set per chunk), so the per set history is kept rather than overwritten.
+    * timing/<column>: The timing table of the run's stages, one row per stage (see RunTimer.table), written at the
+      end of the run.
+    * attrs: 'config' (json) and 'sets_written'.
+
+    A run over an outer sweep (see Sweep) stores the result of each point at its index instead, so that the top
+    level datasets and errors/<key> have the shape sweep.shape + the shape of a single point's data, NaN for points
+    not (yet) run. Alongside:
+
+    * sweep/<key>: The values of each swept key, the keys in order in the 'keys' attribute, the grid dimension each
+      one steps along in 'dims' (zipped keys share theirs, see Sweep), and the grid in 'shape'.
+    * points/<attr>: Numeric attributes of each point, e.g. the shard (board) it ran on and its sets_completed.
+    * shards/<n>: The provenance of each board of a sharded sweep, as attributes (see set_attrs).
+    * sets/point and sets/shard: The point and shard of every set of the per set history.
+
+    Every write ends with a flush, and the file is never truncated after it is created, so a crash mid-run leaves
+    all the sets written before it readable.
+    """
+
+    def __init__(self, path, config=None, mode='w'):
+        """
+        Opens the run file.
+
+        :param path: The path of the .h5 file.
+        :type path: str
+        :param config: The config of the run, stored as a json attribute.
+        :type config: dict
+        :param mode: The h5py file mode, 'w' creates a new run file.
+        :type mode: str
+        """
+
+        self.path = path
+        self.file = h5py.File(path, mode)
+        self.sets_written = self.file.attrs.get('sets_written', 0)
+        if config is not None:
+            self.file.attrs['config'] = json.dumps(config, cls=NpEncoder)
+        self.file.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def append_set(self, raw, snapshot=None):
+        """
+        Appends the raw data of a set to the per set history and, if given, overwrites the running average.
+
+        :param raw: The data dictionary of the set (the 'data' entry of the dictionary returned by acquire()).
+        :type raw: dict
+        :param snapshot: The averaged data dictionary of the run so far (see StreamingAccumulator.snapshot).
+        :type snapshot: dict
+        """
+
+        history = self.file.require_group('sets')
+        for key, value in raw.items():
+            arr = numeric_array(value)
+            if arr is None:
+                if not isinstance(value, (int, float, np.number)) or isinstance(value, bool):
+                    continue
+                arr = np.asarray(value) # scalars such as set_num become a 1D history
+
+            if key not in history:
+                history.create_dataset(key, shape=(0,) + arr.shape, maxshape=(None,) + arr.shape,
+                                       chunks=(1,) + arr.shape if arr.ndim else (1024,),
+                                       dtype=np.result_type(arr.dtype, np.float64))
+            dataset = history[key]
+            if dataset.shape[1:] != arr.shape:
+                raise ValueError("Shape of '" + key + "' changed from " + str(dataset.shape[1:]) +
+                                 " to " + str(arr.shape) + " between sets.")
+            dataset.resize(self.sets_written + 1, axis=0)
+            dataset[self.sets_written] = arr
+
+        self.sets_written += 1
+        self.file.attrs['sets_written'] = self.sets_written
+        if snapshot is not None:
+            self.write_average(snapshot) # flushes
+        else:
+            self.file.flush()
+
+    def append_history(self, other, block=64):
+        """
+        Appends the per set history of another run file, e.g. the sets an end_of_run DataWriter spooled to a local
+        temporary file, block sets at a time.
+
+        :param other: The run file whose sets are appended.
+        :type other: RunFile
+        :param block: The most sets read into memory at once.
+        :type block: int
+        """
+
+        count = other.sets_written
+        if not count:
+            return
+        history = self.file.require_group('sets')
+        for key, source in other.file['sets'].items():
+            if key not in history:
+                history.create_dataset(key, shape=(0,) + source.shape[1:], maxshape=(None,) + source.shape[1:],
+                                       chunks=source.chunks, dtype=source.dtype)
+            dataset = history[key]
+            if dataset.shape[1:] != source.shape[1:]:
+                raise ValueError("Shape of '" + key + "' changed from " + str(dataset.shape[1:]) +
+                                 " to " + str(source.shape[1:]) + " between sets.")
+            dataset.resize(self.sets_written + count, axis=0)
+            for start in range(0, count, block):
+                stop = min(start + block, count)
+                dataset[self.sets_written + start:self.sets_written + stop] = source[start:stop]
+
+        self.sets_written += count
+        self.file.attrs['sets_written'] = self.sets_written
+        self.file.flush()
+
+    def write_average(self, snapshot):
+        """
+        Overwrites the running average and standard errors in place.
+
+        :param snapshot: The averaged data dictionary (see StreamingAccumulator.snapshot).
+        :type snapshot: dict
+        """
+
+        self.write_arrays(self.file, snapshot['data'])
+        if snapshot.get('errors'):
+            self.write_arrays(self.file.require_group('errors'), snapshot['errors'])
+        if 'sets_averaged' in snapshot:
+            self.file.attrs['sets_averaged'] = snapshot['sets_averaged']
+        self.file.flush()
+
+    def write_arrays(self, group, arrays):
+        """
+        Writes each numeric array of a dictionary to a dataset of the same name, reusing the dataset when its shape
+        is unchanged. These datasets are stored contiguously so that they can be memory mapped when loaded.
+
+        :param group: The h5py group (or file) to write into.
+        :type group: h5py.Group
+        :param arrays: The dictionary of arrays.
+        :type arrays: dict
+        """
+
+        for key, value in arrays.items():
+            arr = numeric_array(value)
+            if arr is None:
+                continue
+            if key in group and group[key].shape != arr.shape:
+                del group[key]
+            if key not in group:
+                group.create_dataset(key, shape=arr.shape, dtype=np.result_type(arr.dtype, np.float64))
+            group[key][...] = arr
+
+    def write_timing(self, table, attrs=None):
+        """
+        Writes the timing table of the run as the columns stage, count, total_s, mean_s, and max_s of the timing
+        group, replacing any table written before.
+
+        :param table: The timing of each stage (see RunTimer.table).
+        :type table: dict
+        :param attrs: Run wide timings stored as attributes of the group, e.g. sets_per_second.
+        :type attrs: dict
+        """
+
+        if 'timing' in self.file:
+            del self.file['timing']
+        group = self.file.create_group('timing')
+        stages = list(table)
+        group.create_dataset('stage', data=np.array(stages, dtype=h5py.string_dtype()))
+        for column in ('count', 'total_s', 'mean_s', 'max_s'):
+            group.create_dataset(column, data=np.array([table[stage][column] for stage in stages], dtype=np.float64))
+        for key, value in (attrs or {}).items():
+            group.attrs[key] = value
+        self.file.flush()
+
+    def write_sweep(self, sweep):
+        """
+        Stores the axes of the outer sweep of the run, before any of its points.
+
+        :param sweep: The sweep.
+        :type sweep: Sweep
+        """
+
+        group = self.file.require_group('sweep')
+        for axis in sweep.axes:
+            for key, axis_values in axis.items():
+                values = np.asarray(axis_values)
+                if values.dtype.kind in 'OUS':
+                    values = np.array([str(value) for value in axis_values], dtype=h5py.string_dtype())
+                group.create_dataset(key, data=values)
+        group.attrs['keys'] = json.dumps(sweep.keys)
+        group.attrs['dims'] = json.dumps(sweep.dims())
+        group.attrs['shape'] = sweep.shape
+        self.file.flush()
+
+    def write_point(self, index, snapshot=None, attrs=None):
+        """
+        Writes the result of a point of the outer sweep at its index. The arrays of the sweep are created on the
+        first point written, filled with NaN.
+
+        :param index: The grid index of the point.
+        :type index: tuple
+        :param snapshot: The averaged data dictionary of the point (see StreamingAccumulator.snapshot).
+        :type snapshot: dict
+        :param attrs: The numeric attributes of the point, stored in points/<attr>.
+        :type attrs: dict
+        """
+
+        shape = tuple(self.file['sweep'].attrs['shape'])
+        if snapshot is not None:
+            self.write_point_arrays(self.file, shape, index, snapshot['data'])
+            if snapshot.get('errors'):
+                self.write_point_arrays(self.file.require_group('errors'), shape, index, snapshot['errors'])
+
+        points = self.file.require_group('points')
+        for key, value in (attrs or {}).items():
+            if isinstance(value, (int, float, np.number)) and not isinstance(value, bool):
+                if key not in points:
+                    points.create_dataset(key, shape=shape, dtype=np.float64, fillvalue=np.nan)
+                points[key][index] = value
+        self.file.flush()
+
+    def write_point_arrays(self, group, shape, index, arrays):
+        """
+        Writes each numeric array of a point at its index of the sweep arrays of the same names.
+
+        :param group: The h5py group (or file) to write into.
+        :type group: h5py.Group
+        :param shape: The shape of the sweep.
+        :type shape: tuple
+        :param index: The grid index of the point.
+        :type index: tuple
+        :param arrays: The dictionary of arrays of the point.
+        :type arrays: dict
+        """
+
+        for key, value in arrays.items():
+            arr = numeric_array(value)
+            if arr is None:
+                continue
+            if key not in group:
+                dtype = np.result_type(arr.dtype, np.float64)
+                group.create_dataset(key, shape=shape + arr.shape, dtype=dtype, fillvalue=np.nan)
+            dataset = group[key]
+            if dataset.shape != shape + arr.shape:
+                raise ValueError("Shape of '" + key + "' changed from " + str(dataset.shape[len(shape):]) +
+                                 " to " + str(arr.shape) + " between points.")
+            dataset[index] = arr
+
+    def set_attrs(self, attrs, group=None):
+        """
+        Stores attributes on the run file, or on one of its groups, json encoding anything h5py cannot store directly.
+
+        :param attrs: The attributes to store.
+        :type attrs: dict
+        :param group: The path of the group, created if needed, e.g. 'shards/0'; None for the file itself.
+        :type group: str
+        """
+
+        target = self.file if group is None else self.file.require_group(group)
+        for key, value in attrs.items():
+            try:
+                target.attrs[key] = value
+            except TypeError:
+                target.attrs[key] = json.dumps(value, cls=NpEncoder)
+        self.file.flush()
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        if self.file:
+            self.file.close()
+            self.file = None
@@ -0,0 +1,251 @@
+import os
+import json
+import time
+import threading
+from pathlib import Path
+
+from .NpJson import NpEncoder
+from .SoccfgCache import DEFAULT_CACHE_DIR
+
+class RunQueue:
+    """
+    A persistent queue of experiment runs, kept in cache/run_queue.json so that it survives restarting the GUI.
+
+    Each entry is a dictionary holding the experiment file ('path'), the config it is run with ('experiment_config',
+    applied over the Base Config, and 'run_config'), a 'priority' (higher runs first, ties in the order added), and
+    its 'status': pending, running, done, failed, or stopped. An entry with an 'interval_minutes' above zero is a
+    periodic job (e.g. a recalibration): it stays in the queue and falls due again interval_minutes after it last
+    ran, taking precedence over the one-off entries, which it also preempts at their next set boundary.
+
+    Every change is written to disk straight away. An entry found running when the queue is loaded was interrupted
+    by the GUI closing, and is pending again.
+    """
+
+    STATUSES = ("pending", "running", "done", "failed", "stopped")
+
+    def __init__(self, queue_dir=DEFAULT_CACHE_DIR):
+        """
+        Loads the queue.
+
+        :param queue_dir: The folder of the queue file.
+        :type queue_dir: str
+        """
+
+        self.queue_dir = queue_dir
+        self.path = os.path.join(queue_dir, 'run_queue.json')
+        self.entries = []
+        self.next_id = 1
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, 'r') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return
+        self.entries = state.get('entries', [])
+        self.next_id = max([entry['id'] for entry in self.entries] + [state.get('next_id', 1) - 1]) + 1
+        for entry in self.entries:
+            if entry['status'] == "running":
+                entry['status'] = "pending"
+
+    def save(self):
+        os.makedirs(self.queue_dir, exist_ok=True)
+        with open(self.path + '.tmp', 'w') as f:
+            json.dump({'next_id': self.next_id, 'entries': self.entries}, f, indent=4, cls=NpEncoder)
+        os.replace(self.path + '.tmp', self.path)
+
+    def add(self, path, experiment_config=None, run_config=None, priority=0, interval_minutes=0.0):
+        """
+        Adds an entry to the queue.
+
+        :param path: The path of the experiment file.
+        :type path: str
+        :param experiment_config: The Experiment Config to run it with, its keys overriding the Base Config.
+        :type experiment_config: dict
+        :param run_config: The Run Config to run it with.
+        :type run_config: dict
+        :param priority: Higher priorities run first.
+        :type priority: int
+        :param interval_minutes: Above zero for a periodic job, run again every interval_minutes.
+        :type interval_minutes: float
+        :return: The new entry.
+        :rtype: dict
+        """
+
+        entry = {'id': self.next_id, 'path': str(path), 'name': Path(path).stem,
+                 'experiment_config': dict(experiment_config or {}), 'run_config': dict(run_config or {}),
+                 'priority': int(priority), 'interval_minutes': float(interval_minutes), 'status': "pending",
+                 'added': time.time(), 'last_run': None, 'stop_reason': None}
+        self.next_id += 1
+        self.entries.append(entry)
+        self.save()
+        return entry
+
+    def get(self, entry_id):
+        for entry in self.entries:
+            if entry['id'] == entry_id:
+                return entry
+        return None
+
+    def remove(self, entry_id):
+        """
+        Removes an entry, unless it is running.
+
+        :param entry_id: The id of the entry.
+        :type entry_id: int
+        :return: Whether it was removed.
+        :rtype: bool
+        """
+
+        entry = self.get(entry_id)
+        if entry is None or entry['status'] == "running":
+            return False
+        self.entries.remove(entry)
+        self.save()
+        return True
+
+    def clear_finished(self):
+        """ Removes the one-off entries that are done, failed, or stopped. """
+
+        self.entries = [entry for entry in self.entries if entry['status'] in ("pending", "running")]
+        self.save()
+
+    def set_priority(self, entry_id, priority):
+        entry = self.get(entry_id)
+        if entry is not None:
+            entry['priority'] = int(priority)
+            self.save()
+
+    def ordered(self):
+        """ The entries in the order they run: periodic jobs, then by priority, then in the order added. """
+
+        return sorted(self.entries, key=lambda entry: (entry['interval_minutes'] <= 0, -entry['priority'], entry['id']))
+
+    def due_periodic(self, now=None):
+        """
+        The periodic job that is due, if any.
+
+        :param now: The time to check at, by default now.
+        :type now: float
+        :rtype: dict
+        """
+
+        now = time.time() if now is None else now
+        for entry in self.ordered():
+            if entry['interval_minutes'] > 0 and entry['status'] == "pending" and \
+                    now - (entry['last_run'] or 0) >= 60 * entry['interval_minutes']:
+                return entry
+        return None
+
+    def next_run(self, now=None):
+        """
+        The entry to run next: a due periodic job, else the pending one-off entry of highest priority.
+
+        :param now: The time to check at, by default now.
+        :type now: float
+        :return: The entry, or None if nothing is due.
+        :rtype: dict
+        """
+
+        periodic = self.due_periodic(now)
+        if periodic is not None:
+            return periodic
+        for entry in self.ordered():
+            if entry['interval_minutes'] <= 0 and entry['status'] == "pending":
+                return entry
+        return None
+
+    def mark_running(self, entry_id):
+        entry = self.get(entry_id)
+        if entry is not None:
+            entry['status'] = "running"
+            entry['last_run'] = time.time()
+            self.save()
+
+    def mark_finished(self, entry_id, stop_reason):
+        """
+        Records how a run of an entry ended. A periodic job is pending again, due in interval_minutes.
+
+        :param entry_id: The id of the entry.
+        :type entry_id: int
+        :param stop_reason: The stop reason of the run (see ExperimentThread), None if it never started.
+        :type stop_reason: str
+        """
+
+        entry = self.get(entry_id)
+        if entry is None:
+            return
+        entry['stop_reason'] = stop_reason
+        if entry['interval_minutes'] > 0:
+            entry['status'] = "pending"
+        elif stop_reason in ("completed", "target_snr", "target_stderr"):
+            entry['status'] = "done"
+        elif stop_reason == "stopped":
+            entry['status'] = "stopped"
+        else:
+            entry['status'] = "failed"
+        self.save()
+
+class PauseGate:
+    """
+    The set boundary at which a run can be paused, e.g. to let a periodic job use the board in between. Every thread
+    acquiring from a board of the run calls wait() before each set; once pause() was called, the on_paused callback is
+    called when all of them are waiting (so no set is in flight), and they carry on after resume().
+    """
+
+    def __init__(self, parties=1, on_paused=None):
+        """
+        :param parties: The number of threads acquiring for the run.
+        :type parties: int
+        :param on_paused: Called (from an acquiring thread) once the run is paused.
+        :type on_paused: callable
+        """
+
+        self.condition = threading.Condition()
+        self.parties = parties
+        self.on_paused = on_paused
+        self.paused = False
+        self.waiting = 0
+        self.reported = False
+
+    def pause(self):
+        with self.condition:
+            self.paused = True
+            self.reported = False
+            self.report()
+
+    def resume(self):
+        with self.condition:
+            self.paused = False
+            self.condition.notify_all()
+
+    def wait(self, running):
+        """
+        Waits at a set boundary while the run is paused.
+
+        :param running: Called to check the run has not been stopped, which ends the wait.
+        :type running: callable
+        """
+
+        with self.condition:
+            if not self.paused:
+                return
+            self.waiting += 1
+            self.report()
+            while self.paused and running():
+                self.condition.wait(0.1)
+            self.waiting -= 1
+
+    def leave(self):
+        """ Called by a thread that will not acquire any more sets. """
+
+        with self.condition:
+            self.parties -= 1
+            self.report()
+
+    def report(self):
+        if self.paused and not self.reported and self.waiting >= self.parties:
+            self.reported = True
+            if self.on_paused is not None:
+                self.on_paused()
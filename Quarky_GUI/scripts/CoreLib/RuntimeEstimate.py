@@ -0,0 +1,198 @@
+import os
+import json
+import math
+
+from .SoccfgCache import DEFAULT_CACHE_DIR
+from .Sweep import Sweep, parse_boards
+
+def sweep_points(config):
+    """
+    The number of points each rep of the experiment sweeps over: the product of every <name>_expts entry of the
+    config (e.g. qubit_freq_expts), 1 for an experiment without a sweep.
+
+    :param config: The merged Base and Experiment config.
+    :type config: dict
+    :rtype: int
+    """
+
+    points = 1
+    for key, value in config.items():
+        if key.endswith("_expts") and isinstance(value, (int, float)) and not isinstance(value, bool):
+            points *= max(int(value), 1)
+    return points
+
+def shot_time(config):
+    """
+    The board time of a single shot in us: relax_delay, adc_trig_offset, and every length of the config (read_length
+    and each <name>_length pulse), all of which are given in us.
+
+    :param config: The merged Base and Experiment config.
+    :type config: dict
+    :rtype: float
+    """
+
+    total = 0.0
+    for key, value in config.items():
+        if not isinstance(value, (int, float)) or isinstance(value, bool):
+            continue
+        if key in ("relax_delay", "adc_trig_offset", "length") or key.endswith("_length"):
+            total += float(value)
+    return total
+
+class RuntimeEstimate:
+    """
+    The estimated wall time of a run, computed from its config before anything is sent to the board (see
+    estimate_runtime).
+    """
+
+    def __init__(self, shots, shot_us, rpc_calls, rpc_overhead):
+        """
+        :param shots: The number of shots of the run (reps x sets x sweep points).
+        :type shots: int
+        :param shot_us: The board time of one shot in us.
+        :type shot_us: float
+        :param rpc_calls: The number of acquire() calls of the run.
+        :type rpc_calls: int
+        :param rpc_overhead: The calibrated seconds each acquire() call costs on top of its board time.
+        :type rpc_overhead: float
+        """
+
+        self.shots = shots
+        self.shot_us = shot_us
+        self.rpc_calls = rpc_calls
+        self.rpc_overhead = rpc_overhead
+
+    @property
+    def board_seconds(self):
+        return self.shots * self.shot_us * 1e-6
+
+    @property
+    def overhead_seconds(self):
+        return self.rpc_calls * self.rpc_overhead
+
+    @property
+    def total_seconds(self):
+        return self.board_seconds + self.overhead_seconds
+
+    def __repr__(self):
+        return ("<RuntimeEstimate " + "{:.1f}".format(self.total_seconds) + " s (board " +
+                "{:.1f}".format(self.board_seconds) + " s + " + str(self.rpc_calls) + " calls x " +
+                "{:.3f}".format(self.rpc_overhead) + " s)>")
+
+def estimate_runtime(config, run_config=None, calibration=None, experiment_name=None):
+    """
+    Estimates the wall time of running an experiment, without touching the board: reps x sets x sweep points shots,
+    each taking shot_time(), plus the calibrated overhead of every acquire() call. With an outer_sweep in the run
+    config, this is repeated for every point the busiest of the shard boards runs.
+
+    Usable from scripts as well as the GUI, e.g. to check a queue of experiments fits in the available time::
+
+        estimate_runtime(BaseConfig | experiment_config).total_seconds
+
+    :param config: The merged Base and Experiment config, holding reps and sets.
+    :type config: dict
+    :param run_config: The run config, sub-batches of reps_per_chunk reps mean more acquire() calls per set, and
+        its outer_sweep and shard_boards set the points run per board.
+    :type run_config: dict
+    :param calibration: The per call overhead measured on past runs, by default the one cached on this computer.
+    :type calibration: RuntimeCalibration
+    :param experiment_name: The experiment, whose own calibration is used when it has one.
+    :type experiment_name: str
+    :return: The estimate, or None if the config has no reps or sets.
+    :rtype: RuntimeEstimate
+    """
+
+    try:
+        reps, sets = int(config["reps"]), int(config["sets"])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+    run_config = run_config or {}
+    chunk = int(run_config.get("reps_per_chunk", 0))
+    calls_per_set = math.ceil(reps / chunk) if 0 < chunk < reps else 1
+    try:
+        sweep = Sweep.parse(run_config.get("outer_sweep", ""))
+    except ValueError: # reported when the run is started
+        sweep = None
+    points = 1 if sweep is None else math.ceil(sweep.size / (1 + len(parse_boards(run_config.get("shard_boards")))))
+    if calibration is None:
+        calibration = RuntimeCalibration()
+
+    return RuntimeEstimate(shots=points * reps * sets * sweep_points(config), shot_us=shot_time(config),
+                           rpc_calls=points * sets * calls_per_set,
+                           rpc_overhead=calibration.rpc_overhead(experiment_name))
+
+class RuntimeCalibration:
+    """
+    The overhead of an acquire() call beyond its board time (program compilation and upload, the Pyro round trip, and
+    the transfer of the results), measured on past runs and cached in cache/runtime_calibration.json. Each finished
+    run updates a running mean for its experiment and one over all experiments, used for experiments not run before.
+
+    A run faster than its board time says (e.g. with a shot_time() above what the board actually takes) counts as no
+    overhead rather than a negative one, which would lower every later estimate.
+    """
+
+    DEFAULT_OVERHEAD = 0.1 # seconds per call assumed before any run has been measured
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR):
+        """
+        :param cache_dir: The folder of the cache.
+        :type cache_dir: str
+        """
+
+        self.cache_dir = cache_dir
+        self.path = os.path.join(cache_dir, 'runtime_calibration.json')
+
+    def read(self):
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def rpc_overhead(self, experiment_name=None):
+        """
+        The calibrated seconds of overhead per acquire() call.
+
+        :param experiment_name: The experiment, falls back to the overhead over all experiments.
+        :type experiment_name: str
+        :rtype: float
+        """
+
+        calibration = self.read()
+        entry = calibration.get('experiments', {}).get(experiment_name) or calibration.get('all')
+        return max(entry['rpc_overhead'], 0.0) if entry else self.DEFAULT_OVERHEAD
+
+    def update(self, experiment_name, config, acquire_seconds, acquire_calls, reps_acquired):
+        """
+        Folds a finished run into the calibration.
+
+        :param experiment_name: The experiment that was run.
+        :type experiment_name: str
+        :param config: The merged config it was run with.
+        :type config: dict
+        :param acquire_seconds: The total time spent in acquire() calls.
+        :type acquire_seconds: float
+        :param acquire_calls: The number of acquire() calls.
+        :type acquire_calls: int
+        :param reps_acquired: The reps acquired over all sets.
+        :type reps_acquired: int
+        :return: The overhead per call measured on this run, at least 0.
+        :rtype: float
+        """
+
+        board_seconds = reps_acquired * sweep_points(config) * shot_time(config) * 1e-6
+        overhead = max((acquire_seconds - board_seconds) / acquire_calls, 0.0)
+
+        calibration = self.read()
+        experiments = calibration.setdefault('experiments', {})
+        for key, entries in ((experiment_name, experiments), ('all', calibration)):
+            entry = entries.setdefault(key, {'rpc_overhead': 0.0, 'runs': 0})
+            entry['runs'] += 1
+            entry['rpc_overhead'] += (overhead - entry['rpc_overhead']) / min(entry['runs'], 20) # recent runs count
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(self.path + '.tmp', 'w') as f:
+            json.dump(calibration, f, indent=4)
+        os.replace(self.path + '.tmp', self.path)
+        return overhead
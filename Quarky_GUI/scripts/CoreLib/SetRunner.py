@@ -0,0 +1,508 @@
+import math
+import time
+import queue
+import logging
+import threading
+
+import Pyro4
+
+from scripts.Init.initialize import RunConfig
+from .Accumulator import StreamingAccumulator
+from .Timing import RunTimer
+from .RuntimeEstimate import RuntimeCalibration
+from .RunQueue import PauseGate
+from .ProgramCache import program_cache
+from .SoccfgCache import is_simulated
+
+logger = logging.getLogger(__name__)
+
+class SetRunner:
+    """
+    Runs the sets of an experiment: acquires each set from the RFSoC, folds it into a StreamingAccumulator, and hands
+    it to the data writer, so that only the running means (with standard errors) are published, never the raw sets.
+    It imports no Qt, so that runs can be scripted without the GUI (see quarky_run.py); the GUI's ExperimentThread is
+    a SetRunner whose hooks (data_updated(), progress_updated(), timing_updated(), error_raised(), run_paused(), and
+    run_finished()) emit its signals. Messages go through log(), by default to the logging module.
+
+    When the run config's pipeline_depth is above zero, acquisition is split into a producer (acquiring sets from the
+    RFSoC back to back) and a consumer (handing each set on for processing), connected by a bounded queue. The board
+    then never waits on the host side processing of the previous set.
+
+    A set that fails because the connection to the RFSoC dropped is retried up to max_retries times, waiting
+    retry_backoff seconds (doubled every retry) and reconnecting the proxy in between. The run then resumes at that
+    same set with its running average untouched; only an error that persists, or any other error, ends the run.
+
+    When the run config's reps_per_chunk is above zero (and below the config's reps), each set is acquired as several
+    sub-batches of at most that many reps, which are averaged (weighted by their reps) into the set. Between sub-batches
+    the stop flag is checked, progress is reported in reps, and a preview of the running average including the partial
+    set is published, so both stopping and feedback take at most one sub-batch rather than a whole set.
+
+    With a target_snr or target_stderr in the run config, the run stops early once the averaged IQ data meets the
+    target (checked after min_sets sets), the config's sets then being the maximum. Why the run ended (completed,
+    target_snr, target_stderr, stopped, or error) is stored in the run file as its stop_reason attribute.
+
+    Every stage of a set is timed on the run's RunTimer: 'acquire' (the acquire() call, which covers both the program
+    on the board and the transfer of its results), 'accumulate', 'queue_wait' (a pipelined acquisition blocked on a
+    full queue, i.e. the host side being the bottleneck), and, on their own threads, 'save' and 'plot'. After every
+    set the smoothed set rate and the estimated remaining time are passed to timing_updated().
+
+    pause() holds the run at its next set boundary (the set being acquired is finished first), e.g. for a periodic
+    job of the run queue to use the board, and run_paused() is called once no set is in flight; resume() carries on
+    with the next set, the running average untouched.
+    """
+
+    CONVERGENCE_KEYS = ('avgi', 'avgq') # the arrays whose standard errors the early stopping targets apply to
+    RETRYABLE_ERRORS = (Pyro4.errors.CommunicationError, ConnectionError, TimeoutError) # network, not experiment, errors
+
+    def __init__(self, config, soccfg, exp, soc, run_config=None, update_channel=None, data_writer=None, timer=None,
+                 gate=None, **kwargs):
+        super().__init__(**kwargs)
+        self.config = config # The config file used to run the experiment
+        self.run_config = RunConfig | (run_config or {}) # The options of how the experiment is run
+        self.experiment_instance = exp # The object representing an instance of a QickProgram subclass to be run
+        self.soc = soc # The RFSOC!
+        self.running = False
+        self.accumulator = StreamingAccumulator() # Running average of all sets of this run
+        self.accumulator_lock = threading.Lock() # previews read the accumulator from the acquiring thread
+        self.timer = timer if timer is not None else RunTimer() # stage timings and set rate of this run
+        # updated at the end of the run, None leaves it untouched, as do runs on the simulated QickSoc
+        self.runtime_calibration = None if is_simulated(soccfg) else RuntimeCalibration()
+        self.reps_done = 0 # reps acquired so far, reported as progress
+        self.update_channel = update_channel # LiveUpdateChannel coalescing the updates, else data_updated() is called
+        self.data_writer = data_writer # DataWriter (or RunFile) each set is appended to, if any
+        self.retries = 0 # sets reacquired after a dropped connection during this run
+        self.stop_reason = None # why the run ended, set once
+        self.gate = PauseGate(on_paused=self.run_paused) if gate is None else gate # set boundary of pause()
+
+        # ### create the experiment instance
+        # self.experiment_instance = exp(soccfg, self.config)
+
+        if not exp:
+            self.log(logging.DEBUG, 'Warning: None experiment. Going to crash in 3, 2, 1...')
+
+    def run(self):
+        """ Run the RFSOC experiment. """
+        #yoko1.SetVoltage(self.config["yokoVoltage"]) # this needs to go somewhere else
+
+        self.running = self.stop_reason is None # a worker stopped before it started runs nothing
+        programs_before = program_cache.stats()
+        if self.running and self.run_config["pipeline_depth"] > 0:
+            self.run_pipelined()
+        elif self.running:
+            self.run_sequential()
+
+        if self.stop_reason is None:
+            self.stop_reason = "completed"
+        if self.data_writer is not None:
+            self.data_writer.set_attrs(self.run_summary())
+        self.calibrate_runtime()
+        self.log_program_cache(programs_before)
+        self.running = False
+        self.run_finished()
+
+    def log_program_cache(self, before):
+        """
+        Logs how many programs the experiment built during the run and how many it reused (see ExperimentClass.program),
+        if it builds its programs through the program cache. Concurrent runs (e.g. the shards of a sweep) share it.
+
+        :param before: The stats of the program cache when the run started.
+        :type before: dict
+        """
+
+        after = program_cache.stats()
+        hits, misses = after['hits'] - before['hits'], after['misses'] - before['misses']
+        if hits or misses:
+            self.log(logging.DEBUG, "Programs reused: " + str(hits) + ", built: " + str(misses) + " (" +
+                     "{:.3f}".format(after['build_s'] - before['build_s']) + " s).")
+
+    def run_summary(self):
+        """
+        The attributes describing how the run went, stored in the run file at its end.
+
+        :rtype: dict
+        """
+
+        summary = {'stop_reason': self.stop_reason, 'sets_completed': self.accumulator.count, 'retries': self.retries}
+        keys = [key for key in self.CONVERGENCE_KEYS if key in self.accumulator.mean]
+        if keys and self.accumulator.count >= 2:
+            summary['snr'] = self.accumulator.snr(keys)
+            summary['max_stderr'] = self.accumulator.max_stderr(keys)
+        return summary
+
+    def calibrate_runtime(self):
+        """
+        Updates the per call overhead used by the runtime estimates with the acquire() timings of this run. Runs that
+        failed or retried sets are left out, their timings include the failed calls.
+        """
+
+        stats = self.timer.table().get('acquire')
+        if self.runtime_calibration is None or stats is None or self.stop_reason == "error" or self.retries:
+            return
+        try:
+            overhead = self.runtime_calibration.update(type(self.experiment_instance).__name__, self.config,
+                                                   stats['total_s'], stats['count'], self.reps_done)
+            self.log(logging.DEBUG, "Measured an overhead of " + "{:.3f}".format(overhead) + " s per acquire() call.")
+        except (OSError, KeyError, TypeError, ZeroDivisionError) as e:
+            self.log(logging.WARNING, "Could not update the runtime calibration: " + str(e))
+
+    def end_run(self, reason):
+        """
+        Ends the run at the next check of the running flag, recording why unless a reason was already recorded.
+
+        :param reason: The stop reason stored in the run file.
+        :type reason: str
+        """
+
+        if self.stop_reason is None:
+            self.stop_reason = reason
+        self.running = False
+
+    def check_targets(self):
+        """
+        Ends the run if the averaged data meets the early stopping target of the run config, if any.
+        """
+
+        target_snr, target_stderr = self.run_config["target_snr"], self.run_config["target_stderr"]
+        if (target_snr <= 0 and target_stderr <= 0) or self.accumulator.count < max(2, self.run_config["min_sets"]):
+            return
+
+        keys = [key for key in self.CONVERGENCE_KEYS if key in self.accumulator.mean]
+        if not keys:
+            return
+        with self.accumulator_lock:
+            snr, max_stderr = self.accumulator.snr(keys), self.accumulator.max_stderr(keys)
+
+        if target_snr > 0 and snr >= target_snr:
+            self.log(logging.INFO, "Target SNR of " + str(target_snr) + " reached after " +
+                     str(self.accumulator.count) + " sets (SNR " + "{:.3g}".format(snr) + ").")
+            self.end_run("target_snr")
+        elif target_stderr > 0 and not math.isnan(max_stderr) and max_stderr <= target_stderr:
+            self.log(logging.INFO, "Target standard error of " + str(target_stderr) + " reached after " +
+                     str(self.accumulator.count) + " sets (largest " + "{:.3g}".format(max_stderr) + ").")
+            self.end_run("target_stderr")
+
+    def run_sequential(self):
+        """ Acquire and process each set in turn. """
+
+        idx_set = 0
+
+        ### loop over all the sets for the data taking
+        while self.running and idx_set < self.config["sets"]:
+            self.gate.wait(lambda: self.running)
+            if not self.running:
+                break
+
+            try:
+                data = self.acquire_set(idx_set)
+            except Exception as e:
+                self.end_run("error")
+                self.error_raised(e)
+                return # Do not want to update data -- no new data was recorded!
+            if data is None: # stopped part way through the set
+                return
+
+            self.process_set(idx_set, data)
+            idx_set += 1
+
+    def run_pipelined(self):
+        """
+        Acquire sets on a producer thread while this thread processes the sets already acquired. The queue between
+        the two holds at most pipeline_depth sets, so a slow consumer throttles the producer rather than growing memory.
+        """
+
+        set_queue = queue.Queue(maxsize=self.run_config["pipeline_depth"])
+        producer = threading.Thread(target=self.produce_sets, args=(set_queue,), daemon=True)
+        producer.start()
+
+        while True:
+            item = set_queue.get()
+            if item is None: # producer is done
+                break
+
+            idx_set, data = item
+            if isinstance(data, Exception):
+                self.end_run("error")
+                self.error_raised(data)
+                break
+            if not self.running: # stopped while the set was waiting in the queue
+                break
+            self.process_set(idx_set, data)
+
+        # Unblock a producer still waiting on a full queue, then wait for it to exit
+        self.running = False
+        while producer.is_alive():
+            try:
+                set_queue.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        producer.join()
+
+    def produce_sets(self, set_queue):
+        """
+        The producer loop of a pipelined run. Puts (set number, data) pairs onto the queue, followed by None once
+        all sets are acquired or the run is stopped. An exception from the RFSoC is queued in place of the data.
+
+        :param set_queue: The bounded queue shared with the consumer.
+        :type set_queue: queue.Queue
+        """
+
+        idx_set = 0
+        while self.running and idx_set < self.config["sets"]:
+            self.gate.wait(lambda: self.running)
+            if not self.running:
+                break
+            try:
+                data = self.acquire_set(idx_set)
+            except Exception as e:
+                set_queue.put((idx_set, e))
+                return
+            if data is None: # stopped part way through the set
+                break
+            with self.timer.stage('queue_wait'):
+                set_queue.put((idx_set, data))
+            idx_set += 1
+
+        set_queue.put(None)
+
+    def acquire_set(self, idx_set):
+        """
+        Acquires a single set from the RFSoC, in sub-batches of reps if the run config asks for them.
+
+        :param idx_set: The index of the set being acquired.
+        :type idx_set: int
+        :return: The data dictionary returned by the experiment, tagged with its set number, or None if the run was
+            stopped before the set was complete.
+        :rtype: dict
+        """
+
+        reps = self.config.get("reps", 1)
+        chunk = self.run_config["reps_per_chunk"]
+        if chunk <= 0 or chunk >= reps:
+            data = self.acquire_with_retry(idx_set)
+            self.report_progress((idx_set + 1) * reps)
+        else:
+            data = self.acquire_chunked(idx_set, reps, chunk)
+            if data is None:
+                return None
+
+        data['data']['set_num'] = idx_set
+        return data
+
+    def acquire_chunked(self, idx_set, reps, chunk):
+        """
+        Acquires a set as sub-batches of at most chunk reps each and averages them, weighted by their reps.
+
+        The experiment is handed a copy of its config with reps set to the size of the sub-batch, as the config it
+        was created with is shared with the GUI; its own config is put back afterwards.
+
+        :param idx_set: The index of the set being acquired.
+        :type idx_set: int
+        :param reps: The reps of the whole set.
+        :type reps: int
+        :param chunk: The most reps per sub-batch.
+        :type chunk: int
+        :return: The data dictionary of the whole set, or None if the run was stopped before the set was complete.
+        :rtype: dict
+        """
+
+        experiment_cfg = self.experiment_instance.cfg
+        partial = StreamingAccumulator() # the sub-batches of this set
+        done = 0
+        try:
+            while done < reps:
+                if not self.running:
+                    self.log(logging.DEBUG, "Stopped during set " + str(idx_set + 1) + ", its " + str(done) + " of " +
+                             str(reps) + " reps are discarded.")
+                    return None
+
+                size = min(chunk, reps - done)
+                self.experiment_instance.cfg = dict(experiment_cfg, reps=size)
+                data = self.acquire_with_retry(idx_set)
+                partial.add(data['data'], weight=size)
+                done += size
+
+                self.report_progress(idx_set * reps + done)
+                if done < reps:
+                    self.publish_preview(data, partial, done / reps)
+        finally:
+            self.experiment_instance.cfg = experiment_cfg
+
+        data = partial.snapshot(data)
+        return {'config': experiment_cfg, 'data': data['data']}
+
+    def acquire_with_retry(self, idx_set):
+        """
+        Calls the experiment's acquire(), retrying it after a dropped connection (see the class description).
+
+        :param idx_set: The index of the set being acquired.
+        :type idx_set: int
+        :return: The data dictionary returned by the experiment.
+        :rtype: dict
+        """
+
+        attempt = 0
+        while True:
+            try:
+                with self.timer.stage('acquire'):
+                    data = self.experiment_instance.acquire()
+                break
+            except self.RETRYABLE_ERRORS as e:
+                if attempt >= self.run_config["max_retries"] or not self.running:
+                    raise
+                delay = self.run_config["retry_backoff"] * 2 ** attempt
+                attempt += 1
+                self.retries += 1
+                self.log(logging.WARNING, "Set " + str(idx_set + 1) + " failed (" + str(e) + "), retry " + str(attempt) +
+                         " of " + str(self.run_config["max_retries"]) + " in " + str(delay) + " s.")
+                if not self.wait_for_retry(delay):
+                    raise # stopped while waiting
+                self.reconnect()
+
+        return data
+
+    def report_progress(self, reps_done):
+        """
+        Emits the reps completed so far. When pipelined, the acquiring thread may be a set ahead of the processing
+        one, so the progress only ever moves forward.
+
+        :param reps_done: The reps completed.
+        :type reps_done: int
+        """
+
+        with self.accumulator_lock:
+            if reps_done <= self.reps_done:
+                return
+            self.reps_done = reps_done
+        self.progress_updated(reps_done)
+
+    def publish_preview(self, data, partial, fraction):
+        """
+        Publishes the running average with the partial set folded in at the fraction of its reps acquired so far. The
+        preview goes to the GUI only, the run file and the accumulator only ever receive whole sets.
+
+        :param data: The data dictionary of the latest sub-batch.
+        :type data: dict
+        :param partial: The average of the sub-batches of the set so far.
+        :type partial: StreamingAccumulator
+        :param fraction: The fraction of the set's reps acquired.
+        :type fraction: float
+        """
+
+        partial_data = partial.snapshot(data)['data']
+        with self.accumulator_lock:
+            preview = self.accumulator.copy()
+        preview.add(partial_data, weight=fraction)
+        snapshot = preview.snapshot({'config': self.config, 'data': partial_data})
+        snapshot['sets_averaged'] = self.accumulator.count + fraction
+
+        self.publish(snapshot)
+
+    def wait_for_retry(self, delay):
+        """
+        Sleeps before a retry, waking up early if the run is stopped.
+
+        :return: Whether the run is still going.
+        :rtype: bool
+        """
+
+        end = time.monotonic() + delay
+        while self.running and time.monotonic() < end:
+            time.sleep(min(0.1, end - time.monotonic()))
+        return self.running
+
+    def reconnect(self):
+        """
+        Re-establishes the connection of the soc proxy in place, so the experiment (which holds the same proxy)
+        carries on with it. A failed reconnect is left for the next attempt of the set to report.
+        """
+
+        if not isinstance(self.soc, Pyro4.Proxy):
+            return
+        try:
+            self.soc._pyroReconnect(tries=1)
+            self.log(logging.DEBUG, "Reconnected to the RFSoC.")
+        except Pyro4.errors.PyroError as e:
+            self.log(logging.WARNING, "Reconnecting to the RFSoC failed: " + str(e))
+
+    def process_set(self, idx_set, data):
+        """
+        Folds an acquired set into the running average, hands it to the data writer, and hands the averaged data on to
+        the GUI.
+
+        :param idx_set: The index of the set.
+        :type idx_set: int
+        :param data: The data dictionary of the set.
+        :type data: dict
+        """
+
+        with self.timer.stage('accumulate'), self.accumulator_lock:
+            self.accumulator.add(data['data'])
+            snapshot = self.accumulator.snapshot(data)
+
+        # Publish the averaged data and update the progress bar with additional set complete
+        if self.data_writer is not None:
+            self.data_writer.append_set(data['data'], snapshot)
+
+        self.publish(snapshot)
+        self.report_progress((idx_set + 1) * self.config.get("reps", 1))
+
+        self.timer.set_done()
+        remaining = self.timer.remaining(self.config["sets"] - self.accumulator.count)
+        self.timing_updated(self.timer.sets_per_second(), -1.0 if remaining is None else remaining)
+        self.check_targets()
+
+    ### Hooks, called from the acquiring threads
+    def log(self, level, message):
+        """
+        Reports a message of the run.
+
+        :param level: The level of the message, e.g. logging.INFO.
+        :type level: int
+        :param message: The message.
+        :type message: str
+        """
+
+        logger.log(level, message)
+
+    def data_updated(self, snapshot):
+        """ Receives the averaged data after every set, unless the run has an update channel. """
+
+    def progress_updated(self, reps_done):
+        """ Receives the reps completed so far, over all sets. """
+
+    def timing_updated(self, sets_per_second, seconds_left):
+        """ Receives the smoothed set rate and the estimated seconds left (-1 if unknown) after every set. """
+
+    def error_raised(self, error):
+        """ Receives the exception that ended the run. """
+
+    def run_paused(self):
+        """ Called once a paused run holds at a set boundary. """
+
+    def run_finished(self):
+        """ Called once the run has ended and its summary was handed to the data writer. """
+
+    def publish(self, snapshot):
+        """
+        Hands averaged data on to the update channel of the run, or else to data_updated().
+
+        :param snapshot: The data dictionary of the running average.
+        :type snapshot: dict
+        """
+
+        if self.update_channel is not None:
+            self.update_channel.publish(snapshot)
+        else:
+            self.data_updated(snapshot)
+
+    def pause(self):
+        """ Holds the run at its next set boundary, run_paused() is called once there (see the class description). """
+
+        self.gate.pause()
+
+    def resume(self):
+        self.gate.resume()
+
+    def stop(self):
+        self.end_run("stopped") # keeps the reason of a run that already ended
+        self.log(logging.DEBUG, "trying to stop the thread...")
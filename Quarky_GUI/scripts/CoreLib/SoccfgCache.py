@@ -0,0 +1,166 @@
+import os
+import json
+import hashlib
+import datetime
+
+from .NpJson import NpEncoder
+
+# Quarky_GUI/cache, next to the accounts folder
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.realpath(__file__)))),
+                                 'cache')
+
+# The fw_timestamp of the simulated QickSoc (see Simulation.SimulatedSoc)
+SIMULATED_FW_TIMESTAMP = 'simulated'
+
+def is_simulated(soccfg):
+    """
+    Whether a board configuration is that of the simulated QickSoc, whose timings and connections must not end up in
+    the caches of the real boards.
+
+    :param soccfg: The QickConfig, or the dictionary of one.
+    :type soccfg: QickConfig
+    :rtype: bool
+    """
+
+    cfg = soccfg.get_cfg() if hasattr(soccfg, "get_cfg") else soccfg
+    return isinstance(cfg, dict) and cfg.get('fw_timestamp') == SIMULATED_FW_TIMESTAMP
+
+class SoccfgCache:
+    """
+    A local on-disk cache of board configurations (the dictionary returned by soc.get_cfg()), so that reconnecting to
+    a board does not download and unpickle its full configuration again.
+
+    Entries are keyed by the board's IP address and the Pyro URI of its QickSoc. The URI carries the Pyro object id,
+    which a QickSoc server picks anew every time it starts, and loading a new firmware or bitfile means restarting
+    that server: a URI that still matches therefore identifies the same running firmware. Each entry also records
+    the firmware identity (fw_timestamp, sw_version, and bitfile, as far as the configuration reports them) so stale
+    entries can be told apart. Confirming a cached entry only costs the single round trip of binding to the URI.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR):
+        """
+        Initializes the cache.
+
+        :param cache_dir: The folder of the cache, the configurations are kept in its soccfg subfolder.
+        :type cache_dir: str
+        """
+
+        self.cache_dir = os.path.join(cache_dir, 'soccfg')
+
+    def entry_path(self, ip_address, uri):
+        key = hashlib.sha1((str(ip_address) + "|" + str(uri)).encode()).hexdigest()
+        return os.path.join(self.cache_dir, key + '.json')
+
+    def load(self, ip_address, uri):
+        """
+        Looks up the configuration cached for a board.
+
+        :param ip_address: The IP address of the board.
+        :type ip_address: str
+        :param uri: The Pyro URI of the board's QickSoc.
+        :type uri: str
+        :return: The cached configuration dictionary, or None.
+        :rtype: dict
+        """
+
+        try:
+            with open(self.entry_path(ip_address, uri), 'r') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry.get('ip_address') != str(ip_address) or entry.get('uri') != str(uri):
+            return None
+        return entry.get('cfg')
+
+    def store(self, ip_address, uri, cfg):
+        """
+        Caches the configuration of a board. The entry is written to a temporary file first, so an interrupted
+        write never leaves a corrupt entry behind.
+
+        :param ip_address: The IP address of the board.
+        :type ip_address: str
+        :param uri: The Pyro URI of the board's QickSoc.
+        :type uri: str
+        :param cfg: The configuration dictionary returned by soc.get_cfg().
+        :type cfg: dict
+        """
+
+        entry = {
+            'ip_address': str(ip_address),
+            'uri': str(uri),
+            'firmware': {key: cfg.get(key) for key in ('fw_timestamp', 'sw_version', 'bitfile')},
+            'cached': datetime.datetime.now().isoformat(timespec='seconds'),
+            'cfg': cfg,
+        }
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self.entry_path(ip_address, uri)
+        with open(path + '.tmp', 'w') as f:
+            json.dump(entry, f, cls=NpEncoder)
+        os.replace(path + '.tmp', path)
+
+    def invalidate(self, ip_address, uri):
+        """
+        Removes the entry of a board, e.g. when its cached configuration turned out to be wrong.
+
+        :param ip_address: The IP address of the board.
+        :type ip_address: str
+        :param uri: The Pyro URI of the board's QickSoc.
+        :type uri: str
+        """
+
+        try:
+            os.remove(self.entry_path(ip_address, uri))
+        except OSError:
+            pass
+
+class UriCache:
+    """
+    A local on-disk cache of the Pyro URIs resolved through a nameserver, one per account (nameserver host, port,
+    and server name), so that a reconnect can go straight to the QickSoc instead of asking the nameserver again.
+    A cached URI that no longer answers is simply invalidated and resolved again.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR):
+        """
+        Initializes the cache.
+
+        :param cache_dir: The folder of the cache, the URIs are kept in its uris.json file.
+        :type cache_dir: str
+        """
+
+        self.cache_dir = cache_dir
+        self.path = os.path.join(cache_dir, 'uris.json')
+
+    def account_key(self, ns_host, ns_port, server_name):
+        return str(server_name) + "@" + str(ns_host) + ":" + str(ns_port)
+
+    def read(self):
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def write(self, uris):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(self.path + '.tmp', 'w') as f:
+            json.dump(uris, f, indent=4)
+        os.replace(self.path + '.tmp', self.path)
+
+    def load(self, ns_host, ns_port, server_name):
+        """
+        :return: The URI last resolved for the account, or None.
+        :rtype: str
+        """
+
+        return self.read().get(self.account_key(ns_host, ns_port, server_name))
+
+    def store(self, ns_host, ns_port, server_name, uri):
+        uris = self.read()
+        uris[self.account_key(ns_host, ns_port, server_name)] = str(uri)
+        self.write(uris)
+
+    def invalidate(self, ns_host, ns_port, server_name):
+        uris = self.read()
+        if uris.pop(self.account_key(ns_host, ns_port, server_name), None) is not None:
+            self.write(uris)
@@ -0,0 +1,210 @@
+import math
+import itertools
+
+def parse_value(text):
+    """
+    Parses a single sweep value: an int, a float, or else the stripped text itself.
+
+    :param text: The value as typed in the run config.
+    :type text: str
+    :rtype: int | float | str
+    """
+
+    text = text.strip()
+    for cast in (int, float):
+        try:
+            return cast(text)
+        except ValueError:
+            pass
+    return text
+
+def parse_boards(spec):
+    """
+    Parses the shard_boards entry of the run config: the comma separated names of further QickSocs, registered in
+    the same nameserver as the connected one.
+
+    :param spec: The shard_boards text, e.g. "myqick2, myqick3".
+    :type spec: str
+    :rtype: list
+    """
+
+    return [name.strip() for name in str(spec or "").split(",") if name.strip()]
+
+class SweepAxis:
+    """
+    One dimension of an outer sweep: a config key and the values it takes, and any further keys zipped with it, which
+    step through their own values together with it.
+    """
+
+    def __init__(self, key, values, zipped=()):
+        """
+        :param key: The config key set at every point, e.g. yokoVoltage.
+        :type key: str
+        :param values: The values of the key, in order.
+        :type values: list
+        :param zipped: Further axes stepped together with this one, each with as many values.
+        :type zipped: list
+        """
+
+        if len(values) == 0:
+            raise ValueError("The sweep of '" + key + "' has no values.")
+        self.key = key
+        self.values = list(values)
+        self.zipped = list(zipped)
+        for axis in self.zipped:
+            if len(axis) != len(self):
+                raise ValueError("Zipped sweeps need as many values each, '" + key + "' has " + str(len(self)) +
+                                 " but '" + axis.key + "' has " + str(len(axis)) + ".")
+
+    def __len__(self):
+        return len(self.values)
+
+    @property
+    def keys(self):
+        return [self.key] + [axis.key for axis in self.zipped]
+
+    def items(self):
+        """ The (key, values) of the axis and of the axes zipped with it, in order. """
+
+        return [(self.key, self.values)] + [(axis.key, axis.values) for axis in self.zipped]
+
+    @classmethod
+    def parse(cls, text):
+        """
+        Parses an axis written as key=start:stop:num (num evenly spaced values, both ends included) or as
+        key=v1,v2,v3. Several such axes joined by & are zipped, e.g. "yokoVoltage=0:1:11 & read_pulse_freq=0:10:11".
+
+        :param text: The axis, e.g. "yokoVoltage=0:1:11".
+        :type text: str
+        :rtype: SweepAxis
+        """
+
+        axes = [cls.parse_single(part) for part in text.split("&")]
+        return cls(axes[0].key, axes[0].values, axes[1:])
+
+    @classmethod
+    def parse_single(cls, text):
+        key, sep, values = text.partition("=")
+        key, values = key.strip(), values.strip()
+        if not sep or not key or not values:
+            raise ValueError("Expected key=start:stop:num or key=v1,v2,... for a sweep, got '" + text.strip() + "'")
+
+        if ":" in values:
+            parts = values.split(":")
+            try:
+                if len(parts) != 3:
+                    raise ValueError
+                start, stop, num = float(parts[0]), float(parts[1]), int(parts[2])
+            except ValueError:
+                raise ValueError("Expected start:stop:num for the sweep of '" + key + "', with a whole number of "
+                                 "values num, got '" + values + "'") from None
+            if num < 2:
+                return cls(key, [start] * num)
+            step = (stop - start) / (num - 1) # the values of numpy.linspace, which is not imported before a run
+            return cls(key, [start + step * i for i in range(num - 1)] + [stop])
+
+        parts = values.split(",")
+        if any(not part.strip() for part in parts):
+            raise ValueError("Empty value in the sweep of '" + key + "', got '" + values + "'")
+        return cls(key, [parse_value(part) for part in parts])
+
+class Sweep:
+    """
+    An outer sweep over config keys: the experiment is run once (with its sets and reps) at every point, each point
+    setting its keys on top of the config. Points are indexed on the grid of the axes, so that their results stack
+    into arrays of shape sweep.shape + the shape of the experiment's own data.
+
+    The axes are nested, the first one being the outermost (varying slowest), and each axis may zip several keys (see
+    SweepAxis), e.g. "yokoVoltage=0:1:11; read_pulse_freq=6420:6430:21 & read_pulse_gain=1000:3000:21" is a grid
+    of 11 x 21 points, the frequency and gain stepping together along its second dimension.
+    """
+
+    def __init__(self, axes):
+        """
+        :param axes: The axes of the grid, the last one varying fastest.
+        :type axes: list
+        """
+
+        self.axes = list(axes)
+        if not self.axes:
+            raise ValueError("The sweep has no axes.")
+        keys = self.keys
+        for key in keys:
+            if keys.count(key) > 1:
+                raise ValueError("The key '" + key + "' is swept more than once.")
+
+    @classmethod
+    def parse(cls, spec):
+        """
+        Parses the outer_sweep entry of the run config: its axes separated by ; from the outermost to the innermost
+        (see SweepAxis.parse).
+
+        :param spec: The sweep, e.g. "yokoVoltage=0:1:11; read_pulse_freq=6420,6425,6430"; empty for none. Empty axes
+            between separators are skipped, but a spec of separators only is an error.
+        :type spec: str
+        :return: The sweep, or None if spec is empty.
+        :rtype: Sweep
+        """
+
+        spec = str(spec or "").strip()
+        if not spec:
+            return None
+        return cls([SweepAxis.parse(axis) for axis in spec.split(";") if axis.strip()])
+
+    @property
+    def shape(self):
+        return tuple(len(axis) for axis in self.axes)
+
+    @property
+    def size(self):
+        return math.prod(self.shape)
+
+    @property
+    def keys(self):
+        return [key for axis in self.axes for key in axis.keys]
+
+    def dims(self):
+        """
+        The grid dimension of every key, zipped keys sharing theirs.
+
+        :rtype: dict
+        """
+
+        return {key: dim for dim, axis in enumerate(self.axes) for key in axis.keys}
+
+    def overrides(self, index, config=None):
+        """
+        The config entries set at a point. A value is cast to int where the config already holds an int and the value
+        is a whole number, as the config tree would.
+
+        :param index: The grid index of the point.
+        :type index: tuple
+        :param config: The config the point is run on top of.
+        :type config: dict
+        :rtype: dict
+        """
+
+        overrides = {}
+        for axis, i in zip(self.axes, index):
+            for key, values in axis.items():
+                value = values[i]
+                current = (config or {}).get(key)
+                if (isinstance(current, int) and not isinstance(current, bool) and isinstance(value, (int, float)) and
+                        float(value).is_integer()):
+                    value = int(value)
+                overrides[key] = value
+        return overrides
+
+    def points(self, config=None):
+        """
+        Yields every point of the sweep in order, as (grid index, config overrides).
+
+        :param config: The config the points are run on top of.
+        :type config: dict
+        """
+
+        for index in itertools.product(*(range(n) for n in self.shape)):
+            yield index, self.overrides(index, config)
+
+    def __repr__(self):
+        return "<Sweep " + " x ".join("&".join(axis.keys) + "[" + str(len(axis)) + "]" for axis in self.axes) + ">"
@@ -0,0 +1,124 @@
+import time
+import threading
+from contextlib import contextmanager
+
+class RunTimer:
+    """
+    Timings of a run: how long each stage of a set takes, and how fast sets complete.
+
+    Stages are timed from whichever thread runs them (the experiment worker, the data writer, the GUI), so every
+    method is thread safe. The set rate is smoothed with an exponential moving average of the time between completed
+    sets, so the remaining time estimate follows changes (e.g. a slower board) without jumping on every set.
+    """
+
+    def __init__(self, smoothing=0.2):
+        """
+        Initializes the timer, the run is taken to start now.
+
+        :param smoothing: The weight of the latest set interval in the moving average, between 0 and 1.
+        :type smoothing: float
+        """
+
+        self.smoothing = smoothing
+        self.lock = threading.Lock()
+        self.stages = {} # stage name -> [count, total seconds, max seconds]
+        self.start = time.monotonic()
+        self.last_set = self.start
+        self.sets_done = 0
+        self.interval = None # smoothed seconds per set
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Times the enclosed block as one occurrence of a stage.
+
+        :param name: The name of the stage, e.g. 'acquire'.
+        :type name: str
+        """
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, name, seconds):
+        """
+        Records one occurrence of a stage.
+
+        :param name: The name of the stage.
+        :type name: str
+        :param seconds: How long it took.
+        :type seconds: float
+        """
+
+        with self.lock:
+            entry = self.stages.setdefault(name, [0, 0.0, 0.0])
+            entry[0] += 1
+            entry[1] += seconds
+            entry[2] = max(entry[2], seconds)
+
+    def set_done(self):
+        """ Records the completion of a set, updating the smoothed set rate. """
+
+        now = time.monotonic()
+        with self.lock:
+            interval = now - self.last_set
+            self.last_set = now
+            self.sets_done += 1
+            if self.interval is None:
+                self.interval = interval
+            else:
+                self.interval += self.smoothing * (interval - self.interval)
+
+    def sets_per_second(self):
+        """ The smoothed number of sets completed per second, 0 before the first set. """
+
+        with self.lock:
+            return 1.0 / self.interval if self.interval else 0.0
+
+    def remaining(self, sets_left):
+        """
+        The estimated seconds until sets_left more sets are complete, None before the first set.
+
+        :param sets_left: The number of sets still to run.
+        :type sets_left: int
+        :rtype: float
+        """
+
+        with self.lock:
+            if self.interval is None:
+                return None
+            return max(sets_left, 0) * self.interval
+
+    def elapsed(self):
+        return time.monotonic() - self.start
+
+    def table(self):
+        """
+        The timing table of the stages so far.
+
+        :return: For each stage, its count, total_s, mean_s, and max_s.
+        :rtype: dict
+        """
+
+        with self.lock:
+            return {name: {'count': count, 'total_s': total, 'mean_s': total / count, 'max_s': longest}
+                    for name, (count, total, longest) in self.stages.items()}
+
+def format_duration(seconds):
+    """
+    Formats a duration as h:mm:ss (or m:ss under an hour).
+
+    :param seconds: The duration, None gives '--:--'.
+    :type seconds: float
+    :rtype: str
+    """
+
+    if seconds is None:
+        return "--:--"
+    minutes, secs = divmod(int(round(seconds)), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return "{}:{:02d}:{:02d}".format(hours, minutes, secs)
+    return "{}:{:02d}".format(minutes, secs)
@@ -1,8 +1,54 @@
 # Quarky_GUI/scripts/CoreLib/__init__.py
 """
 CoreLib module initialization.
+
+The names below are available from the package (e.g. from scripts.CoreLib import ExperimentClass), but the module of
+each is only imported when the name is first looked up, so that importing the package does not import qick, Pyro4,
+h5py, or numpy (see benchmarks/startup_benchmark.py). They are listed in __all__, so that from scripts.CoreLib
+import * provides them as the star imports of Experiment and socProxy did. Classes named after their module (e.g.
+RunFile) are imported from the module itself, from scripts.CoreLib.RunFile import RunFile, as the package attribute
+is the submodule.
 """
 
-# Optional: Import key modules
-from .Experiment import *
-from .socProxy import *
+import importlib
+
+# Optional: Import key names, each from its module
+_NAMES = {
+    "MakeFile": "Experiment",
+    "ExperimentClass": "Experiment",
+    "NpEncoder": "NpJson",
+    "makeProxy": "socProxy",
+    "DEFAULT_NS_PORT": "socProxy",
+    "DEFAULT_SERVER_NAME": "socProxy",
+    "numeric_array": "Accumulator",
+    "StreamingAccumulator": "Accumulator",
+    "DatasetProxy": "LazyData",
+    "LazyFile": "LazyData",
+    "UriCache": "SoccfgCache",
+    "is_simulated": "SoccfgCache",
+    "RunTimer": "Timing",
+    "format_duration": "Timing",
+    "estimate_runtime": "RuntimeEstimate",
+    "RuntimeCalibration": "RuntimeEstimate",
+    "SweepAxis": "Sweep",
+    "ExperimentRegistry": "ExperimentLoader",
+    "experiment_registry": "ExperimentLoader",
+    "import_file": "ExperimentLoader",
+    "find_experiment": "ExperimentLoader",
+    "PauseGate": "RunQueue",
+    "config_hash": "ProgramCache",
+    "program_cache": "ProgramCache",
+}
+
+__all__ = list(_NAMES)
+
+def __getattr__(name):
+    module_name = _NAMES.get(name)
+    if module_name is None:
+        raise AttributeError("module " + repr(__name__) + " has no attribute " + repr(name))
+    value = getattr(importlib.import_module("." + module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(_NAMES))
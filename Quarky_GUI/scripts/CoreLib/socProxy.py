@@ -1,23 +1,87 @@
-import Pyro4
-from qick import QickConfig
+from .SoccfgCache import is_simulated
+
+DEFAULT_NS_PORT = 8888
+DEFAULT_SERVER_NAME = "myqick"
+
+def makeProxy(ns_host, ns_port=DEFAULT_NS_PORT, server_name=DEFAULT_SERVER_NAME, timeout=None, progress=None,
+              cache=None, uri_cache=None):
+    """
+    Connects to the QickSoc served over Pyro4 under server_name, through the nameserver at ns_host. The simulated
+    QickSoc (see Simulation.SimulatedSoc) is never stored in the caches of the real boards.
+
+    @param ns_host - ip address of the nameserver (the RFSoC)
+    @param ns_port - port of the nameserver
+    @param server_name - name the QickSoc is registered under in the nameserver
+    @param timeout - seconds before any step of the connection gives up, None waits forever
+    @param progress - optional callable taking a str, told about each step of the connection
+    @param cache - optional SoccfgCache; a configuration cached for the same board and URI is only confirmed
+                   rather than downloaded again with get_cfg()
+    @param uri_cache - optional UriCache; the QickSoc is first tried directly at the URI last resolved for this
+                       account, and the nameserver is only asked when that fails
+    @return - the soc proxy and its QickConfig
+    """
+    # Imported on connect rather than with this module, both take a while to import
+    import Pyro4
+    from qick import QickConfig
 
-def makeProxy(ns_host):
     Pyro4.config.SERIALIZER = "pickle"
     Pyro4.config.PICKLE_PROTOCOL_VERSION=4
 
-    # ns_host = "192.168.1.7"
-    ns_port = 8888
-    server_name = "myqick"
+    def report(message):
+        if progress is not None:
+            progress(message)
+
+    # Try the URI resolved on the last connection first, binding is the only round trip
+    soc = None
+    resolved = False # the URI came from the nameserver, and is cached once the soc is known to be a board
+    uri = None if uri_cache is None else uri_cache.load(ns_host, ns_port, server_name)
+    if uri is not None:
+        report("Connecting directly to " + str(uri))
+        soc = Pyro4.Proxy(uri)
+        soc._pyroTimeout = timeout
+        try:
+            soc._pyroBind()
+        except Pyro4.errors.PyroError: # server restarted (new object id) or moved, ask the nameserver
+            soc._pyroRelease()
+            soc = None
+            uri_cache.invalidate(ns_host, ns_port, server_name)
+
+    if soc is None:
+        report("Locating nameserver at " + str(ns_host) + ":" + str(ns_port))
+        # Equivalent of Pyro4.locateNS(host=ns_host, port=ns_port), but with a timeout on the connection
+        ns = Pyro4.Proxy("PYRO:" + Pyro4.constants.NAMESERVER_NAME + "@" + str(ns_host) + ":" + str(ns_port))
+        ns._pyroTimeout = timeout
+        uri = ns.lookup(server_name)
+        ns._pyroRelease()
+
+        soc = Pyro4.Proxy(uri)
+        soc._pyroTimeout = timeout
+        soc._pyroBind()
+        resolved = True
 
-    ns = Pyro4.locateNS(host=ns_host, port=ns_port)
+    # The proxy is bound, so the QickSoc behind the URI is being served: a configuration cached for it is current
+    soccfg = None
+    cfg = None if cache is None else cache.load(ns_host, uri)
+    if cfg is not None:
+        report("Using the cached configuration of " + server_name)
+        try:
+            soccfg = QickConfig(cfg)
+            str(soccfg)
+        except Exception: # unusable entry, e.g. cached by another qick version
+            cache.invalidate(ns_host, uri)
+            soccfg = None
 
-    # print the nameserver entries: you should see the QickSoc proxy
-    for k,v in ns.list().items():
-        print(k,v)
+    if soccfg is None:
+        report("Fetching the configuration of " + server_name)
+        cfg = soc.get_cfg()
+        soccfg = QickConfig(cfg)
+        if cache is not None and not is_simulated(cfg):
+            cache.store(ns_host, uri, cfg)
+    if resolved and uri_cache is not None and not is_simulated(soccfg):
+        uri_cache.store(ns_host, ns_port, server_name, uri)
 
-    soc = Pyro4.Proxy(ns.lookup(server_name))
-    soccfg = QickConfig(soc.get_cfg())
+    soc._pyroTimeout = None # acquisitions may legitimately take longer than the connection timeout
     return(soc, soccfg)
 
 # soc, soccfg = makeProxy()
-# print("debug")
\ No newline at end of file
+# print("debug")
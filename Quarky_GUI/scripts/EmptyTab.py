@@ -0,0 +1,52 @@
+"""
+===========
+EmptyTab.py
+===========
+The placeholder shown in the central tabs module until the first experiment or data tab is opened.
+
+It stands in for a QQuarkTab (it has the attributes and methods the main window uses on any tab) without importing
+the QuarkTab module, so that pyqtgraph, h5py, and numpy are only imported once a tab that plots is opened.
+"""
+
+from PyQt5.QtCore import Qt
+from PyQt5.QtWidgets import (
+    QWidget,
+    QVBoxLayout,
+    QLabel,
+)
+
+from scripts.Init.initialize import BaseConfig, RunConfig
+
+class QEmptyTab(QWidget):
+    """
+    The placeholder tab, neither an experiment nor a data tab.
+    """
+
+    def __init__(self, parent=None):
+        """
+        Initializes the placeholder tab.
+
+        :param parent: The parent widget.
+        :type parent: QWidget
+        """
+
+        super().__init__(parent)
+
+        self.config = {"Experiment Config": {}, "Base Config": BaseConfig,
+                       "Run Config": dict(RunConfig)} # default config found in initialize.py
+        self.tab_name = "None"
+        self.experiment_obj = None
+        self.is_experiment = False
+
+        self.main_layout = QVBoxLayout(self)
+        self.hint_label = QLabel("Load an experiment or a data file to get started.")
+        self.hint_label.setAlignment(Qt.AlignCenter)
+        self.hint_label.setObjectName("hint_label")
+        self.main_layout.addWidget(self.hint_label)
+        self.setLayout(self.main_layout)
+
+    def finish_run(self, wait=False):
+        """ Nothing to finish, the placeholder never runs. """
+
+    def release_files(self):
+        """ Nothing to release, the placeholder has no files. """
@@ -0,0 +1,226 @@
+"""
+=========================
+ExperimentLibraryPanel.py
+=========================
+The experiment library side panel: the experiment files of the library folders, opened in a new tab with a double
+click.
+
+The files are listed from the persistent ExperimentIndex, so the library shows straight away on startup without
+importing any experiment module, and kept up to date by a scanner on its own thread, which reads only the files that
+are new or changed since the last scan. It rescans every RESCAN_INTERVAL seconds, and whenever a folder is added or
+"Rescan" is pressed.
+"""
+
+import os
+import threading
+
+from PyQt5.QtCore import QObject, QThread, QTimer, QSize, Qt, pyqtSignal, qInfo, qWarning
+from PyQt5.QtWidgets import (
+    QWidget,
+    QSizePolicy,
+    QVBoxLayout,
+    QHBoxLayout,
+    QLineEdit,
+    QTableWidget,
+    QTableWidgetItem,
+    QAbstractItemView,
+    QHeaderView,
+    QFileDialog,
+    QInputDialog,
+)
+
+from scripts.CoreLib.ExperimentIndex import ExperimentIndex
+import scripts.Helpers as Helpers
+
+class LibraryScanner(QObject):
+    """
+    Scans the library folders on the thread it is moved to, scan() being requested as a queued slot.
+    """
+
+    scanned = pyqtSignal(int, int) # Signal with the number of files read and of entries dropped
+    failed = pyqtSignal(str) # Signal with the error message
+
+    def __init__(self, index, parent=None):
+        """
+        Initializes the scanner.
+
+        :param index: The index to keep up to date.
+        :type index: ExperimentIndex
+        :param parent: The parent QObject.
+        :type parent: QObject
+        """
+
+        super().__init__(parent)
+        self.index = index
+        self.stopping = threading.Event() # set from the GUI thread to end a scan in progress
+
+    def scan(self):
+        if self.stopping.is_set():
+            return
+        try:
+            read, dropped = self.index.scan(cancelled=self.stopping.is_set)
+        except Exception as e:
+            self.failed.emit(str(e))
+            return
+        self.scanned.emit(read, dropped)
+
+class QExperimentLibraryPanel(QWidget):
+    """
+    The experiment library panel.
+    """
+
+    ### Signals
+    openRequested = pyqtSignal(str) # argument is the path of the experiment file to open
+    scanRequested = pyqtSignal() # queued to the scanner's thread
+
+    COLUMNS = ("Experiment", "Class", "Plotter")
+    RESCAN_INTERVAL = 10 # seconds
+
+    def __init__(self, parent=None, index=None):
+        """
+        Initializes the panel and starts scanning the library folders.
+
+        :param parent: The parent widget.
+        :type parent: QWidget
+        :param index: The index shown, by default the one saved on this computer.
+        :type index: ExperimentIndex
+        """
+
+        super(QExperimentLibraryPanel, self).__init__(parent)
+
+        self.index = index if index is not None else ExperimentIndex()
+
+        sizepolicy = QSizePolicy(QSizePolicy.MinimumExpanding, QSizePolicy.Preferred)
+        sizepolicy.setHeightForWidth(self.sizePolicy().hasHeightForWidth())
+        self.setMinimumSize(QSize(175, 0))
+        self.setSizePolicy(sizepolicy)
+        self.setObjectName("experiment_library_panel")
+
+        self.main_layout = QVBoxLayout(self)
+        self.main_layout.setContentsMargins(0, 0, 0, 0)
+        self.main_layout.setSpacing(2)
+
+        # Filter on the name, class, and folder of the experiments
+        self.filter_edit = QLineEdit()
+        self.filter_edit.setPlaceholderText("Filter experiments")
+        self.filter_edit.setClearButtonEnabled(True)
+        self.filter_edit.setObjectName("filter_edit")
+        self.main_layout.addWidget(self.filter_edit)
+
+        # Table of the experiment files, by name
+        self.library_table = QTableWidget(0, len(self.COLUMNS))
+        self.library_table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.library_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.library_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.library_table.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.library_table.verticalHeader().setVisible(False)
+        self.library_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.library_table.setObjectName("library_table")
+        self.main_layout.addWidget(self.library_table)
+
+        # Library buttons
+        self.button_layout = QHBoxLayout()
+        self.button_layout.setContentsMargins(5, 0, 5, 5)
+        self.button_layout.setSpacing(2)
+        self.open_button = Helpers.create_button("Open", "open_button", True, self)
+        self.add_folder_button = Helpers.create_button("Add Folder", "add_folder_button", True, self)
+        self.remove_folder_button = Helpers.create_button("Remove Folder", "remove_folder_button", True, self)
+        self.rescan_button = Helpers.create_button("Rescan", "rescan_button", True, self)
+        self.button_layout.addWidget(self.open_button)
+        self.button_layout.addWidget(self.add_folder_button)
+        self.button_layout.addWidget(self.remove_folder_button)
+        self.button_layout.addWidget(self.rescan_button)
+        self.main_layout.addLayout(self.button_layout)
+
+        self.setLayout(self.main_layout)
+
+        # The scanner thread, and the timer keeping the index up to date
+        self.scan_thread = QThread()
+        self.scanner = LibraryScanner(self.index)
+        self.scanner.moveToThread(self.scan_thread)
+        self.rescan_timer = QTimer(self)
+        self.rescan_timer.setInterval(1000 * self.RESCAN_INTERVAL)
+
+        self.setup_signals()
+        self.refresh()
+        self.scan_thread.start()
+        self.rescan_timer.start()
+        self.scanRequested.emit()
+
+    def setup_signals(self):
+        self.filter_edit.textChanged.connect(self.refresh)
+        self.library_table.itemDoubleClicked.connect(lambda item: self.openRequested.emit(item.data(Qt.UserRole)))
+        self.open_button.clicked.connect(self.open_selected)
+        self.add_folder_button.clicked.connect(self.add_folder)
+        self.remove_folder_button.clicked.connect(self.remove_folder)
+        self.rescan_button.clicked.connect(self.scanRequested.emit)
+        self.scanRequested.connect(self.scanner.scan)
+        self.scanner.scanned.connect(self.scan_finished)
+        self.scanner.failed.connect(lambda error: qWarning("Scanning the experiment library failed: " + error))
+        self.rescan_timer.timeout.connect(self.scanRequested.emit)
+
+    def refresh(self):
+        """ Shows the experiments of the index that match the filter. """
+
+        words = self.filter_edit.text().lower().split()
+        entries = [entry for entry in self.index.experiments() if all(
+            word in (entry['name'] + " " + " ".join(entry['experiment_classes']) + " " + entry['path']).lower()
+            for word in words)]
+
+        self.library_table.setRowCount(len(entries))
+        for row, entry in enumerate(entries):
+            tooltip = entry['path']
+            if entry['config_template'] is not None:
+                tooltip += "\n" + "\n".join("  " + str(key) + ": " + str(value)
+                                            for key, value in entry['config_template'].items())
+            elif not entry['has_config_template']:
+                tooltip += "\nNo config_template in the class " + entry['name']
+            for column, text in enumerate((entry['name'], ", ".join(entry['experiment_classes']),
+                                           "yes" if entry['has_plotter'] else "")):
+                item = QTableWidgetItem(text)
+                item.setData(Qt.UserRole, entry['path'])
+                item.setToolTip(tooltip)
+                self.library_table.setItem(row, column, item)
+
+    def scan_finished(self, read, dropped):
+        if read or dropped:
+            qInfo("Experiment library updated: " + str(read) + " file(s) read, " + str(dropped) + " removed.")
+            self.refresh()
+
+    def open_selected(self):
+        items = self.library_table.selectedItems()
+        if items:
+            self.openRequested.emit(items[0].data(Qt.UserRole))
+
+    def add_folder(self):
+        """
+        Adds a library folder per user input, scanning it straight away.
+        """
+
+        directory = QFileDialog.getExistingDirectory(self, "Add Experiment Folder", os.path.abspath(".."))
+        if directory and self.index.add_directory(directory):
+            qInfo("Added the experiment library folder: " + directory)
+            self.scanRequested.emit()
+
+    def remove_folder(self):
+        """
+        Removes a library folder per user input.
+        """
+
+        if not self.index.directories:
+            return
+        directory, ok = QInputDialog.getItem(self, "Remove Experiment Folder", "Folder:", self.index.directories,
+                                             0, False)
+        if ok and self.index.remove_directory(directory):
+            qInfo("Removed the experiment library folder: " + directory)
+            self.scanRequested.emit()
+
+    def stop(self):
+        """
+        Stops the scanner thread, ending a scan in progress at the next file.
+        """
+
+        self.rescan_timer.stop()
+        self.scanner.stopping.set()
+        self.scan_thread.quit()
+        self.scan_thread.wait()
@@ -1,4 +1,4 @@
-import inspect
+import copy
 import numpy as np
 from PyQt5.QtCore import qCritical, qInfo, qDebug
 from PyQt5.QtWidgets import (
@@ -7,7 +7,7 @@ from PyQt5.QtWidgets import (
 import pyqtgraph as pg
 
 from scripts.Init.initialize import BaseConfig
-from scripts.CoreLib.Experiment import ExperimentClass
+from scripts.CoreLib.ExperimentLoader import find_experiment
 
 class ExperimentObject():
     def __init__(self, experiment_tab, experiment_name, experiment_module=None):
@@ -19,6 +19,7 @@ class ExperimentObject():
         self.experiment_tab = experiment_tab
         self.experiment_class = None
         self.experiment_plotter = None
+        self.config_template = None # the config_template of the module, as given (the tab edits a copy)
 
         self.extract_experiment_attributes()
 
@@ -30,36 +31,29 @@ class ExperimentObject():
         TODO: Based on the Experiment Class to-be set.
         """
 
-        # Loop through all members (classes) of the experiment module to find the matching class
-        """
-        Changes: Instead of searching for a matching name, it looks for the ExperimentClass class, that is the wrapper 
-        class. But, the config attribute is given in the direct experiment class, not the wrapper.
-        """
-        for name, obj, in inspect.getmembers(self.experiment_module):
-
-            # Cannot to issubclass as of now because inheriting from different ExperimentClass files.
-            if inspect.isclass(obj) and obj.__bases__[0].__name__ == "ExperimentClass" and obj is not ExperimentClass:
-                qInfo("Found experiment class: " + name)
-                # Store the class reference
-                self.experiment_class = obj
-                # Store the class's plotter function
-                if hasattr(obj, "plotter") and callable(getattr(obj, "plotter")):
-                    qInfo("Found experiment plotter.")
-                    self.experiment_plotter = getattr(obj, "plotter")
-                else:
-                    qDebug("This experiment class does not have a plotter function.")
-
-            if name == self.experiment_name:
-                if not hasattr(obj, "config_template") or obj.config_template is None:
-                    QMessageBox.critical(None, "Error", "No Config Template given.")
-                else:
-                    qInfo("Found config variable in the class: " + name)
-                    new_experiment_config = obj.config_template
-                    # Remove overlapping keys from base config
-                    for key in new_experiment_config:
-                        self.experiment_tab.config["Base Config"].pop(key, None)
-
-                    self.experiment_tab.config["Experiment Config"] = new_experiment_config
+        # The experiment class is the one derived directly from the ExperimentClass wrapper class, while the config
+        # attribute is given in the direct experiment class, named after the file (see find_experiment)
+        self.experiment_class, self.experiment_plotter, self.config_template = find_experiment(
+            self.experiment_module, self.experiment_name)
+        new_experiment_config = self.config_template
+
+        if self.experiment_class is not None:
+            qInfo("Found experiment class: " + self.experiment_class.__name__)
+            if self.experiment_plotter is not None:
+                qInfo("Found experiment plotter.")
+            else:
+                qDebug("This experiment class does not have a plotter function.")
+
+        if new_experiment_config is None:
+            QMessageBox.critical(None, "Error", "No Config Template given.")
+        else:
+            qInfo("Found config variable in the class: " + self.experiment_name)
+            # Remove overlapping keys from base config
+            for key in new_experiment_config:
+                self.experiment_tab.config["Base Config"].pop(key, None)
+
+            # A copy, as the module (and so its template) is shared by every tab of the file (see ExperimentRegistry)
+            self.experiment_tab.config["Experiment Config"] = copy.deepcopy(new_experiment_config)
 
         # Verify experiment_instance
         if self.experiment_class is None:
@@ -1,56 +1,58 @@
-from PyQt5.QtCore import QObject, pyqtSignal, qWarning, qDebug
-from qick import AveragerProgram, RAveragerProgram
+import logging
 
-class ExperimentThread(QObject):
+from PyQt5.QtCore import QObject, pyqtSignal, qInfo, qWarning, qDebug, qCritical
+
+from scripts.CoreLib.SetRunner import SetRunner
+
+class ExperimentThread(QObject, SetRunner):
     """
     This class is used to run an RFSOC experiment, meant to be used on a separate QThread than the main loop.
     The point is that running an RFSOC experiment will take a very long time, and we don't want to lock up the UI while
     that's going on. The intended usage is for an ExterimentThread object to be created, moved to a new QThread, then run.
     It will then communicate with the main program via signals, as intended in Qt, making it thread-safe.
+
+    The sets themselves are run by SetRunner (pipelining, sub-batches of reps, retries, early stopping, timings, and
+    pausing at set boundaries are all described there); this class only turns the hooks of SetRunner into signals and
+    its messages into the Qt log.
     """
+
     finished = pyqtSignal() # Signal to send when done running
     updateData = pyqtSignal(object) # Signal to send when receiving new data, including the new data dictionary
-    updateProgress = pyqtSignal(int) # Signal to send when finishing a set to update the setsComplete bar
+    updateProgress = pyqtSignal(int) # Signal to send with the reps completed so far, to update the progress bar
+    updateTiming = pyqtSignal(float, float) # Signal with the sets per second and the seconds left (-1 if unknown)
     RFSOC_error = pyqtSignal(Exception) # Signal to send when the RFSOC encounters an error
+    paused = pyqtSignal() # Signal to send once a paused run holds at a set boundary
 
-    def __init__(self, config, soccfg, exp, soc, parent = None):
-        super().__init__(parent)
-        self.config = config # The config file used to run the experiment
+    def __init__(self, config, soccfg, exp, soc, parent = None, run_config = None, update_channel = None,
+                 data_writer = None, timer = None, gate = None):
+        super().__init__(parent=parent, config=config, soccfg=soccfg, exp=exp, soc=soc, run_config=run_config,
+                         update_channel=update_channel, data_writer=data_writer, timer=timer, gate=gate)
         self.parent = parent # We don't actually want to give it the parent window, that can cause blocking
-        self.experiment_instance = exp # The object representing an instance of a QickProgram subclass to be run
-        self.soc = soc # The RFSOC!
-
-        # ### create the experiment instance
-        # self.experiment_instance = exp(soccfg, self.config)
 
-        if not exp:
-            qDebug('Warning: None experiment. Going to crash in 3, 2, 1...')
+    def log(self, level, message):
+        if level >= logging.ERROR:
+            qCritical(message)
+        elif level >= logging.WARNING:
+            qWarning(message)
+        elif level >= logging.INFO:
+            qInfo(message)
+        else:
+            qDebug(message)
 
-    def run(self):
-        """ Run the RFSOC experiment. """
-        #yoko1.SetVoltage(self.config["yokoVoltage"]) # this needs to go somewhere else
+    def data_updated(self, snapshot):
+        self.updateData.emit(snapshot)
 
-        self.running = True
-        idx_set = 0
+    def progress_updated(self, reps_done):
+        self.updateProgress.emit(reps_done)
 
-        ### loop over all the sets for the data taking
-        while self.running and idx_set < self.config["sets"]:
+    def timing_updated(self, sets_per_second, seconds_left):
+        self.updateTiming.emit(sets_per_second, seconds_left)
 
-            try:
-                data = self.experiment_instance.acquire()
-                data['data']['set_num'] = idx_set
-            except Exception as e:
-                self.RFSOC_error.emit(e)
-                self.finished.emit()
-                return # Do not want to update data -- no new data was recorded!
+    def error_raised(self, error):
+        self.RFSOC_error.emit(error)
 
-            # Emit the signal with new data and update the progress bar with additional set complete
-            self.updateData.emit(data)
-            self.updateProgress.emit(idx_set + 1)
-            idx_set += 1
+    def run_paused(self):
+        self.paused.emit()
 
+    def run_finished(self):
         self.finished.emit()
-
-    def stop(self):
-        self.running = False
-        qDebug("trying to stop the thread...")
\ No newline at end of file
@@ -1,27 +1,17 @@
 import os
-import importlib
-import h5py
 from PyQt5.QtWidgets import (
     QPushButton,
 )
 
-def import_file(full_path_to_module):
-    try:
-        module_dir, module_file = os.path.split(full_path_to_module)
-        module_name, module_ext = os.path.splitext(module_file)
-        loader = importlib.machinery.SourceFileLoader(module_name, full_path_to_module)
-        module_obj = loader.load_module()
-        module_obj.__file__ = full_path_to_module
-        globals()[module_name] = module_obj
-    except Exception as e:
-        raise ImportError(e)
-    return module_obj, module_name
+from scripts.CoreLib.ExperimentLoader import import_file # experiment files are loaded the same way without the GUI
 
 def h5_to_dict(h5file):
+    import h5py # imported on the first load rather than at startup
     with h5py.File(h5file, "r") as f:
         data_dict = {}
         for key in f.keys():
-            data_dict[key] = f[key][()]  # Load dataset into memory
+            if isinstance(f[key], h5py.Dataset): # groups hold the per set history and errors of run files
+                data_dict[key] = f[key][()]  # Load dataset into memory
         return data_dict
 
 # Should be moved to Helpers
@@ -73,3 +73,24 @@ BaseConfig={
         # Try varying adc_trig_offset from 100 to 220 clock ticks
         "cavity_LO": 0.0,
        }
+
+###### define default run configuration
+### These options control how the GUI runs an experiment (not the experiment itself) and are shown in the
+### config tree under "Run Config". They are never passed to the experiment class.
+RunConfig={
+        "pipeline_depth": 2, # sets acquired ahead of processing, 0 runs acquisition and processing in lockstep
+        "max_refresh_rate": 10, # Hz, the most live plot updates per second, faster sets are coalesced (0 = every set shown)
+        "save_policy": "every_set", # every_set, every_n_sets, every_t_seconds, or end_of_run
+        "save_every_n_sets": 10, # sets per write for the every_n_sets policy
+        "save_every_seconds": 30.0, # seconds between writes for the every_t_seconds policy
+        "reps_per_chunk": 0, # reps per sub-batch of a set, so stop and progress act within a set (0 = whole sets)
+        "target_snr": 0.0, # stop once the averaged IQ data reaches this signal to noise ratio (0 = off), sets is the max
+        "target_stderr": 0.0, # stop once no IQ point has a larger standard error than this (0 = off)
+        "min_sets": 3, # sets always run before the targets above are checked
+        "max_runtime_minutes": 0.0, # runs estimated to take longer than this are refused before starting (0 = no limit)
+        "max_retries": 3, # attempts to reacquire a set after a dropped connection before the run is stopped
+        "retry_backoff": 2.0, # seconds before the first retry of a set, doubled on every further retry
+        "outer_sweep": "", # config keys run at each value, key=start:stop:num or key=v1,v2,..., nested with ; and
+                           # zipped with &, e.g. yokoVoltage=0:1:11; read_pulse_freq=6420:6430:21 (empty = no sweep)
+        "shard_boards": "", # further QickSocs in the same nameserver sharing the outer sweep, e.g. myqick2,myqick3
+       }
@@ -0,0 +1,123 @@
+"""
+====================
+LiveUpdateChannel.py
+====================
+A coalescing, rate-limited channel for live data updates between the experiment worker and a QQuarkTab.
+
+The worker publishes every averaged set, from its own thread, but only the latest one is kept. A timer in the GUI
+thread delivers that latest set at most max_refresh_rate times per second, so a fast experiment can never flood the
+Qt event queue: updates that arrive in between are coalesced and counted as dropped frames.
+
+With a max_refresh_rate of 0 there is no limit and no timer: every published update is queued to the GUI thread and
+delivered, none are coalesced.
+"""
+
+import time
+import threading
+
+from PyQt5.QtCore import Qt, QObject, QTimer, pyqtSignal, qInfo
+
+class LiveUpdateChannel(QObject):
+    """
+    The latest-wins update channel. Must be created in the GUI thread; publish() may be called from any thread.
+    """
+
+    updateData = pyqtSignal(object) # Signal delivering the latest data, always emitted in the GUI thread
+    framesDropped = pyqtSignal(int) # Signal with the total number of coalesced updates, sent when it changes
+    updateQueued = pyqtSignal(object) # Signal queuing every update to the GUI thread, when there is no limit
+
+    def __init__(self, max_refresh_rate=10, parent=None, timer=None):
+        """
+        Initializes the channel.
+
+        :param max_refresh_rate: The maximum number of deliveries per second, 0 delivers every update.
+        :type max_refresh_rate: float
+        :param parent: The parent QObject.
+        :type parent: QObject
+        :param timer: The timer of the run, each delivery (the plotting done by the connected slots) is timed as its
+            'plot' stage.
+        :type timer: RunTimer
+        """
+
+        super().__init__(parent)
+
+        self.lock = threading.Lock()
+        self.pending = None # latest published data not yet delivered
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.last_reported_drops = 0
+        self.run_timer = timer
+        self.unlimited = max_refresh_rate <= 0
+
+        self.timer = None
+        if self.unlimited: # a timer with an interval of 0 would fire on every pass of the event loop
+            self.updateQueued.connect(self.emit_update, Qt.QueuedConnection)
+        else:
+            self.timer = QTimer(self)
+            self.timer.setInterval(int(1000 / max_refresh_rate))
+            self.timer.timeout.connect(self.deliver)
+
+    def start(self):
+        """ Starts delivering updates. """
+
+        if self.timer is not None:
+            self.timer.start()
+
+    def stop(self):
+        """ Stops the delivery timer after flushing the last pending update, and reports the dropped frames. """
+
+        if self.timer is not None:
+            self.timer.stop()
+            self.deliver()
+        qInfo("Live updates: " + str(self.delivered) + " of " + str(self.published) + " shown, " +
+              str(self.dropped) + " coalesced.")
+
+    def publish(self, data):
+        """
+        Replaces the pending update with new data. Thread safe.
+
+        :param data: The data dictionary to be delivered.
+        :type data: dict
+        """
+
+        if self.unlimited:
+            with self.lock:
+                self.published += 1
+            self.updateQueued.emit(data)
+            return
+
+        with self.lock:
+            if self.pending is not None:
+                self.dropped += 1
+            self.pending = data
+            self.published += 1
+
+    def deliver(self):
+        """
+        Emits the pending update, if any. Runs in the GUI thread on every timer tick.
+        """
+
+        with self.lock:
+            data, self.pending = self.pending, None
+            dropped = self.dropped
+
+        if data is not None:
+            self.emit_update(data)
+        if dropped != self.last_reported_drops:
+            self.last_reported_drops = dropped
+            self.framesDropped.emit(dropped)
+
+    def emit_update(self, data):
+        """
+        Emits an update to the connected slots, timing them. Runs in the GUI thread.
+
+        :param data: The data dictionary to be delivered.
+        :type data: dict
+        """
+
+        self.delivered += 1
+        start = time.perf_counter()
+        self.updateData.emit(data) # the slots in the GUI thread run before emit returns
+        if self.run_timer is not None:
+            self.run_timer.record('plot', time.perf_counter() - start)
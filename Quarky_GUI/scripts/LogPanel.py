@@ -1,6 +1,6 @@
 import os
 
-from PyQt5.QtCore import (QSize, QtMsgType, qInstallMessageHandler,
+from PyQt5.QtCore import (QSize, QtMsgType, qInstallMessageHandler, pyqtSignal,
     qDebug,
     qInfo,
     qWarning,
@@ -15,6 +15,8 @@ from PyQt5.QtWidgets import (
 
 class QLogPanel(QWidget):
 
+    messageLogged = pyqtSignal(str) # Signal with a formatted message, queued to the GUI thread when logged elsewhere
+
     def __init__(self, parent=None):
         super(QLogPanel, self).__init__(parent)
 
@@ -44,6 +46,9 @@ class QLogPanel(QWidget):
         self.main_layout.addWidget(self.logger)
         self.setLayout(self.main_layout)
 
+        # Messages are logged from the worker threads too, but the text edit may only be touched by the GUI thread
+        self.messageLogged.connect(self.logger.append)
+
     def message_handler(self, mode, context, message):
         color_map = {
             QtMsgType.QtDebugMsg: "#8AC6F2",  # Light blue
@@ -56,5 +61,5 @@ class QLogPanel(QWidget):
         color = color_map.get(mode, "#CCCCCC")  # Default gray
         formatted_message = f'<span style="color:{color}">> {message}</span>'
 
-        self.logger.append(formatted_message)
+        self.messageLogged.emit(formatted_message)
         # self.logger.ensureCursorVisible()
\ No newline at end of file
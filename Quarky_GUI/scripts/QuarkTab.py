@@ -10,14 +10,13 @@ data, and plotting.
 
 import os
 import json
-import h5py
 from pathlib import Path
 import datetime
 import shutil
 
 import numpy as np
 from PyQt5.QtCore import (
-    Qt, QSize, qCritical, qInfo, qDebug, QRect, QTimer
+    Qt, QSize, qCritical, qInfo, qDebug, QRect, QTimer, pyqtSignal
 )
 from PyQt5.QtWidgets import (
     QApplication,
@@ -32,10 +31,12 @@ from PyQt5.QtWidgets import (
     QFileDialog,
 )
 import pyqtgraph as pg
-from fontTools.ttx import process
 
-from scripts.Init.initialize import BaseConfig
+from scripts.Init.initialize import BaseConfig, RunConfig
 from scripts.ExperimentObject import ExperimentObject
+from scripts.CoreLib.RunFile import RunFile
+from scripts.CoreLib.DataWriter import DataWriter
+from scripts.CoreLib.LazyData import LazyFile, DatasetProxy
 import scripts.Helpers as Helpers
 
 class QQuarkTab(QWidget):
@@ -43,6 +44,9 @@ class QQuarkTab(QWidget):
     The class for QQuarkTabs that make up the central tabular module.
     """
 
+    ### Signals
+    runSaved = pyqtSignal(object) # Signal with the DataWriter of a run, emitted from its thread once the file is closed
+
     def __init__(self, experiment_module=None, tab_name=None, is_experiment=None, dataset_file=None):
         """
         Initializes an instance of a QQuarkTab widget.
@@ -68,14 +72,21 @@ class QQuarkTab(QWidget):
         super().__init__()
 
         ### Experiment Variables
-        self.config = {"Experiment Config": {}, "Base Config": BaseConfig} # default conifg found in initializ.py
+        self.config = {"Experiment Config": {}, "Base Config": BaseConfig,
+                       "Run Config": dict(RunConfig)} # default conifg found in initializ.py
         self.tab_name = str(tab_name)
         self.experiment_obj = None if experiment_module is None else ExperimentObject(self, self.tab_name, experiment_module)
         self.is_experiment = is_experiment
         self.dataset_file = dataset_file
         self.data = None
         self.plots = []
+        self.plot_items = {} # the pyqtgraph items of each auto plot, updated in place between sets
+        self.plot_schema = None # the layout the current auto plots were built for
         self.output_dir = None
+        self.data_writer = None # the DataWriter saving the experiment run in progress
+        self.closing_writers = [] # the DataWriters of finished runs still writing what is pending
+        self.lazy_file = None # the LazyFile of a data tab, datasets are read from it on demand
+        self.max_plot_points = 2048 # the most points read per axis of a dataset for plotting
 
         ### Setting up the Tab
         self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
@@ -143,6 +154,7 @@ class QQuarkTab(QWidget):
         self.snip_plot_button.clicked.connect(self.capture_plot_to_clipboard)
         self.export_data_button.clicked.connect(self.export_data)
         self.output_dir_button.clicked.connect(self.change_output_dir)
+        self.runSaved.connect(self.run_saved) # queued, the writer thread emits it
 
         if self.is_experiment:
             self.output_dir_button.setEnabled(True)
@@ -160,17 +172,64 @@ class QQuarkTab(QWidget):
                 self.plot_method_combo.addItems(["Plot: " + self.tab_name])
                 self.plot_method_combo.setCurrentText("Plot: " + self.tab_name)
 
+    def reload_experiment(self, experiment_module, config):
+        """
+        Replaces the experiment of the tab with that of its reloaded module, keeping the data and plots. Entries of
+        the Experiment Config that were changed from the old config_template are kept if the new template still has
+        them, and the Base and Run Config are kept as they are.
+
+        :param experiment_module: The module of the changed experiment file.
+        :type experiment_module: module
+        :param config: The current config of the tab, with the Experiment Config, Base Config, and Run Config.
+        :type config: dict
+        :return: Whether the new module holds a valid experiment, the tab is left unchanged if not.
+        :rtype: bool
+        """
+
+        old_obj, old_config = self.experiment_obj, self.config
+        self.config = {"Experiment Config": {}, "Base Config": config["Base Config"],
+                       "Run Config": config.get("Run Config", dict(RunConfig))}
+        new_obj = ExperimentObject(self, self.tab_name, experiment_module)
+        if new_obj.experiment_class is None:
+            self.experiment_obj, self.config = old_obj, old_config
+            return False
+        self.experiment_obj = new_obj
+
+        old_template = old_obj.config_template or {}
+        for key, value in config["Experiment Config"].items():
+            if key in self.config["Experiment Config"] and (key not in old_template or value != old_template[key]):
+                self.config["Experiment Config"][key] = value
+
+        self.plot_method_combo.clear()
+        self.setup_plotter_options()
+        return True
+
     def load_dataset_file(self, dataset_file):
         """
-        Takes the dataset file and loads the dict, before calling the plotter.
+        Takes the dataset file and opens it lazily, before calling the plotter. The data dict holds a DatasetProxy
+        for each top level dataset (and the standard errors of a run file), so only what is plotted is ever read.
 
         :param dataset_file: The path to the dataset file.
         :type dataset_file: str
         """
 
-        self.data = Helpers.h5_to_dict(dataset_file)
+        self.lazy_file = LazyFile(dataset_file)
+        self.data = {key: proxy for key, proxy in self.lazy_file.group().items()}
+        if self.lazy_file.group("errors"):
+            self.data = {'data': self.data, 'errors': self.lazy_file.group("errors")}
+        if self.lazy_file.config() is not None:
+            self.config = {"Experiment Config": self.lazy_file.config()}
         self.plot_data()
 
+    def release_files(self):
+        """
+        Closes the data file of a data tab. Called when the tab is closed.
+        """
+
+        if self.lazy_file is not None:
+            self.lazy_file.close()
+            self.lazy_file = None
+
     def clear_plots(self):
         """
         Clears the plots.
@@ -178,6 +237,8 @@ class QQuarkTab(QWidget):
 
         self.plot_widget.ci.clear()
         self.plots = []
+        self.plot_items = {}
+        self.plot_schema = None
 
     def update_coordinates(self, pos):
         """
@@ -211,20 +272,31 @@ class QQuarkTab(QWidget):
         """
         Plots the data of the QQuarkTab experiment/dataset using prepared data that is prepared by
         the specified plotting method of the dropdown menu.
-        """
 
-        self.clear_plots()
-        self.plots = []
+        Auto plots are only built when the layout of the data changes (see plot_schema); later sets update the
+        existing items in place, avoiding a full rebuild and the flicker that comes with it.
+        """
 
         plotting_method = self.plot_method_combo.currentText()[6:] # Get the Plotting Method
         if plotting_method == "Auto": # Use auto preparation
-            self.auto_plot_prepare()
+            prepared_data = self.auto_plot_prepare()
+            schema = self.plot_schema_of(prepared_data)
+            if schema == self.plot_schema:
+                self.auto_plot_update(prepared_data)
+            else:
+                self.clear_plots()
+                self.auto_plot_build(prepared_data)
+                self.plot_schema = schema
         elif plotting_method == self.tab_name: # Use the experiment's preparation
+            self.clear_plots()
             self.experiment_obj.experiment_plotter(self.plot_widget, self.plots, self.data)
 
     def auto_plot_prepare(self):
         """
         Automatically prepares the data based on its shape. (Not always correct but tries to infer)
+
+        :return: The prepared data, sorted into line plots, images, and column (IQ) plots.
+        :rtype: dict
         """
         prepared_data = {"plots": [], "images": [], "columns": []}
 
@@ -232,24 +304,30 @@ class QQuarkTab(QWidget):
         if 'data' in self.data:
             f = self.data['data']
         for name, data in f.items():
-            if isinstance(data, int):
+            if isinstance(data, int) or (isinstance(data, DatasetProxy) and data.ndim == 0):
                 continue
-            if isinstance(data, list):
-                data = np.array(data[0][0])
+            error = None
+            if isinstance(self.data.get('errors'), dict) and name in self.data['errors']:
+                error = self.data['errors'][name]
+            data, error = self.plottable(data), None if error is None else self.plottable(error)
             shape = data.shape
 
             # Handle 1D data -> 2D Plots
             if len(shape) == 1:
                 x_data = None
                 if 'x_pts' in f:
-                    x_data = list(f['x_pts'])
+                    x_data = f['x_pts']
+                    if isinstance(x_data, DatasetProxy): # read with the same stride as the y data
+                        x_data = self.plottable(x_data)
+                    x_data = np.asarray(x_data)
                     if name == 'x_pts':
                         continue
-                    y_data = list(data)
+                    y_data = np.asarray(data)
                     if len(x_data) == len(y_data):
                         prepared_data["plots"].append({
                             "x": x_data,
                             "y": y_data,
+                            "error": error,
                             "label": name,
                             "xlabel": "Qubit Frequency (GHz)",
                             "ylabel": "a.u."
@@ -272,87 +350,157 @@ class QQuarkTab(QWidget):
                     "colormap": "inferno"
                 })
 
+        return prepared_data
+
+    def plottable(self, data):
+        """
+        Turns a data entry into the array that is plotted: only the first readout channel of per channel data
+        (lists, or arrays of more than 2 dimensions) is plotted, and datasets of a data file are only read at the
+        resolution a plot can show.
+
+        :param data: The data entry.
+        :type data: list or numpy.ndarray or DatasetProxy
+        :rtype: numpy.ndarray
+        """
+
+        if isinstance(data, DatasetProxy):
+            leading = (0, 0) if data.ndim > 2 else ()
+            return data.decimated(self.max_plot_points, leading)
+        if isinstance(data, list) or (isinstance(data, np.ndarray) and data.ndim > 2):
+            return np.array(data[0][0])
+        return data
+
+    def plot_schema_of(self, prepared_data):
+        """
+        The layout of a set of prepared data: which plots exist, of what kind, and in which order. Plots built for
+        one schema can be updated in place with any data of the same schema.
+
+        :param prepared_data: The output of auto_plot_prepare().
+        :type prepared_data: dict
+        :rtype: tuple
+        """
+
+        return tuple((kind, item["label"]) for kind in ("plots", "images", "columns") for item in prepared_data[kind])
+
+    def auto_plot_build(self, prepared_data):
+        """
+        Creates the plot items for prepared data, keeping a handle on each in self.plot_items.
+
+        :param prepared_data: The output of auto_plot_prepare().
+        :type prepared_data: dict
+        """
+
         # Create the plots
-        if "plots" in prepared_data:
-            for i, plot in enumerate(prepared_data["plots"]):
-                p = self.plot_widget.addPlot(title=plot["label"])
-                p.addLegend()
-                p.plot(plot["x"], plot["y"], pen='b', symbol='o', symbolSize=5, symbolBrush='b')
-                p.setLabel('bottom', plot["xlabel"])
-                p.setLabel('left', plot["ylabel"])
-                self.plots.append(p)
+        for i, plot in enumerate(prepared_data["plots"]):
+            p = self.plot_widget.addPlot(title=plot["label"])
+            p.addLegend()
+            curve = p.plot(plot["x"], plot["y"], pen='b', symbol='o', symbolSize=5, symbolBrush='b')
+            p.setLabel('bottom', plot["xlabel"])
+            p.setLabel('left', plot["ylabel"])
+            self.plot_items[("plots", plot["label"])] = {"plot": p, "curve": curve, "error_bars": None}
+            self.update_error_bars(("plots", plot["label"]), plot)
+            self.plots.append(p)
+            self.plot_widget.nextRow()
+
+        for i, img in enumerate(prepared_data["images"]):
+            # Create PlotItem
+            p = self.plot_widget.addPlot(title=img["label"])
+            p.setLabel('bottom', img["xlabel"])
+            p.setLabel('left', img["ylabel"])
+            p.showGrid(x=True, y=True)
+
+            # Create ImageItem
+            image_item = pg.ImageItem(img["data"].T)
+            p.addItem(image_item)
+            color_map = pg.colormap.get(img["colormap"])  # e.g., 'viridis'
+            image_item.setLookupTable(color_map.getLookupTable())
+
+            # Create ColorBarItem
+            color_bar = pg.ColorBarItem(values=(np.nanmin(img["data"]), np.nanmax(img["data"])), # NaN: not run yet
+                                        colorMap=color_map)
+            color_bar.setImageItem(image_item, insert_in=p)  # Add color bar to the plot
+
+            self.plot_items[("images", img["label"])] = {"plot": p, "image": image_item, "color_bar": color_bar}
+            self.plots.append(p)
+            if len(self.plots) % 2 == 0: self.plot_widget.nextRow()
+
+        for i, column in enumerate(prepared_data["columns"]):
+            x_data = column["data"][:, 0]  # X-values (real part)
+            y_data = column["data"][:, 1]  # Y-values (imaginary part)
+
+            # Create PlotItem for IQ plot
+            p = self.plot_widget.addPlot(title=column["label"])
+            p.setLabel('bottom', column["xlabel"])
+            p.setLabel('left', column["ylabel"])
+
+            # Plot the scatter plot (IQ plot)
+            scatter = p.plot(x_data, y_data, pen=None, symbol='o', symbolSize=5, symbolBrush='b')
+
+            self.plot_items[("columns", column["label"])] = {"plot": p, "curve": scatter}
+            self.plots.append(p)
+            if len(self.plots) % 2 == 0:  # Move to next row every 2 plots
                 self.plot_widget.nextRow()
 
-        if "images" in prepared_data:
-            for i, img in enumerate(prepared_data["images"]):
-                # Create PlotItem
-                p = self.plot_widget.addPlot(title=img["label"])
-                p.setLabel('bottom', img["xlabel"])
-                p.setLabel('left', img["ylabel"])
-                p.showGrid(x=True, y=True)
-
-                # Create ImageItem
-                image_item = pg.ImageItem(img["data"].T)
-                p.addItem(image_item)
-                color_map = pg.colormap.get(img["colormap"])  # e.g., 'viridis'
-                image_item.setLookupTable(color_map.getLookupTable())
-
-                # Create ColorBarItem
-                color_bar = pg.ColorBarItem(values=(image_item.image.min(), image_item.image.max()),
-                                            colorMap=color_map)
-                color_bar.setImageItem(image_item, insert_in=p)  # Add color bar to the plot
-
-                self.plots.append(p)
-                if len(self.plots) % 2 == 0: self.plot_widget.nextRow()
-
-        if "columns" in prepared_data:
-            for i, column in enumerate(prepared_data["columns"]):
-                x_data = column["data"][:, 0]  # X-values (real part)
-                y_data = column["data"][:, 1]  # Y-values (imaginary part)
-
-                # Create PlotItem for IQ plot
-                p = self.plot_widget.addPlot(title=column["label"])
-                p.setLabel('bottom', column["xlabel"])
-                p.setLabel('left', column["ylabel"])
-
-                # Plot the scatter plot (IQ plot)
-                p.plot(x_data, y_data, pen=None, symbol='o', symbolSize=5, symbolBrush='b')
-
-                self.plots.append(p)
-                if len(self.plots) % 2 == 0:  # Move to next row every 2 plots
-                    self.plot_widget.nextRow()
-        return
+    def auto_plot_update(self, prepared_data):
+        """
+        Updates the existing plot items in place with new prepared data of the same schema.
+
+        :param prepared_data: The output of auto_plot_prepare().
+        :type prepared_data: dict
+        """
+
+        for plot in prepared_data["plots"]:
+            self.plot_items[("plots", plot["label"])]["curve"].setData(plot["x"], plot["y"])
+            self.update_error_bars(("plots", plot["label"]), plot)
+
+        for img in prepared_data["images"]:
+            items = self.plot_items[("images", img["label"])]
+            items["image"].setImage(img["data"].T, autoLevels=False)
+            items["color_bar"].setLevels((np.nanmin(img["data"]), np.nanmax(img["data"])))
+
+        for column in prepared_data["columns"]:
+            self.plot_items[("columns", column["label"])]["curve"].setData(column["data"][:, 0], column["data"][:, 1])
+
+    def update_error_bars(self, key, plot):
+        """
+        Draws or updates the error bars of a line plot, once its standard errors are known (2+ sets averaged).
+
+        :param key: The key of the plot in self.plot_items.
+        :type key: tuple
+        :param plot: The prepared line plot.
+        :type plot: dict
+        """
+
+        if plot["error"] is None or not np.isfinite(plot["error"]).any():
+            return
+
+        items = self.plot_items[key]
+        height = 2 * np.nan_to_num(plot["error"])
+        if items["error_bars"] is None:
+            items["error_bars"] = pg.ErrorBarItem(x=plot["x"], y=plot["y"], height=height, pen='b')
+            items["plot"].addItem(items["error_bars"])
+        else:
+            items["error_bars"].setData(x=plot["x"], y=plot["y"], height=height)
 
     def process_data(self, data):
         """
-        Processes the dataset usually in the form of averaging.
+        Processes the dataset. The averaging over sets is done by the experiment worker's accumulator, so the data
+        arrives here already averaged and is only stored.
 
         :param data: The data to be processed.
         :type data: dict
         """
-        self.data = data
 
-        # check what set number is being run and average the data
-        set_num = data['data']['set_num']
-        if set_num == 0:
-            self.data_cur = data
-        elif set_num > 0:
-            avgi = (self.data_cur['data']['avgi'][0][0] * (set_num) + data['data']['avgi'][0][0]) / (set_num + 1)
-            avgq = (self.data_cur['data']['avgq'][0][0] * (set_num) + data['data']['avgq'][0][0]) / (set_num + 1)
-            self.data_cur['data']['avgi'][0][0] = avgi
-            self.data_cur['data']['avgq'][0][0] = avgq
-        self.data['data']['avgi'][0][0] = self.data_cur['data']['avgi'][0][0]
-        self.data['data']['avgq'][0][0] = self.data_cur['data']['avgq'][0][0]
+        self.data = data
 
     def update_data(self, data):
         """
         Is the slot for the emission of data from the experiment thread.
-        Calls the methods to process and plot the data.
+        Calls the methods to process and plot the data. Saving happens per set in the run file (see open_run_file).
         """
 
         self.process_data(data)
         self.plot_data()
-        self.save_data()
 
     def export_data(self):
         self.prepare_file_naming()
@@ -382,6 +530,101 @@ class QQuarkTab(QWidget):
             self.folder_name = self.tab_name + "_" + date_string
             self.file_name = self.tab_name + "_" + date_time_string
 
+    def experiment_file_paths(self):
+        """
+        Creates the output folders of the experiment if needed and returns the paths of its data, config, and image
+        files, based on the current file naming.
+
+        :return: The .h5, .json, and .png file paths.
+        :rtype: tuple
+        """
+
+        if not hasattr(self, 'file_name') or not hasattr(self, 'folder_name'):
+            self.prepare_file_naming()
+
+        folder_path = os.path.join(self.output_dir + "/" + self.tab_name, self.folder_name)
+        Path(folder_path).mkdir(parents=True, exist_ok=True) # Make directories if they don't already exist
+
+        return (os.path.join(folder_path, self.file_name + '.h5'),
+                os.path.join(folder_path, self.file_name + '.json'),
+                os.path.join(folder_path, self.file_name + '.png'))
+
+    def open_run_file(self, config, run_config=None, timer=None):
+        """
+        Starts the files of a new experiment run: the config is saved once, and the returned DataWriter is handed to
+        the experiment worker, which appends each set to it. The writer saves the run file on its own thread
+        according to the save policy of the run config.
+
+        :param config: The config the experiment is run with.
+        :type config: dict
+        :param run_config: The run config holding the save policy.
+        :type run_config: dict
+        :param timer: The timer of the run, whose timing table the writer stores when the run file is closed.
+        :type timer: RunTimer
+        :return: The writer of the new run.
+        :rtype: DataWriter
+        """
+
+        run_config = RunConfig | (run_config or {})
+        self.prepare_file_naming()
+        data_filename, config_filename, self.run_image_filename = self.experiment_file_paths()
+
+        self.save_config(config_filename, config)
+        self.data_writer = DataWriter(RunFile(data_filename, config), policy=run_config["save_policy"],
+                                      every_n=run_config["save_every_n_sets"],
+                                      every_seconds=run_config["save_every_seconds"], timer=timer)
+        qInfo("Saving run to " + data_filename + " (" + run_config["save_policy"] + ")")
+        return self.data_writer
+
+    def finish_run(self, wait=False):
+        """
+        Saves the final plot image once the experiment worker is done, and has the writer write what is pending and
+        close the run file on its own thread, run_saved() reporting once it did. Safe to call more than once.
+
+        :param wait: Whether to wait for the run files still being written, e.g. before quitting.
+        :type wait: bool
+        """
+
+        if self.data_writer is not None:
+            data_writer, self.data_writer = self.data_writer, None
+            self.save_image(self.run_image_filename)
+            self.closing_writers.append(data_writer)
+            data_writer.close(on_closed=lambda: self.runSaved.emit(data_writer))
+
+        if wait:
+            for data_writer in list(self.closing_writers):
+                data_writer.join()
+                self.run_saved(data_writer)
+
+    def run_saved(self, data_writer):
+        """
+        Reports a run file closed by its writer, with whatever failed to be written.
+
+        :param data_writer: The writer of the run.
+        :type data_writer: DataWriter
+        """
+
+        if data_writer not in self.closing_writers:
+            return # already reported
+        self.closing_writers.remove(data_writer)
+        for e in data_writer.errors:
+            qCritical(f"Failed to save the run to {data_writer.path}: {str(e)}")
+        qDebug("Run saved to " + data_writer.path)
+
+    def save_config(self, config_filename, config):
+        try:
+            with open(config_filename, "w") as json_file:
+                json.dump(config, json_file, indent=4)
+        except Exception as e:
+            qCritical(f"Failed to save the configuration to {config_filename}: {str(e)}")
+
+    def save_image(self, image_filename):
+        try:
+            pixmap = self.plot_widget.grab()
+            pixmap.save(image_filename, "PNG")
+        except Exception as e:
+            qCritical(f"Failed to save the plot image to {image_filename}: {str(e)}")
+
     def save_data(self):
         if not hasattr(self, 'file_name') or not hasattr(self, 'folder_name'):
             self.prepare_file_naming()
@@ -406,44 +649,18 @@ class QQuarkTab(QWidget):
         elif self.is_experiment:
             date_time_now = datetime.datetime.now()
             date_time_string = date_time_now.strftime("%Y_%m_%d_%H_%M_%S")
-            data_filename = os.path.join(self.output_dir + "/" + self.tab_name, self.folder_name, self.file_name + '.h5')
-            config_filename = os.path.join(self.output_dir + "/" + self.tab_name, self.folder_name, self.file_name + '.json')
-            image_filename = os.path.join(self.output_dir + "/" + self.tab_name, self.folder_name, self.file_name + '.png')
-
-            # Make directories if they don't already exist
-            if not Path(self.output_dir + "/" + self.tab_name).is_dir():
-                os.mkdir(self.output_dir + "/" + self.tab_name)
-            if not Path(os.path.join(self.output_dir + "/" + self.tab_name, self.folder_name)).is_dir():
-                os.mkdir(os.path.join(self.output_dir + "/" + self.tab_name, self.folder_name))
-
-            # Save dataset
-            data_file = h5py.File(data_filename, 'w')  # Create file if does not exist, truncate mode if exists
+            data_filename, config_filename, image_filename = self.experiment_file_paths()
+
+            # Save a snapshot of the current (averaged) dataset
             if isinstance(self.data, dict) and 'data' in self.data and isinstance(self.data['data'], dict):
-                for key, datum in self.data['data'].items():
-                    datum = np.array(datum)
-                    try:
-                        data_file.create_dataset(key, shape=datum.shape,
-                                                 maxshape=tuple([None] * len(datum.shape)),
-                                                 dtype=str(datum.astype(np.float64).dtype))
-                    except RuntimeError as e:
-                        qCritical(f"Failed to save the dataset to {data_filename}: {str(e)}")
-                        del data_file[key]
-                    data_file[key][...] = datum
-            data_file.close()
-
-            # Save config
-            try:
-                with open(config_filename, "w") as json_file:
-                    json.dump(self.config, json_file, indent=4)
-            except Exception as e:
-                qCritical(f"Failed to save the configuration to {config_filename}: {str(e)}")
-
-            # Save image
-            try:
-                pixmap = self.plot_widget.grab()
-                pixmap.save(image_filename, "PNG")
-            except Exception as e:
-                qCritical(f"Failed to save the plot image to {image_filename}: {str(e)}")
+                try:
+                    with RunFile(data_filename, self.config) as data_file:
+                        data_file.write_average(self.data)
+                except Exception as e:
+                    qCritical(f"Failed to save the dataset to {data_filename}: {str(e)}")
+
+            self.save_config(config_filename, self.config)
+            self.save_image(image_filename)
 
             qDebug("Data export attempted at " + date_time_string +
                   " to: " + self.output_dir + "/" + self.tab_name + "/" + self.folder_name)
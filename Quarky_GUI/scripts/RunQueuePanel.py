@@ -0,0 +1,173 @@
+"""
+================
+RunQueuePanel.py
+================
+The run queue side panel: the persistent queue of experiment runs (see RunQueue) and the controls to fill it and to
+start working through it.
+
+"Add Current" queues the experiment of the current tab with its config as it is now, at the priority set next to
+it, as a periodic job if "Every" is set to a number of minutes. While the queue is started, Quarky runs the queued
+experiments back to back (see Quarky.run_next_queued); the panel only shows and edits the queue.
+"""
+
+import datetime
+
+from PyQt5.QtCore import QSize, Qt, pyqtSignal, qWarning
+from PyQt5.QtWidgets import (
+    QWidget,
+    QSizePolicy,
+    QVBoxLayout,
+    QHBoxLayout,
+    QTableWidget,
+    QTableWidgetItem,
+    QAbstractItemView,
+    QHeaderView,
+    QSpinBox,
+    QDoubleSpinBox,
+    QLabel,
+)
+
+from scripts.CoreLib.RunQueue import RunQueue
+import scripts.Helpers as Helpers
+
+class QRunQueuePanel(QWidget):
+    """
+    The run queue panel.
+    """
+
+    ### Signals
+    addCurrentRequested = pyqtSignal(int, float) # arguments are the priority and the interval in minutes (0 = once)
+    queueToggled = pyqtSignal(bool) # whether the queue is started
+
+    COLUMNS = ("Priority", "Experiment", "Every", "Status")
+
+    def __init__(self, parent=None, run_queue=None):
+        """
+        Initializes the panel.
+
+        :param parent: The parent widget.
+        :type parent: QWidget
+        :param run_queue: The queue shown, by default the one saved on this computer.
+        :type run_queue: RunQueue
+        """
+
+        super(QRunQueuePanel, self).__init__(parent)
+
+        self.run_queue = run_queue if run_queue is not None else RunQueue()
+
+        sizepolicy = QSizePolicy(QSizePolicy.MinimumExpanding, QSizePolicy.Preferred)
+        sizepolicy.setHeightForWidth(self.sizePolicy().hasHeightForWidth())
+        self.setMinimumSize(QSize(175, 0))
+        self.setSizePolicy(sizepolicy)
+        self.setObjectName("run_queue_panel")
+
+        self.main_layout = QVBoxLayout(self)
+        self.main_layout.setContentsMargins(0, 0, 0, 0)
+        self.main_layout.setSpacing(2)
+
+        # Table of the queue entries, in the order they run
+        self.queue_table = QTableWidget(0, len(self.COLUMNS))
+        self.queue_table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.queue_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.queue_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.queue_table.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.queue_table.verticalHeader().setVisible(False)
+        self.queue_table.horizontalHeader().setSectionResizeMode(1, QHeaderView.Stretch)
+        self.queue_table.setObjectName("queue_table")
+        self.main_layout.addWidget(self.queue_table)
+
+        # Priority and interval of the entry to add
+        self.add_layout = QHBoxLayout()
+        self.add_layout.setContentsMargins(5, 0, 5, 0)
+        self.priority_spin = QSpinBox()
+        self.priority_spin.setRange(-99, 99)
+        self.priority_spin.setToolTip("Higher priorities run first.")
+        self.priority_spin.setObjectName("priority_spin")
+        self.interval_spin = QDoubleSpinBox()
+        self.interval_spin.setRange(0, 10000)
+        self.interval_spin.setDecimals(1)
+        self.interval_spin.setSuffix(" min")
+        self.interval_spin.setToolTip("Run again every this many minutes, preempting other runs at a set boundary "
+                                      "(0 = run once).")
+        self.interval_spin.setObjectName("interval_spin")
+        self.add_layout.addWidget(QLabel("Priority"))
+        self.add_layout.addWidget(self.priority_spin)
+        self.add_layout.addWidget(QLabel("Every"))
+        self.add_layout.addWidget(self.interval_spin)
+        self.main_layout.addLayout(self.add_layout)
+
+        # Queue buttons
+        self.button_layout = QHBoxLayout()
+        self.button_layout.setContentsMargins(5, 0, 5, 5)
+        self.button_layout.setSpacing(2)
+        self.add_button = Helpers.create_button("Add Current", "add_button", True, self)
+        self.remove_button = Helpers.create_button("Remove", "remove_button", True, self)
+        self.clear_button = Helpers.create_button("Clear Finished", "clear_button", True, self)
+        self.start_button = Helpers.create_button("Start Queue", "start_button", True, self)
+        self.start_button.setCheckable(True)
+        self.button_layout.addWidget(self.add_button)
+        self.button_layout.addWidget(self.remove_button)
+        self.button_layout.addWidget(self.clear_button)
+        self.button_layout.addWidget(self.start_button)
+        self.main_layout.addLayout(self.button_layout)
+
+        self.setLayout(self.main_layout)
+        self.setup_signals()
+        self.refresh()
+
+    def setup_signals(self):
+        self.add_button.clicked.connect(lambda: self.addCurrentRequested.emit(self.priority_spin.value(),
+                                                                              self.interval_spin.value()))
+        self.remove_button.clicked.connect(self.remove_selected)
+        self.clear_button.clicked.connect(self.clear_finished)
+        self.start_button.toggled.connect(self.toggle_queue)
+
+    def refresh(self):
+        """ Shows the entries of the queue, in the order they run. """
+
+        entries = self.run_queue.ordered()
+        self.queue_table.setRowCount(len(entries))
+        for row, entry in enumerate(entries):
+            every = "{:g} min".format(entry['interval_minutes']) if entry['interval_minutes'] > 0 else ""
+            status = entry['status']
+            if entry['last_run'] is not None:
+                status += " " + datetime.datetime.fromtimestamp(entry['last_run']).strftime("%H:%M")
+            for column, text in enumerate((str(entry['priority']), entry['name'], every, status)):
+                item = QTableWidgetItem(text)
+                item.setData(Qt.UserRole, entry['id'])
+                item.setToolTip(entry['path'] + ("\nlast stop reason: " + str(entry['stop_reason'])
+                                                 if entry['stop_reason'] else ""))
+                self.queue_table.setItem(row, column, item)
+
+    def add_entry(self, path, experiment_config, run_config):
+        """
+        Queues an experiment with the priority and interval set in the panel.
+
+        :param path: The path of the experiment file.
+        :type path: str
+        :param experiment_config: The Experiment Config to run it with.
+        :type experiment_config: dict
+        :param run_config: The Run Config to run it with.
+        :type run_config: dict
+        :return: The new entry.
+        :rtype: dict
+        """
+
+        entry = self.run_queue.add(path, experiment_config, run_config, self.priority_spin.value(),
+                                   self.interval_spin.value())
+        self.refresh()
+        return entry
+
+    def remove_selected(self):
+        items = self.queue_table.selectedItems()
+        if items and not self.run_queue.remove(items[0].data(Qt.UserRole)):
+            qWarning("A running entry cannot be removed, stop it first.")
+        self.refresh()
+
+    def clear_finished(self):
+        self.run_queue.clear_finished()
+        self.refresh()
+
+    def toggle_queue(self, started):
+        self.start_button.setText("Pause Queue" if started else "Start Queue")
+        self.queueToggled.emit(started)
@@ -0,0 +1,221 @@
+"""
+A simulated QickSoc served over Pyro4 on this computer, for running the GUI, the experiment worker, and the
+benchmarks without a board.
+
+The server starts its own nameserver and registers the simulated soc in it, so that makeProxy() (and therefore the
+accounts panel) connects to it exactly as to a board. Run it with::
+
+    python -m scripts.Simulation.SimulatedSoc --ns-port 8888 --server-name myqick --noise 0.3 --latency 0.05
+
+from the Quarky_GUI folder, then connect an account with IP 127.0.0.1 and load scripts/Simulation/SimulatedSpec.py.
+
+The simulated soc is not a full board: it serves get_cfg() and simulated_acquire(), but no tProcessor, signal
+generators, or readout buffers. Only experiments that acquire through simulated_acquire() (such as SimulatedSpec)
+run on it; experiments calling prog.acquire(soc) on their qick programs (AveragerProgram, RAveragerProgram, ...) fail
+on their first call to the board. Building those programs works, as that is done on the host: SimulatedSpec builds
+the program a board would run, though it acquires through simulated_acquire(). The accounts panel says so while it is
+connected.
+
+Its configuration has the fw_timestamp SIMULATED_FW_TIMESTAMP, so that the GUI keeps it out of the caches of the real
+boards (the soccfg cache, uris.json, and runtime_calibration.json, see SoccfgCache.is_simulated).
+"""
+
+import time
+import random
+import argparse
+import threading
+
+import numpy as np
+import Pyro4
+import Pyro4.naming
+from qick import get_version
+
+from scripts.CoreLib.socProxy import DEFAULT_NS_PORT, DEFAULT_SERVER_NAME
+from scripts.CoreLib.RuntimeEstimate import sweep_points, shot_time
+from scripts.CoreLib.SoccfgCache import SIMULATED_FW_TIMESTAMP
+
+def simulated_cfg():
+    """
+    The configuration dictionary of the simulated board: a ZCU216 style firmware with two signal generators and two
+    readouts, complete enough for QickConfig to describe it and convert times and frequencies, and for qick programs
+    to be built for it on the host (see SimulatedSpec).
+
+    :rtype: dict
+    """
+
+    dac = {'fs': 9830.4, 'fs_mult': 40, 'fs_div': 1, 'interpolation': 1, 'f_fabric': 614.4}
+    adc = {'fs': 2457.6, 'fs_mult': 10, 'fs_div': 1, 'decimation': 1, 'coupling': 'AC', 'f_fabric': 307.2}
+    gen = {'type': 'axis_signal_gen_v6', 'dac': '20', 'fs': 9830.4, 'f_fabric': 614.4, 'samps_per_clk': 16,
+           'maxlen': 65536, 'complex_env': True, 'has_dds': True, 'has_mixer': False, 'b_dds': 32, 'f_dds': 9830.4,
+           'fs_mult': 40, 'fdds_div': 1, 'interpolation': 1, 'b_phase': 32, 'maxv': 32766, 'maxv_scale': 1.0,
+           'tproc_ch': 0}
+    readout = {'ro_type': 'axis_readout_v2', 'adc': '20', 'f_output': 307.2, 'f_fabric': 307.2, 'b_dds': 32,
+               'f_dds': 2457.6, 'fs_mult': 10, 'fdds_div': 1, 'avgbuf_type': 'axis_avg_buffer', 'avgbuf_version': '1.0',
+               'avgbuf_fullpath': 'avg_buf_0', 'has_edge_counter': False, 'has_weights': False, 'avg_maxlen': 16384,
+               'buf_maxlen': 1024, 'trigger_type': 'tproc', 'trigger_port': 0, 'trigger_bit': 14, 'tproc_ch': 0,
+               'iq_offset': 0, 'has_outsel': False}
+    return {
+        'board': 'ZCU216',
+        'sw_version': get_version(),
+        'fw_timestamp': SIMULATED_FW_TIMESTAMP,
+        'refclk_freq': 245.76,
+        'rf': {'clk_groups': [[['dac', 2], ['adc', 2]]], 'dac_power': 'simulated',
+               'dacs': {'20': dac, '22': dict(dac)}, 'adcs': {'20': adc, '21': dict(adc)}},
+        'gens': [gen, dict(gen, dac='22', tproc_ch=1)],
+        'iqs': [],
+        'readouts': [readout, dict(readout, adc='21', avgbuf_fullpath='avg_buf_1', trigger_bit=15, tproc_ch=1)],
+        'tprocs': [{'type': 'axis_tproc64x32_x8', 'revision': 4, 'f_time': 430.08, 'pmem_size': 65536,
+                    'dmem_size': 4096, 'output_pins': [], 'start_pin': None}],
+        'extra_description': ["\n\tSimulated board, served by scripts/Simulation/SimulatedSoc.py"],
+    }
+
+@Pyro4.expose
+class SimulatedQickSoc:
+    """
+    The simulated soc. Besides get_cfg(), it serves simulated_acquire(), which returns synthetic IQ data for a config
+    the way an experiment's acquire() would, after waiting as long as the board would take.
+
+    Options (set at start or at any time with set_options()):
+
+    * noise: The standard deviation of a single shot, averaged down by the reps.
+    * latency: Seconds added to every call, standing in for the program upload and the network round trip.
+    * time_scale: The fraction of the real board time (see RuntimeEstimate.shot_time) each call waits for, 0 for none.
+    * payload_points: If above zero, the number of points returned per readout regardless of the config, to test
+      large transfers.
+    * fault_rate: The probability of a call failing, with the kind of failure set by fault.
+    * fault: 'disconnect' (a dropped connection, which the worker retries), 'error' (an error of the experiment), or
+      'hang' (the call takes hang_seconds).
+    * hang_seconds: How long a 'hang' fault takes.
+    """
+
+    OPTIONS = {'noise': 0.3, 'latency': 0.05, 'time_scale': 0.0, 'payload_points': 0, 'fault_rate': 0.0,
+               'fault': 'disconnect', 'hang_seconds': 30.0}
+
+    def __init__(self, **options):
+        self.options = dict(self.OPTIONS)
+        self.set_options(**options)
+        self.calls = 0
+        self.faults = 0
+        self.rng = np.random.default_rng()
+
+    def get_cfg(self):
+        return simulated_cfg()
+
+    def set_options(self, **options):
+        """ Changes the simulation options, see the class description. """
+
+        unknown = set(options) - set(self.OPTIONS)
+        if unknown:
+            raise ValueError("Unknown simulation options: " + ", ".join(sorted(unknown)))
+        self.options.update(options)
+        return dict(self.options)
+
+    def get_stats(self):
+        """ The number of calls to simulated_acquire() and of the faults injected into them. """
+
+        return {'calls': self.calls, 'faults': self.faults}
+
+    def simulated_acquire(self, cfg):
+        """
+        Simulates acquiring one set of an experiment: a Lorentzian dip in the middle of the sweep, on every readout
+        channel in ro_chs, with Gaussian noise of noise / sqrt(reps).
+
+        :param cfg: The merged config of the experiment.
+        :type cfg: dict
+        :return: The per readout channel I and Q arrays, shaped (1, points) each like the arrays of a qick acquire().
+        :rtype: dict
+        """
+
+        self.calls += 1
+        options = self.options
+        time.sleep(options['latency'] + options['time_scale'] * cfg.get('reps', 1) * sweep_points(cfg) *
+                   shot_time(cfg) * 1e-6)
+        self.inject_fault()
+
+        points = options['payload_points'] if options['payload_points'] > 0 else sweep_points(cfg)
+        ro_chs = cfg.get('ro_chs', [0])
+        sigma = options['noise'] / np.sqrt(max(cfg.get('reps', 1), 1))
+        x = np.linspace(-1.0, 1.0, points)
+        signal = 1.0 / (1.0 + (x / 0.05) ** 2)
+
+        avgi, avgq = [], []
+        for ro_ch in ro_chs:
+            avgi.append((1.0 - 0.5 * signal + self.rng.normal(0, sigma, points))[np.newaxis, :])
+            avgq.append((0.3 * signal + self.rng.normal(0, sigma, points))[np.newaxis, :])
+        return {'avgi': avgi, 'avgq': avgq}
+
+    def inject_fault(self):
+        if random.random() >= self.options['fault_rate']:
+            return
+        self.faults += 1
+        fault = self.options['fault']
+        if fault == 'disconnect':
+            raise Pyro4.errors.ConnectionClosedError("simulated dropped connection")
+        if fault == 'hang':
+            time.sleep(self.options['hang_seconds'])
+        else:
+            raise RuntimeError("simulated error of the board")
+
+class SimulationServer:
+    """
+    A nameserver and a Pyro daemon serving a SimulatedQickSoc, each on its own thread.
+    """
+
+    def __init__(self, host="127.0.0.1", ns_port=DEFAULT_NS_PORT, server_name=DEFAULT_SERVER_NAME, **options):
+        """
+        Starts the nameserver and the daemon, and registers the soc.
+
+        :param host: The address to serve on.
+        :type host: str
+        :param ns_port: The port of the nameserver.
+        :type ns_port: int
+        :param server_name: The name the soc is registered under.
+        :type server_name: str
+        :param options: The options of the SimulatedQickSoc.
+        """
+
+        Pyro4.config.SERIALIZERS_ACCEPTED.add("pickle") # the serializer makeProxy() uses
+        Pyro4.config.PICKLE_PROTOCOL_VERSION = 4
+
+        self.ns_uri, self.ns_daemon, broadcast = Pyro4.naming.startNS(host=host, port=ns_port)
+        if broadcast is not None:
+            broadcast.close()
+        self.daemon = Pyro4.Daemon(host=host)
+        self.soc = SimulatedQickSoc(**options)
+        self.uri = self.daemon.register(self.soc)
+        self.ns_daemon.nameserver.register(server_name, self.uri)
+
+        self.threads = [threading.Thread(target=daemon.requestLoop, daemon=True)
+                        for daemon in (self.ns_daemon, self.daemon)]
+        for thread in self.threads:
+            thread.start()
+
+    def shutdown(self):
+        """ Stops serving and closes both daemons. """
+
+        for daemon in (self.daemon, self.ns_daemon):
+            daemon.shutdown()
+        for thread in self.threads:
+            thread.join(1.0)
+        for daemon in (self.daemon, self.ns_daemon):
+            daemon.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a simulated QickSoc over Pyro4.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--ns-port", type=int, default=DEFAULT_NS_PORT)
+    parser.add_argument("--server-name", default=DEFAULT_SERVER_NAME)
+    for option, default in SimulatedQickSoc.OPTIONS.items():
+        parser.add_argument("--" + option.replace("_", "-"), type=type(default), default=default)
+    args = vars(parser.parse_args())
+
+    server = SimulationServer(args.pop("host"), args.pop("ns_port"), args.pop("server_name"), **args)
+    print("Serving a simulated QickSoc at " + str(server.uri) + ", nameserver " + str(server.ns_uri))
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
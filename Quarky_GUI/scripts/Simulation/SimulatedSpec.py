@@ -0,0 +1,76 @@
+"""
+A spectroscopy style experiment for the simulated QickSoc (see SimulatedSoc.py). Load it as an experiment tab once
+connected to a simulation server; it sweeps a frequency and returns synthetic IQ data, like a real experiment would.
+
+It builds the qick program a board would run for the sweep, through ExperimentClass.program() like any experiment,
+so that the program is built once per config and reused by the following sets and runs (see ProgramCache). The
+simulated soc cannot run it, so the data is acquired through simulated_acquire() instead.
+"""
+
+import numpy as np
+from qick import RAveragerProgram
+
+from scripts.CoreLib.Experiment import ExperimentClass
+
+class SimulatedSpecProgram(RAveragerProgram):
+    """
+    A qubit pulse swept in frequency from start in expts steps of step (MHz), each followed by a readout pulse.
+    """
+
+    def initialize(self):
+        cfg = self.cfg
+        res_ch, qubit_ch, ro_chs = cfg["res_ch"], cfg["qubit_ch"], cfg["ro_chs"]
+        self.q_rp = self.ch_page(qubit_ch)
+        self.r_freq = self.sreg(qubit_ch, "freq")
+
+        self.declare_gen(ch=res_ch, nqz=cfg["nqz"])
+        self.declare_gen(ch=qubit_ch, nqz=cfg["qubit_nqz"])
+        for ro_ch in ro_chs:
+            self.declare_readout(ch=ro_ch, length=self.us2cycles(cfg["read_length"], ro_ch=ro_ch),
+                                 freq=cfg["pulse_freq"], gen_ch=res_ch)
+
+        self.set_pulse_registers(ch=res_ch, style="const", phase=0, gain=cfg["pulse_gain"],
+                                 freq=self.freq2reg(cfg["pulse_freq"], gen_ch=res_ch, ro_ch=ro_chs[0]),
+                                 length=self.us2cycles(cfg["read_length"], gen_ch=res_ch))
+        self.set_pulse_registers(ch=qubit_ch, style="const", phase=0, gain=cfg["pulse_gain"],
+                                 freq=self.freq2reg(cfg["start"], gen_ch=qubit_ch),
+                                 length=self.us2cycles(cfg["qubit_length"], gen_ch=qubit_ch))
+        self.synci(200)
+
+    def body(self):
+        cfg = self.cfg
+        self.pulse(ch=cfg["qubit_ch"])
+        self.sync_all(self.us2cycles(0.05))
+        self.measure(pulse_ch=cfg["res_ch"], adcs=cfg["ro_chs"], adc_trig_offset=self.us2cycles(cfg["adc_trig_offset"]),
+                     wait=True, syncdelay=self.us2cycles(cfg["relax_delay"]))
+
+    def update(self):
+        step = self.freq2reg(self.cfg["step"], gen_ch=self.cfg["qubit_ch"])
+        self.mathi(self.q_rp, self.r_freq, self.r_freq, '+', step)
+
+class SimulatedSpecExp(ExperimentClass):
+    """
+    Acquires a sweep from the simulated soc. Any soc serving simulated_acquire() will do.
+    """
+
+    def acquire(self, progress=False, debug=False):
+        expts = self.cfg["qubit_freq_expts"]
+        step = (self.cfg["qubit_freq_stop"] - self.cfg["qubit_freq_start"]) / max(expts - 1, 1)
+        self.prog = self.program(SimulatedSpecProgram,
+                                 dict(self.cfg, start=self.cfg["qubit_freq_start"], step=step, expts=expts))
+
+        data = self.soc.simulated_acquire(dict(self.cfg))
+        points = np.shape(data['avgi'])[-1]
+        x_pts = np.linspace(self.cfg["qubit_freq_start"], self.cfg["qubit_freq_stop"], points)
+        self.data = {'config': self.cfg, 'data': {'x_pts': x_pts, 'avgi': data['avgi'], 'avgq': data['avgq']}}
+        return self.data
+
+class SimulatedSpec(SimulatedSpecExp):
+    config_template = {
+        "qubit_freq_start": 2800, # MHz
+        "qubit_freq_stop": 2900, # MHz
+        "qubit_freq_expts": 101,
+        "qubit_length": 2, # us
+        "reps": 1000,
+        "sets": 10,
+    }
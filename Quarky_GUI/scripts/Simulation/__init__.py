@@ -0,0 +1,4 @@
+# Quarky_GUI/scripts/Simulation/__init__.py
+"""
+Simulation module initialization: a simulated QickSoc for running without a board.
+"""
@@ -0,0 +1,534 @@
+"""
+===========
+SweepRun.py
+===========
+The worker of a run over an outer sweep (the outer_sweep of the run config), sharded across several RFSoCs.
+
+Every point of the sweep is a full run of the experiment (its sets and reps) with the point's config keys set, done
+by a PointRunner. The points are handed out from a shared queue to one shard per board: the connected RFSoC,
+plus every QickSoc named in the run config's shard_boards, registered in the same nameserver. Each shard connects
+to its board and runs points until none are left, so faster boards simply take more points. A board whose connection
+fails (one of SetRunner.RETRYABLE_ERRORS, once its retries are used up) drops out while its point goes back to the
+queue for the others; a point failing with an error of the experiment itself is recorded as failed instead, as every
+board would fail it the same way. Failures are logged as they happen, and a single error is raised once the sweep has
+ended if it did not complete. All shards write to the same run file, which holds the result of each point at its
+index of the sweep and the provenance of every shard (see RunFile).
+
+A PointRunner is a plain SetRunner: no QObject lives on the shard threads, and the signals of SweepRun they emit
+reach the GUI queued.
+
+The sweep may nest and zip several config keys (see Sweep). While it runs, the live plots show the running average
+of the point being run and, for each of its 1D traces (e.g. avgi against x_pts), an image of the traces of every
+point along the innermost axis of the sweep through that point (see SweepGrid).
+"""
+
+import time
+import queue
+import threading
+
+from PyQt5.QtCore import QObject, pyqtSignal, qInfo, qWarning, qCritical, qDebug
+
+from scripts.ExperimentThread import ExperimentThread
+from scripts.CoreLib.SetRunner import SetRunner
+from scripts.CoreLib.socProxy import makeProxy
+from scripts.CoreLib.SoccfgCache import SoccfgCache, UriCache
+from scripts.CoreLib.Sweep import parse_boards
+from scripts.CoreLib.RunQueue import PauseGate
+from scripts.CoreLib.Accumulator import numeric_array
+from scripts.CoreLib.ProgramCache import program_cache
+
+class PointWriter:
+    """
+    The data writer handed to the PointRunner of a single point. Its sets go to the per set history of the run
+    file, tagged with their point and shard; its averaged data is kept for SweepRun to write at the point's index.
+    """
+
+    def __init__(self, data_writer, point, shard):
+        """
+        :param data_writer: The DataWriter of the run.
+        :type data_writer: DataWriter
+        :param point: The flat index of the point.
+        :type point: int
+        :param shard: The number of the shard running it.
+        :type shard: int
+        """
+
+        self.data_writer = data_writer
+        self.point = point
+        self.shard = shard
+        self.snapshot = None # the latest averaged data of the point
+        self.summary = {} # the run summary of the point's worker
+
+    def append_set(self, raw, snapshot=None):
+        if snapshot is not None:
+            self.snapshot = snapshot
+        if self.data_writer is not None:
+            self.data_writer.append_set(dict(raw, point=self.point, shard=self.shard))
+
+    def set_attrs(self, attrs, group=None):
+        self.summary.update(attrs)
+
+class SweepGrid:
+    """
+    The latest averaged traces of every point of a sweep, kept on the host for the live plots (the run file holds the
+    results written at the end of each point). Each 1D trace of a point, the first readout channel of per channel
+    data as plotted, is kept in an array of shape sweep.shape + the shape of the trace, NaN for points not run yet.
+    """
+
+    def __init__(self, sweep):
+        """
+        :param sweep: The sweep.
+        :type sweep: Sweep
+        """
+
+        self.sweep = sweep
+        self.traces = {} # name -> array of the traces of every point
+        self.lock = threading.Lock() # the shards update the grid from their own threads
+
+    @staticmethod
+    def trace(value):
+        arr = numeric_array(value)
+        if arr is not None and arr.ndim > 2: # per readout channel data, e.g. (channels, 1, points)
+            arr = arr[0][0]
+        return arr if arr is not None and arr.ndim == 1 else None
+
+    def update(self, index, snapshot):
+        """
+        Puts the running average of a point at its index, and returns the data to plot: that of the point, with an
+        image per trace of the traces of every point of the innermost axis through the point, named after the trace
+        and the innermost key (e.g. "avgi vs read_pulse_freq").
+
+        :param index: The grid index of the point.
+        :type index: tuple
+        :param snapshot: The averaged data dictionary of the point.
+        :type snapshot: dict
+        :return: The data dictionary to plot.
+        :rtype: dict
+        """
+
+        import numpy as np # only imported once a run started
+
+        images = {}
+        with self.lock:
+            for name, value in snapshot['data'].items():
+                trace = self.trace(value)
+                if name == 'x_pts' or trace is None:
+                    continue
+                grid = self.traces.get(name)
+                if grid is None or grid.shape[len(self.sweep.shape):] != trace.shape:
+                    dtype = np.result_type(trace.dtype, np.float64)
+                    grid = np.full(self.sweep.shape + trace.shape, np.nan, dtype=dtype)
+                    self.traces[name] = grid
+                grid[index] = trace
+                images[name + " vs " + self.sweep.axes[-1].key] = grid[index[:-1]].copy()
+        return dict(snapshot, data=dict(snapshot['data'], **images))
+
+class PointChannel:
+    """
+    The update channel handed to the PointRunner of a single point: its running average goes on the sweep grid,
+    and is published with the images of the grid (see SweepGrid.update).
+    """
+
+    def __init__(self, sweep_run, index):
+        """
+        :param sweep_run: The sweep the point belongs to.
+        :type sweep_run: SweepRun
+        :param index: The grid index of the point.
+        :type index: tuple
+        """
+
+        self.sweep_run = sweep_run
+        self.index = index
+
+    def publish(self, snapshot):
+        self.sweep_run.publish(self.sweep_run.grid.update(self.index, snapshot))
+
+class PointRunner(SetRunner):
+    """
+    Runs the sets of a single point on the thread of its shard, reporting to the SweepRun rather than through signals
+    of its own. The exception that ended the point, if any, is kept in error.
+    """
+
+    log = ExperimentThread.log # onto the Qt log, as the worker of a single run
+
+    def __init__(self, sweep_run, shard, *args, **kwargs):
+        """
+        :param sweep_run: The sweep the point belongs to.
+        :type sweep_run: SweepRun
+        :param shard: The shard running the point.
+        :type shard: BoardShard
+        """
+
+        super().__init__(*args, **kwargs)
+        self.sweep_run = sweep_run
+        self.shard = shard
+        self.error = None
+
+    def progress_updated(self, reps_done):
+        self.sweep_run.report_progress(self.shard, reps_done)
+
+    def timing_updated(self, sets_per_second, seconds_left):
+        self.sweep_run.report_timing(sets_per_second, seconds_left)
+
+    def error_raised(self, error):
+        self.error = error
+
+class BoardShard:
+    """
+    A board taking part in a sweep: its connection, its experiment instance, and what it has run.
+    """
+
+    def __init__(self, number, server_name, soc=None, soccfg=None):
+        """
+        :param number: The number of the shard, 0 being the connected RFSoC.
+        :type number: int
+        :param server_name: The name the QickSoc is registered under in the nameserver.
+        :type server_name: str
+        :param soc: The soc proxy if already connected, else the shard connects on its own thread.
+        :type soc: Proxy
+        :param soccfg: The qick Config of the connected soc.
+        :type soccfg: QickConfig
+        """
+
+        self.number = number
+        self.server_name = server_name
+        self.soc = soc
+        self.soccfg = soccfg
+        self.owns_connection = soc is None # connections made by the shard are released by it
+        self.experiment_instance = None
+        self.worker = None # the PointRunner of the point being run
+        self.points = [] # flat indices of the points run
+        self.failed_points = [] # flat indices of the points that failed with an error of the experiment
+        self.sets = 0
+        self.retries = 0
+        self.stop_reason = None
+        self.start = time.monotonic()
+
+    def provenance(self):
+        """
+        The attributes recording which board the shard was and what it ran, stored in the run file.
+
+        :rtype: dict
+        """
+
+        attrs = {'server_name': self.server_name, 'points': self.points, 'failed_points': self.failed_points,
+                 'sets': self.sets, 'retries': self.retries, 'stop_reason': self.stop_reason,
+                 'elapsed_s': time.monotonic() - self.start}
+        if self.soc is not None:
+            attrs['uri'] = str(getattr(self.soc, '_pyroUri', ''))
+        if self.soccfg is not None:
+            for key in ('board', 'fw_timestamp', 'sw_version'):
+                try:
+                    attrs[key] = str(self.soccfg[key])
+                except (KeyError, TypeError):
+                    pass
+        return attrs
+
+class SweepRun(QObject):
+    """
+    The sweep worker. Used in place of an ExperimentThread (same signals, run(), pause(), resume(), and stop()):
+    moved to a QThread, its run() starts one thread per shard and returns once every shard is done. A pause holds
+    every shard at its next set boundary. Its signals are emitted from the shard threads, so they must be connected
+    queued to the objects of the GUI thread.
+    """
+
+    CONNECT_TIMEOUT = 5.0 # seconds before connecting a further board gives up
+
+    finished = pyqtSignal() # Signal to send when done running
+    updateData = pyqtSignal(object) # Signal with the averaged data of a point, when there is no update channel
+    updateProgress = pyqtSignal(int) # Signal with the reps completed so far, over all points
+    updateTiming = pyqtSignal(float, float) # Signal with the sets per second and the seconds left (-1 if unknown)
+    RFSOC_error = pyqtSignal(Exception) # Signal to send once, when the sweep ended without completing
+    paused = pyqtSignal() # Signal to send once every shard of a paused sweep holds at a set boundary
+
+    def __init__(self, config, sweep, experiment_class, soc, soccfg, ns_host, ns_port, parent=None,
+                 run_config=None, update_channel=None, data_writer=None, timer=None, server_name=None):
+        """
+        Initializes the sweep.
+
+        :param config: The config of the run, each point overriding its sweep keys.
+        :type config: dict
+        :param sweep: The outer sweep.
+        :type sweep: Sweep
+        :param experiment_class: The experiment class, instantiated once per shard.
+        :type experiment_class: type
+        :param soc: The connected RFSoC, shard 0.
+        :type soc: Proxy
+        :param soccfg: The qick Config of the connected RFSoC.
+        :type soccfg: QickConfig
+        :param ns_host: The host of the nameserver of the further boards.
+        :type ns_host: str
+        :param ns_port: The port of the nameserver.
+        :type ns_port: int
+        :param parent: The parent QObject.
+        :type parent: QObject
+        :param run_config: The run config, its shard_boards naming the further boards.
+        :type run_config: dict
+        :param update_channel: The LiveUpdateChannel the points' averaged data is published to.
+        :type update_channel: LiveUpdateChannel
+        :param data_writer: The DataWriter of the run file.
+        :type data_writer: DataWriter
+        :param timer: The timer of the run, shared by every shard.
+        :type timer: RunTimer
+        :param server_name: The name of the connected RFSoC in the nameserver, for its provenance.
+        :type server_name: str
+        """
+
+        super().__init__(parent)
+        self.config = config
+        self.sweep = sweep
+        self.experiment_class = experiment_class
+        self.ns_host = ns_host
+        self.ns_port = ns_port
+        self.run_config = run_config or {}
+        self.update_channel = update_channel
+        self.data_writer = data_writer
+        self.timer = timer
+        self.running = False
+        self.stop_reason = None
+        self.lock = threading.Lock()
+
+        self.shards = [BoardShard(0, server_name, soc, soccfg)]
+        for name in parse_boards(self.run_config.get("shard_boards", "")):
+            self.shards.append(BoardShard(len(self.shards), name))
+        self.gate = PauseGate(parties=len(self.shards), on_paused=self.paused.emit) # shared by the points' workers
+
+        self.points = queue.Queue() # (grid index, flat index, overrides) of the points still to run
+        self.points_done = 0
+        self.reps_per_point = config.get("reps", 1) * config["sets"]
+        self.point_reps = {} # shard number -> reps of the point it is running
+        self.busy = 0 # shards running a point
+        self.sets_skipped = 0 # sets not needed by points that met an early stopping target
+        self.points_failed = 0 # points that failed with an error of the experiment, not run again
+        self.last_error = None # the latest error of a shard or a point
+        self.grid = SweepGrid(sweep) # the traces of every point, for the live plots
+
+    def run(self):
+        """ Runs the sweep, one thread per shard. """
+
+        self.running = True
+        for flat, (index, overrides) in enumerate(self.sweep.points(self.config)):
+            self.points.put((index, flat, overrides))
+        if self.data_writer is not None:
+            self.data_writer.write_sweep(self.sweep)
+        qInfo("Running " + str(self.sweep.size) + " points of " + ", ".join(self.sweep.keys) + " on " +
+              str(len(self.shards)) + " board(s).")
+
+        threads = [threading.Thread(target=self.run_shard, args=(shard,), daemon=True) for shard in self.shards]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        if self.stop_reason is None:
+            self.stop_reason = "completed" if self.points_done == self.sweep.size else "error"
+        if self.data_writer is not None:
+            for shard in self.shards:
+                self.data_writer.set_attrs(shard.provenance(), 'shards/' + str(shard.number))
+            self.data_writer.set_attrs({'stop_reason': self.stop_reason, 'points_completed': self.points_done,
+                                        'points_failed': self.points_failed, 'shards': len(self.shards),
+                                        'retries': sum(shard.retries for shard in self.shards)})
+        self.running = False
+        if self.stop_reason == "error": # a single error for the whole sweep, the failures were logged as they came
+            not_run = self.sweep.size - self.points_done - self.points_failed
+            qCritical("The sweep did not complete: " + str(self.points_done) + " of " + str(self.sweep.size) +
+                      " points done, " + str(self.points_failed) + " failed, " + str(not_run) + " not run.")
+            self.RFSOC_error.emit(self.last_error if self.last_error is not None else
+                                  RuntimeError("no board could run the sweep"))
+        self.finished.emit()
+
+    def run_shard(self, shard):
+        """
+        The loop of a shard: connects to its board if needed, then runs points until none are left, the sweep is
+        stopped, or the board fails.
+
+        :param shard: The shard.
+        :type shard: BoardShard
+        """
+
+        try:
+            if shard.soc is None:
+                shard.soc, shard.soccfg = makeProxy(self.ns_host, self.ns_port, shard.server_name,
+                                                    timeout=self.CONNECT_TIMEOUT, cache=SoccfgCache(),
+                                                    uri_cache=UriCache())
+                qInfo("Shard " + str(shard.number) + " connected to " + shard.server_name + ".")
+            with self.lock: # experiment classes create their folders, which is not thread safe
+                shard.experiment_instance = self.experiment_class(soc=shard.soc, soccfg=shard.soccfg, cfg=self.config)
+        except Exception as e:
+            shard.stop_reason = "error"
+            self.last_error = e
+            qWarning("Shard " + str(shard.number) + " (" + str(shard.server_name) + ") could not start and drops "
+                     "out: " + str(e))
+            self.gate.leave()
+            return
+
+        try:
+            while True:
+                point = self.next_point()
+                if point is None:
+                    break
+                carry_on = False
+                try:
+                    carry_on = self.run_point(shard, *point)
+                finally:
+                    with self.lock:
+                        if not carry_on:
+                            self.points.put(point) # the board failed, the point goes to the boards still running
+                        self.busy -= 1
+                if not carry_on:
+                    break
+        finally:
+            self.gate.leave()
+            if shard.stop_reason is None:
+                shard.stop_reason = "stopped" if self.stop_reason == "stopped" else "completed"
+            if shard.owns_connection:
+                try:
+                    shard.soc._pyroRelease()
+                except Exception:
+                    pass # the connection is already gone
+                if shard.soccfg is not None:
+                    program_cache.forget(shard.soccfg)
+
+    def next_point(self):
+        """
+        Takes the next point to run. While the queue is empty but other shards are still running points, which may
+        come back to the queue if their board fails, waits for them.
+
+        :return: The grid index, flat index, and overrides of the point, or None once there are none left or the
+            sweep is stopped.
+        :rtype: tuple
+        """
+
+        while self.running:
+            self.gate.wait(lambda: self.running)
+            with self.lock:
+                try:
+                    point = self.points.get_nowait()
+                    self.busy += 1
+                    return point
+                except queue.Empty:
+                    if self.busy == 0:
+                        return None
+            time.sleep(0.1)
+        return None
+
+    def run_point(self, shard, index, flat, overrides):
+        """
+        Runs a single point on a shard and writes its result.
+
+        :param shard: The shard.
+        :type shard: BoardShard
+        :param index: The grid index of the point.
+        :type index: tuple
+        :param flat: The flat index of the point.
+        :type flat: int
+        :param overrides: The config keys set at the point.
+        :type overrides: dict
+        :return: Whether the shard can carry on, False if its board failed.
+        :rtype: bool
+        """
+
+        config = self.config | overrides
+        shard.experiment_instance.cfg = config
+        writer = PointWriter(self.data_writer, flat, shard.number)
+        worker = PointRunner(self, shard, config, soccfg=shard.soccfg, exp=shard.experiment_instance, soc=shard.soc,
+                             run_config=self.run_config, update_channel=PointChannel(self, index),
+                             data_writer=writer, timer=self.timer, gate=self.gate)
+        worker.runtime_calibration = None # the shards' timings overlap
+
+        qDebug("Shard " + str(shard.number) + " running point " + str(flat + 1) + " of " + str(self.sweep.size) +
+               ": " + str(overrides))
+        shard.worker = worker
+        if not self.running: # stopped while the worker was being created
+            return True
+        worker.run()
+        shard.worker = None
+
+        shard.retries += worker.retries
+        if worker.stop_reason == "error":
+            with self.lock:
+                self.point_reps.pop(shard.number, None)
+                self.last_error = worker.error
+            if isinstance(worker.error, SetRunner.RETRYABLE_ERRORS): # the board, not the point
+                shard.stop_reason = "error"
+                qWarning("Shard " + str(shard.number) + " (" + str(shard.server_name) + ") dropped out (" +
+                         str(worker.error) + "), its point goes to the other boards.")
+                return False
+            qCritical("Point " + str(flat + 1) + " " + str(overrides) + " failed on shard " + str(shard.number) +
+                      ": " + str(worker.error))
+            shard.failed_points.append(flat)
+            with self.lock:
+                self.points_failed += 1
+                self.sets_skipped += self.config["sets"] - worker.accumulator.count
+            self.report_progress(shard, 0)
+            return True
+
+        shard.points.append(flat)
+        shard.sets += worker.accumulator.count
+        if self.data_writer is not None and worker.accumulator.count:
+            self.data_writer.write_point(index, writer.snapshot, dict(writer.summary, shard=shard.number))
+        with self.lock:
+            self.point_reps.pop(shard.number, None)
+            if worker.stop_reason != "stopped":
+                self.points_done += 1
+                self.sets_skipped += self.config["sets"] - worker.accumulator.count
+        self.report_progress(shard, 0)
+        return True
+
+    def publish(self, data):
+        """
+        Hands the data to plot on to the update channel of the run, or else emits it.
+
+        :param data: The data dictionary of a point, with the images of the sweep grid.
+        :type data: dict
+        """
+
+        if self.update_channel is not None:
+            self.update_channel.publish(data)
+        else:
+            self.updateData.emit(data)
+
+    def report_progress(self, shard, reps_done):
+        """
+        Emits the reps completed over all points: those of the finished points, and of the point of every shard.
+
+        :param shard: The shard reporting.
+        :type shard: BoardShard
+        :param reps_done: The reps completed of the shard's current point.
+        :type reps_done: int
+        """
+
+        with self.lock:
+            if reps_done:
+                self.point_reps[shard.number] = reps_done
+            total = self.points_done * self.reps_per_point + sum(self.point_reps.values())
+        self.updateProgress.emit(total)
+
+    def report_timing(self, sets_per_second, seconds_left):
+        """
+        Emits the set rate of all the shards together, and the time left over all points (the worker of a point only
+        knows the time left of its own point).
+        """
+
+        if self.timer is None:
+            return
+        with self.lock:
+            sets_left = self.sweep.size * self.config["sets"] - self.timer.sets_done - self.sets_skipped
+        remaining = self.timer.remaining(sets_left)
+        self.updateTiming.emit(self.timer.sets_per_second(), -1.0 if remaining is None else remaining)
+
+    def pause(self):
+        self.gate.pause()
+
+    def resume(self):
+        self.gate.resume()
+
+    def stop(self):
+        if self.running:
+            if self.stop_reason is None:
+                self.stop_reason = "stopped"
+            self.running = False
+            for shard in self.shards:
+                if shard.worker is not None:
+                    shard.worker.stop()
+        qDebug("trying to stop the sweep...")
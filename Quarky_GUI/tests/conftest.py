@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The modules are imported as scripts.X, from the Quarky_GUI folder, as Quarky.py does
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+
+from scripts.CoreLib.Accumulator import StreamingAccumulator
+
+def accumulate(sets, weights=None):
+    accumulator = StreamingAccumulator()
+    for i, values in enumerate(sets):
+        accumulator.add({'avgi': values, 'set_num': i}, 1.0 if weights is None else weights[i])
+    return accumulator
+
+def test_unweighted_matches_numpy():
+    rng = np.random.default_rng(0)
+    sets = rng.normal(size=(20, 7))
+    accumulator = accumulate(sets)
+
+    assert accumulator.count == 20
+    assert 'set_num' not in accumulator.mean
+    np.testing.assert_allclose(accumulator.mean['avgi'], sets.mean(axis=0))
+    np.testing.assert_allclose(accumulator.variance('avgi'), sets.var(axis=0, ddof=1))
+    np.testing.assert_allclose(accumulator.stderr('avgi'), sets.std(axis=0, ddof=1) / np.sqrt(20))
+
+def test_weighted_mean_and_variance():
+    rng = np.random.default_rng(1)
+    sets = rng.normal(size=(15, 4))
+    weights = rng.integers(1, 50, size=15).astype(float)
+    accumulator = accumulate(sets, weights)
+
+    mean = np.average(sets, axis=0, weights=weights)
+    variance = np.sum(weights[:, None] * (sets - mean) ** 2, axis=0) / weights.sum() * 15 / 14
+    np.testing.assert_allclose(accumulator.mean['avgi'], mean)
+    np.testing.assert_allclose(accumulator.variance('avgi'), variance)
+    np.testing.assert_allclose(accumulator.stderr('avgi'), np.sqrt(variance / 15))
+
+def test_equal_weights_match_unweighted():
+    rng = np.random.default_rng(2)
+    sets = rng.normal(size=(10, 3))
+    unweighted, weighted = accumulate(sets), accumulate(sets, [5.0] * 10)
+
+    np.testing.assert_allclose(weighted.mean['avgi'], unweighted.mean['avgi'])
+    np.testing.assert_allclose(weighted.variance('avgi'), unweighted.variance('avgi'))
+
+def test_complex_variance_is_of_the_magnitude_of_deviations():
+    rng = np.random.default_rng(3)
+    sets = rng.normal(size=(12, 5)) + 1j * rng.normal(size=(12, 5))
+    accumulator = accumulate(sets)
+
+    np.testing.assert_allclose(accumulator.mean['avgi'], sets.mean(axis=0))
+    np.testing.assert_allclose(accumulator.variance('avgi'), np.var(sets, axis=0, ddof=1))
+
+def test_nan_until_two_sets():
+    accumulator = accumulate([np.ones(3)])
+
+    assert np.isnan(accumulator.variance('avgi')).all()
+    assert np.isnan(accumulator.max_stderr(['avgi']))
+    assert np.isnan(accumulator.snr(['avgi']))
+
+def test_shape_change_is_rejected():
+    accumulator = accumulate([np.ones(3)])
+    with pytest.raises(ValueError):
+        accumulator.add({'avgi': np.ones(4)})
+
+def test_snr_of_real_data_crossing_zero():
+    # A trace from -A to +A has a contrast of 2A, folding it onto its magnitude would give about none
+    trace = np.linspace(-1.0, 1.0, 11)
+    noise = np.zeros((4, 11))
+    noise[::2] = 0.01
+    noise[1::2] = -0.01
+    accumulator = accumulate(trace + noise)
+
+    stderr = accumulator.max_stderr(['avgi'])
+    assert stderr == pytest.approx(0.01 * np.sqrt(4 / 3) / 2)
+    assert accumulator.snr(['avgi']) == pytest.approx(2.0 / stderr)
+
+def test_snr_of_complex_data_uses_the_magnitude():
+    magnitude = np.linspace(1.0, 3.0, 5)
+    phase = np.exp(1j * np.linspace(0, np.pi, 5))
+    sets = [magnitude * phase * (1 + 0.01 * sign) for sign in (1, -1, 1, -1)]
+    accumulator = accumulate(sets)
+
+    assert accumulator.snr(['avgi']) == pytest.approx(2.0 / accumulator.max_stderr(['avgi']))
+
+def test_snr_takes_the_best_array():
+    accumulator = StreamingAccumulator()
+    for sign in (1, -1, 1, -1):
+        accumulator.add({'avgi': np.array([0.0, 1.0]) + 0.1 * sign, 'avgq': np.array([0.0, 0.1]) + 0.1 * sign})
+
+    assert accumulator.snr(['avgi', 'avgq']) == pytest.approx(accumulator.snr(['avgi']))
+    assert accumulator.snr(['avgi']) == pytest.approx(10 * accumulator.snr(['avgq']))
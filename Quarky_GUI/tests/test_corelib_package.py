@@ -0,0 +1,44 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import scripts.CoreLib as CoreLib
+
+QUARKY_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def test_submodules_stay_modules():
+    import scripts.CoreLib.RunFile as run_file
+    from scripts.CoreLib import SoccfgCache
+
+    assert type(run_file).__name__ == "module"
+    assert type(SoccfgCache).__name__ == "module"
+    assert run_file.RunFile.__module__ == "scripts.CoreLib.RunFile"
+
+def test_names_resolve_from_their_module():
+    from scripts.CoreLib import ExperimentClass, makeProxy
+
+    assert ExperimentClass.__module__ == "scripts.CoreLib.Experiment"
+    assert makeProxy.__module__ == "scripts.CoreLib.socProxy"
+
+def test_star_import_provides_the_names():
+    namespace = {}
+    exec("from scripts.CoreLib import *", namespace)
+
+    for name in ("ExperimentClass", "MakeFile", "NpEncoder", "makeProxy"):
+        assert name in namespace
+    assert namespace["NpEncoder"] is CoreLib.NpEncoder
+    assert isinstance(CoreLib.NpEncoder, type) # the class, not a module of the same name
+
+def test_unknown_names_raise():
+    with pytest.raises(AttributeError):
+        CoreLib.NoSuchName
+    assert not hasattr(CoreLib, "__wrapped__")
+
+def test_importing_the_package_imports_nothing_heavy():
+    # In a fresh interpreter, as the test session itself imports numpy
+    code = ("import sys, scripts.CoreLib as c; hasattr(c, 'typo'); "
+            "print([m for m in ('qick', 'Pyro4', 'h5py', 'numpy') if m in sys.modules])")
+    result = subprocess.run([sys.executable, "-c", code], cwd=QUARKY_DIR, capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "[]"
@@ -0,0 +1,36 @@
+import os
+
+import numpy as np
+import pytest
+
+h5py = pytest.importorskip("h5py")
+pytest.importorskip("pyqtgraph")
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+from PyQt5.QtWidgets import QApplication
+
+from scripts.QuarkTab import QQuarkTab
+
+@pytest.fixture(scope="module")
+def app():
+    return QApplication.instance() or QApplication([])
+
+def write_data_file(path, points):
+    with h5py.File(path, "w") as f:
+        f['x_pts'] = np.linspace(4.0, 5.0, points)
+        f['avgi'] = np.sin(np.linspace(0, 10, points))
+        f['avgq'] = np.cos(np.linspace(0, 10, points))
+
+@pytest.mark.parametrize("points", [500, 5000])
+def test_1d_data_file_is_plotted(app, tmp_path, points):
+    path = str(tmp_path / "data.h5")
+    write_data_file(path, points)
+    tab = QQuarkTab(None, "data.h5", False, path)
+    try:
+        prepared = tab.auto_plot_prepare()
+        assert [plot["label"] for plot in prepared["plots"]] == ["avgi", "avgq"]
+        for plot in prepared["plots"]:
+            assert len(plot["x"]) == len(plot["y"]) <= tab.max_plot_points
+            assert plot["x"][0] == 4.0
+        assert len(tab.plots) == 2
+    finally:
+        tab.release_files()
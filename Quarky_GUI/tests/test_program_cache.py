@@ -0,0 +1,122 @@
+import gc
+import types
+import weakref
+
+import numpy as np
+
+from scripts.CoreLib.ProgramCache import ProgramCache, config_hash
+from scripts.CoreLib.ExperimentLoader import ExperimentRegistry
+
+class Config:
+    """ A board configuration, as a QickConfig is to the cache. """
+
+    def __init__(self, firmware="fw"):
+        self.firmware = firmware
+
+    def get_cfg(self):
+        return {'firmware': self.firmware}
+
+class Program:
+    """ A program, which references its board configuration as qick programs do. """
+
+    def __init__(self, soccfg, cfg):
+        self.soccfg = soccfg
+        self.cfg = cfg
+
+def build(cache, soccfg, cfg, builder=Program):
+    return cache.get(soccfg, builder, cfg, lambda: builder(soccfg, cfg))
+
+def test_config_hash_is_canonical():
+    assert config_hash({'a': 1, 'b': 2.0}) == config_hash({'b': np.float64(2.0), 'a': np.int64(1)})
+    assert config_hash({'a': 1, 'b': 2}) != config_hash({'a': 1, 'b': 3})
+    assert config_hash({'a': 1, 'reps': 2}, exclude=('reps',)) == config_hash({'a': 1, 'reps': 3}, exclude=('reps',))
+
+def test_built_once_per_config_and_board():
+    cache = ProgramCache()
+    first, second = Config(), Config() # the same firmware, but two boards
+    program = build(cache, first, {'gain': 1})
+
+    assert build(cache, first, {'gain': 1}) is program
+    assert build(cache, second, {'gain': 1}) is not program
+    assert build(cache, first, {'gain': 2}) is not program
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 3
+
+def test_keeps_the_most_recently_used_entries():
+    cache = ProgramCache(max_entries=2)
+    soccfg = Config()
+    first = build(cache, soccfg, {'gain': 1})
+    build(cache, soccfg, {'gain': 2})
+    build(cache, soccfg, {'gain': 1})
+    build(cache, soccfg, {'gain': 3}) # evicts gain 2
+
+    assert build(cache, soccfg, {'gain': 1}) is first
+    assert cache.stats()['misses'] == 3
+    build(cache, soccfg, {'gain': 2})
+    assert cache.stats()['misses'] == 4
+
+def test_forgotten_board_is_released():
+    cache = ProgramCache()
+    soccfg = Config()
+    build(cache, soccfg, {'gain': 1})
+    released = weakref.ref(soccfg)
+
+    cache.forget(soccfg) # disconnected
+    del soccfg
+    gc.collect()
+    assert released() is None
+    assert cache.boards == {}
+
+def test_board_in_use_after_being_forgotten_is_not_cached_again():
+    cache = ProgramCache()
+    soccfg = Config()
+    cache.forget(soccfg) # a run still finishing on the board
+    program = build(cache, soccfg, {'gain': 1})
+
+    assert build(cache, soccfg, {'gain': 1}) is not program
+    assert cache.boards == {}
+
+def test_board_without_entries_is_dropped_with_its_config():
+    cache = ProgramCache(max_entries=1)
+    soccfg = Config()
+    cache.get(soccfg, "waveform", {'gain': 1}, lambda: np.zeros(4)) # does not reference the board
+    assert len(cache.boards) == 1
+
+    del soccfg
+    gc.collect()
+    assert cache.boards == {}
+
+def test_classes_of_a_replaced_module_are_forgotten():
+    cache = ProgramCache()
+    soccfg = Config()
+    module = types.ModuleType("experiment")
+    exec("class Program:\n    def __init__(self, soccfg, cfg):\n        self.soccfg = soccfg\n"
+         "class Experiment:\n    pass", module.__dict__)
+    build(cache, soccfg, {'gain': 1}, module.Program)
+    cache.get(soccfg, (module.Experiment, "waveform"), {'gain': 1}, lambda: np.zeros(4))
+    kept = build(cache, soccfg, {'gain': 1})
+    released = weakref.ref(module.Program)
+
+    cache.forget_classes(module)
+    del module
+    gc.collect()
+    assert released() is None
+    assert build(cache, soccfg, {'gain': 1}) is kept
+    assert len(cache.entries(soccfg)[1]) == 1
+
+def test_reloading_a_changed_file_forgets_its_classes(tmp_path, monkeypatch):
+    import scripts.CoreLib.ExperimentLoader as loader
+    cache = ProgramCache()
+    monkeypatch.setattr(loader, "program_cache", cache)
+    path = tmp_path / "program_cache_experiment.py"
+    path.write_text("class Program:\n    def __init__(self, soccfg, cfg):\n        self.soccfg = soccfg\n")
+    registry = ExperimentRegistry()
+    soccfg = Config()
+    try:
+        module, _ = registry.load(str(path))
+        build(cache, soccfg, {'gain': 1}, module.Program)
+        path.write_text("class Program:\n    def __init__(self, soccfg, cfg):\n        self.soccfg = None\n")
+        registry.load(str(path))
+    finally:
+        monkeypatch.delitem(loader.sys.modules, "program_cache_experiment", raising=False)
+
+    assert len(cache.entries(soccfg)[1]) == 0
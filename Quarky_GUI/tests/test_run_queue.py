@@ -0,0 +1,170 @@
+import threading
+
+import numpy as np
+import pytest
+
+from scripts.CoreLib.RunQueue import RunQueue, PauseGate
+from scripts.CoreLib.SetRunner import SetRunner
+
+def test_reloaded_after_a_restart(tmp_path):
+    run_queue = RunQueue(str(tmp_path))
+    first = run_queue.add("/experiments/T1.py", {'reps': 100}, {'save_policy': "end_of_run"}, priority=2)
+    second = run_queue.add("/experiments/Spec.py")
+    run_queue.mark_running(first['id'])
+
+    reloaded = RunQueue(str(tmp_path))
+    assert [entry['path'] for entry in reloaded.entries] == ["/experiments/T1.py", "/experiments/Spec.py"]
+    assert reloaded.get(first['id'])['experiment_config'] == {'reps': 100}
+    assert reloaded.get(first['id'])['run_config'] == {'save_policy': "end_of_run"}
+    assert reloaded.get(first['id'])['status'] == "pending" # interrupted by the GUI closing
+    assert reloaded.add("/experiments/Rabi.py")['id'] == second['id'] + 1
+
+def test_removed_entries_stay_removed(tmp_path):
+    run_queue = RunQueue(str(tmp_path))
+    entry = run_queue.add("/experiments/T1.py")
+    run_queue.mark_finished(run_queue.add("/experiments/Spec.py")['id'], "completed")
+    assert run_queue.remove(entry['id'])
+    run_queue.clear_finished()
+
+    assert RunQueue(str(tmp_path)).entries == []
+
+def test_running_entries_cannot_be_removed(tmp_path):
+    run_queue = RunQueue(str(tmp_path))
+    entry = run_queue.add("/experiments/T1.py")
+    run_queue.mark_running(entry['id'])
+
+    assert not run_queue.remove(entry['id'])
+
+def test_ordered_by_priority_then_order_added(tmp_path):
+    run_queue = RunQueue(str(tmp_path))
+    low = run_queue.add("/experiments/low.py")
+    high = run_queue.add("/experiments/high.py", priority=5)
+    tie = run_queue.add("/experiments/tie.py", priority=5)
+    periodic = run_queue.add("/experiments/calibrate.py", interval_minutes=30)
+
+    assert [entry['id'] for entry in run_queue.ordered()] == [periodic['id'], high['id'], tie['id'], low['id']]
+
+    run_queue.set_priority(low['id'], 10)
+    assert RunQueue(str(tmp_path)).ordered()[1]['id'] == low['id']
+
+def test_next_run_skips_finished_entries(tmp_path):
+    run_queue = RunQueue(str(tmp_path))
+    first = run_queue.add("/experiments/first.py", priority=1)
+    second = run_queue.add("/experiments/second.py")
+
+    assert run_queue.next_run()['id'] == first['id']
+    run_queue.mark_running(first['id'])
+    assert run_queue.next_run()['id'] == second['id']
+    run_queue.mark_finished(first['id'], "completed")
+    run_queue.mark_finished(second['id'], "error")
+
+    assert run_queue.get(first['id'])['status'] == "done"
+    assert run_queue.get(second['id'])['status'] == "failed"
+    assert run_queue.next_run() is None
+
+def test_periodic_job_falls_due_after_its_interval(tmp_path):
+    run_queue = RunQueue(str(tmp_path))
+    one_off = run_queue.add("/experiments/Spec.py", priority=100)
+    periodic = run_queue.add("/experiments/calibrate.py", interval_minutes=10)
+
+    assert run_queue.due_periodic()['id'] == periodic['id'] # never run yet
+    assert run_queue.next_run()['id'] == periodic['id'] # ahead of any one-off entry
+
+    run_queue.mark_running(periodic['id'])
+    run_queue.mark_finished(periodic['id'], "completed")
+    last_run = run_queue.get(periodic['id'])['last_run']
+    assert run_queue.get(periodic['id'])['status'] == "pending"
+    assert run_queue.due_periodic(now=last_run + 599) is None
+    assert run_queue.next_run(now=last_run + 599)['id'] == one_off['id']
+    assert run_queue.due_periodic(now=last_run + 600)['id'] == periodic['id']
+
+    # Still due after a restart, its last run is kept
+    assert RunQueue(str(tmp_path)).due_periodic(now=last_run + 600)['id'] == periodic['id']
+
+class BlockingExperiment:
+    """ An experiment whose every acquire() waits until the test releases it. """
+
+    def __init__(self):
+        self.started = threading.Semaphore(0)
+        self.release = threading.Semaphore(0)
+        self.in_flight = False
+        self.acquired = 0
+
+    def acquire(self):
+        self.in_flight = True
+        self.started.release()
+        assert self.release.acquire(timeout=5)
+        self.in_flight = False
+        self.acquired += 1
+        return {'data': {'avgi': np.ones(3)}}
+
+@pytest.mark.parametrize("pipeline_depth", [0, 2])
+def test_preempted_only_at_a_set_boundary(pipeline_depth):
+    experiment = BlockingExperiment()
+    paused = threading.Event()
+    in_flight_when_paused = []
+    def on_paused():
+        in_flight_when_paused.append(experiment.in_flight)
+        paused.set()
+    runner = SetRunner({'sets': 3, 'reps': 1}, None, experiment, None, run_config={'pipeline_depth': pipeline_depth},
+                       gate=PauseGate(on_paused=on_paused))
+    runner.runtime_calibration = None
+    thread = threading.Thread(target=runner.run, daemon=True)
+    thread.start()
+
+    assert experiment.started.acquire(timeout=5) # the first set is in flight
+    runner.pause()
+    assert not paused.wait(0.3) # the set in flight is finished first
+    experiment.release.release()
+    assert paused.wait(5)
+    assert in_flight_when_paused == [False]
+    assert experiment.acquired == 1
+    assert not experiment.started.acquire(timeout=0.3) # nothing is acquired while paused
+
+    runner.resume()
+    for _ in range(2):
+        assert experiment.started.acquire(timeout=5)
+        experiment.release.release()
+    thread.join(5)
+    assert runner.stop_reason == "completed"
+    assert runner.accumulator.count == 3
+
+def test_sharded_run_pauses_once_every_board_is_at_a_boundary():
+    paused = threading.Event()
+    gate = PauseGate(parties=2, on_paused=paused.set)
+    gate.pause()
+
+    first = threading.Thread(target=gate.wait, args=(lambda: True,), daemon=True)
+    first.start()
+    assert not paused.wait(0.2) # the other board is still acquiring
+    second = threading.Thread(target=gate.wait, args=(lambda: True,), daemon=True)
+    second.start()
+    assert paused.wait(5)
+
+    gate.resume()
+    first.join(5)
+    second.join(5)
+    assert not first.is_alive() and not second.is_alive()
+
+def test_board_leaving_completes_the_pause():
+    paused = threading.Event()
+    gate = PauseGate(parties=2, on_paused=paused.set)
+    gate.pause()
+    waiting = threading.Thread(target=gate.wait, args=(lambda: True,), daemon=True)
+    waiting.start()
+    assert not paused.wait(0.2)
+
+    gate.leave() # the other board finished its points
+    assert paused.wait(5)
+    gate.resume()
+    waiting.join(5)
+
+def test_stopping_ends_the_wait():
+    gate = PauseGate()
+    gate.pause()
+    running = [True]
+    waiting = threading.Thread(target=gate.wait, args=(lambda: running[0],), daemon=True)
+    waiting.start()
+    running[0] = False
+    waiting.join(5)
+    assert not waiting.is_alive()
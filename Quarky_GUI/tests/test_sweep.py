@@ -0,0 +1,84 @@
+import pytest
+
+from scripts.CoreLib.Sweep import Sweep, SweepAxis, parse_value, parse_boards
+
+def test_values_are_parsed_as_numbers_where_they_can_be():
+    assert parse_value(" 3 ") == 3 and isinstance(parse_value("3"), int)
+    assert parse_value("2.5") == 2.5
+    assert parse_value(" high ") == "high"
+
+def test_boards_are_comma_separated():
+    assert parse_boards("myqick2, myqick3,") == ["myqick2", "myqick3"]
+    assert parse_boards(None) == []
+
+def test_range_includes_both_ends():
+    axis = SweepAxis.parse("yokoVoltage=0:1:5")
+    assert axis.key == "yokoVoltage"
+    assert axis.values == pytest.approx([0.0, 0.25, 0.5, 0.75, 1.0])
+    assert axis.values[-1] == 1.0
+    assert SweepAxis.parse("gain=7:9:1").values == [7.0]
+
+def test_list_of_values():
+    assert SweepAxis.parse("mode = a, 2, 3.5").values == ["a", 2, 3.5]
+
+@pytest.mark.parametrize("text", ["yokoVoltage", "yokoVoltage=", "=0:1:3", "yokoVoltage=0:1", "yokoVoltage=0:1:3:4",
+                                  "yokoVoltage=0:one:3", "yokoVoltage=0:1:2.5", "yokoVoltage=0:1:", "yokoVoltage=1,,2",
+                                  "yokoVoltage=1,2,"])
+def test_malformed_axes_are_rejected(text):
+    with pytest.raises(ValueError):
+        SweepAxis.parse(text)
+
+@pytest.mark.parametrize("text", ["gain=0:1:0", "gain=0:1:-3"])
+def test_axes_without_values_are_rejected(text):
+    with pytest.raises(ValueError, match="no values"):
+        SweepAxis.parse(text)
+
+def test_zipped_axes_step_together():
+    axis = SweepAxis.parse("freq=6420:6430:3 & gain=1000,2000,3000")
+    assert axis.keys == ["freq", "gain"]
+    assert axis.items() == [("freq", [6420.0, 6425.0, 6430.0]), ("gain", [1000, 2000, 3000])]
+
+def test_zipped_axes_of_unequal_lengths_are_rejected():
+    with pytest.raises(ValueError, match="as many values"):
+        SweepAxis.parse("freq=6420:6430:3 & gain=1000,2000")
+    with pytest.raises(ValueError):
+        SweepAxis.parse("freq=6420:6430:3 & ")
+
+def test_empty_spec_is_no_sweep():
+    assert Sweep.parse("") is None
+    assert Sweep.parse("  ") is None
+    assert Sweep.parse(None) is None
+
+def test_empty_axes_are_skipped_but_not_an_empty_sweep():
+    assert Sweep.parse("a=1,2;; b=3,4,5;").shape == (2, 3)
+    with pytest.raises(ValueError, match="no axes"):
+        Sweep.parse(" ; ;")
+
+def test_keys_swept_twice_are_rejected():
+    with pytest.raises(ValueError, match="more than once"):
+        Sweep.parse("a=1,2; b=3,4 & a=5,6")
+
+def test_grid_shape_and_dims():
+    sweep = Sweep.parse("yokoVoltage=0:1:11; read_pulse_freq=6420:6430:21 & read_pulse_gain=1000:3000:21; phase=0,90")
+    assert sweep.shape == (11, 21, 2)
+    assert sweep.size == 462
+    assert sweep.keys == ["yokoVoltage", "read_pulse_freq", "read_pulse_gain", "phase"]
+    assert sweep.dims() == {"yokoVoltage": 0, "read_pulse_freq": 1, "read_pulse_gain": 1, "phase": 2}
+
+def test_points_in_order_last_axis_fastest():
+    sweep = Sweep.parse("a=1,2; b=10:30:3 & c=x,y,z")
+    points = list(sweep.points())
+
+    assert len(points) == sweep.size
+    assert [index for index, _ in points] == [(i, j) for i in range(2) for j in range(3)]
+    assert points[0][1] == {"a": 1, "b": 10.0, "c": "x"}
+    assert points[4][1] == {"a": 2, "b": 20.0, "c": "y"}
+
+def test_whole_values_of_int_config_entries_stay_int():
+    sweep = Sweep.parse("reps=100:300:3; freq=1:2:2")
+    overrides = sweep.overrides((1, 0), {"reps": 50, "freq": 1.5})
+
+    assert overrides == {"reps": 200, "freq": 1.0}
+    assert isinstance(overrides["reps"], int)
+    assert isinstance(overrides["freq"], float)
+    assert isinstance(sweep.overrides((1, 0), {"reps": 2.0})["reps"], float)